@@ -1,4 +1,7 @@
 from functools import lru_cache
+import numpy as np
+cimport cython
+from libc.math cimport sin, cos, isnan
 
 @lru_cache(32000)
 def det_moment(double kl, double kr, double q, double x, double EI, double L):
@@ -35,3 +38,213 @@ def det_shear(double kl, double kr, double q, double x, double EI, double L):
                (2*EI*(12*EI**2 + 4*EI*L*kl + 4*EI*L*kr + L**2*kl*kr)) - q*x/EI)
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def det_moment_array(kl, kr, q, x, EI, L):
+    """
+    Same as `det_moment`, without caching. Works element wise on NumPy arrays.
+    """
+    kl, kr, q, x, EI, L = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) for v in (kl, kr, q, x, EI, L)])
+    cdef const double[::1] kl_ = np.ascontiguousarray(kl).ravel(), kr_ = np.ascontiguousarray(kr).ravel()
+    cdef const double[::1] q_ = np.ascontiguousarray(q).ravel(), x_ = np.ascontiguousarray(x).ravel()
+    cdef const double[::1] EI_ = np.ascontiguousarray(EI).ravel(), L_ = np.ascontiguousarray(L).ravel()
+    out = np.empty(kl.shape)
+    cdef double[::1] out_ = out.reshape(-1)
+    cdef Py_ssize_t i
+    cdef double a, b, c, d, e, f, g, den
+    for i in range(out_.shape[0]):
+        a = kl_[i]
+        b = kr_[i]
+        c = q_[i]
+        d = x_[i]
+        e = EI_[i]
+        f = L_[i]
+        den = 12 * e * e + 4 * e * f * a + 4 * e * f * b + f * f * a * b
+        g = e * (-f * f * f * a * c * (6 * e + f * b) / (12 * e * den) +
+                 f * c * d * (12 * e * e + 5 * e * f * a + 3 * e * f * b + f * f * a * b) / (2 * e * den) -
+                 c * d * d / (2 * e))
+        out_[i] = g
+    return out
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def det_shear_array(kl, kr, q, x, EI, L):
+    """
+    Same as `det_shear`, without caching. Works element wise on NumPy arrays.
+    """
+    kl, kr, q, x, EI, L = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) for v in (kl, kr, q, x, EI, L)])
+    cdef const double[::1] kl_ = np.ascontiguousarray(kl).ravel(), kr_ = np.ascontiguousarray(kr).ravel()
+    cdef const double[::1] q_ = np.ascontiguousarray(q).ravel(), x_ = np.ascontiguousarray(x).ravel()
+    cdef const double[::1] EI_ = np.ascontiguousarray(EI).ravel(), L_ = np.ascontiguousarray(L).ravel()
+    out = np.empty(kl.shape)
+    cdef double[::1] out_ = out.reshape(-1)
+    cdef Py_ssize_t i
+    cdef double a, b, c, d, e, f, den
+    for i in range(out_.shape[0]):
+        a = kl_[i]
+        b = kr_[i]
+        c = q_[i]
+        d = x_[i]
+        e = EI_[i]
+        f = L_[i]
+        den = 12 * e * e + 4 * e * f * a + 4 * e * f * b + f * f * a * b
+        out_[i] = e * (f * c * (12 * e * e + 5 * e * f * a + 3 * e * f * b + f * f * a * b) / (2 * e * den) -
+                       c * d / e)
+    return out
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def stiffness_matrix(var_constitutive_matrix, var_kinematic_matrix):
+    """
+    K = B^T C B for a single element.
+    """
+    cdef const double[:, :] c = np.asarray(var_constitutive_matrix, dtype=np.float64)
+    cdef const double[:, :] b = np.asarray(var_kinematic_matrix, dtype=np.float64)
+    out = np.zeros((6, 6))
+    cdef double[:, ::1] k = out
+    cdef double[3] cb
+    cdef Py_ssize_t i, j, m
+    for j in range(6):
+        for m in range(3):
+            cb[m] = c[m, 0] * b[0, j] + c[m, 1] * b[1, j] + c[m, 2] * b[2, j]
+        for i in range(6):
+            k[i, j] = b[0, i] * cb[0] + b[1, i] * cb[1] + b[2, i] * cb[2]
+    return out
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def kinematic_matrices(a1, a2, l):
+    """
+    Vectorized `kinematic_matrix` for a stack of elements.
+
+    :param a1: (array) Angles with respect to the x axis at node 1.
+    :param a2: (array) Angles with respect to the x axis at node 2.
+    :param l: (array) Lengths
+    :return: (array) Shape (n, 3, 6)
+    """
+    cdef const double[:] a1_ = np.asarray(a1, dtype=np.float64), a2_ = np.asarray(a2, dtype=np.float64)
+    cdef const double[:] l_ = np.asarray(l, dtype=np.float64)
+    out = np.zeros((l_.shape[0], 3, 6))
+    cdef double[:, :, ::1] m = out
+    cdef Py_ssize_t i
+    cdef double c1, s1, c2, s2, li
+    for i in range(l_.shape[0]):
+        c1 = cos(a1_[i])
+        s1 = sin(a1_[i])
+        c2 = cos(a2_[i])
+        s2 = sin(a2_[i])
+        li = l_[i]
+        m[i, 0, 0] = -c1
+        m[i, 0, 1] = s1
+        m[i, 0, 3] = c2
+        m[i, 0, 4] = -s2
+        m[i, 1, 0] = s1 / li
+        m[i, 1, 1] = c1 / li
+        m[i, 1, 2] = -1
+        m[i, 1, 3] = -s2 / li
+        m[i, 1, 4] = -c2 / li
+        m[i, 2, 0] = -s1 / li
+        m[i, 2, 1] = -c1 / li
+        m[i, 2, 3] = s2 / li
+        m[i, 2, 4] = c2 / li
+        m[i, 2, 5] = 1
+    return out
+
+
+@cython.cdivision(True)
+cdef inline double _series(double a, double k):
+    # 1 / (1 / a + 1 / k), a zero stiffness stays zero
+    if a == 0:
+        return 0
+    return 1 / (1 / a + 1 / k)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def constitutive_matrices(EA, EI, l, spring_1=None, spring_2=None):
+    """
+    Vectorized `constitutive_matrix` for a stack of elements.
+
+    :param EA: (array) Young's modules * Area
+    :param EI: (array) Young's modules * Moment of Inertia
+    :param l: (array) Length
+    :param spring_1: (array) Rotational spring stiffness at node 1. NaN means no spring, 0 means a hinge.
+    :param spring_2: (array) Rotational spring stiffness at node 2. NaN means no spring, 0 means a hinge.
+    :return: (array) Shape (n, 3, 3)
+    """
+    cdef Py_ssize_t n = len(l)
+    cdef const double[:] EA_ = np.broadcast_to(np.asarray(EA, dtype=np.float64), (n,))
+    cdef const double[:] EI_ = np.broadcast_to(np.asarray(EI, dtype=np.float64), (n,))
+    cdef const double[:] l_ = np.asarray(l, dtype=np.float64)
+    cdef const double[:] k1 = np.full(n, np.nan) if spring_1 is None else np.asarray(spring_1, dtype=np.float64)
+    cdef const double[:] k2 = np.full(n, np.nan) if spring_2 is None else np.asarray(spring_2, dtype=np.float64)
+    out = np.zeros((n, 3, 3))
+    cdef double[:, :, ::1] m = out
+    cdef Py_ssize_t i
+    for i in range(n):
+        m[i, 0, 0] = EA_[i] / l_[i]
+        m[i, 1, 1] = m[i, 2, 2] = 4 * EI_[i] / l_[i]
+        m[i, 1, 2] = m[i, 2, 1] = -2 * EI_[i] / l_[i]
+        # Same sequence of updates as the scalar version. Series springs on a hinged side evaluate to zero.
+        if not isnan(k1[i]):
+            if k1[i] == 0:
+                m[i, 1, 1] = m[i, 1, 2] = m[i, 2, 1] = 0
+            else:
+                m[i, 1, 1] = _series(m[i, 1, 1], k1[i])
+                m[i, 2, 1] = _series(m[i, 2, 1], k1[i])
+        if not isnan(k2[i]):
+            if k2[i] == 0:
+                m[i, 1, 2] = m[i, 2, 1] = m[i, 2, 2] = 0
+            else:
+                m[i, 2, 1] = _series(m[i, 2, 1], k2[i])
+                m[i, 1, 2] = _series(m[i, 1, 2], k2[i])
+    return out
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def stiffness_matrices(var_constitutive_matrices, var_kinematic_matrices):
+    """
+    Vectorized `stiffness_matrix` for a stack of elements.
+
+    :param var_constitutive_matrices: (array) Shape (n, 3, 3)
+    :param var_kinematic_matrices: (array) Shape (n, 3, 6)
+    :return: (array) Shape (n, 6, 6)
+    """
+    cdef const double[:, :, :] c = np.asarray(var_constitutive_matrices, dtype=np.float64)
+    cdef const double[:, :, :] b = np.asarray(var_kinematic_matrices, dtype=np.float64)
+    out = np.zeros((b.shape[0], 6, 6))
+    cdef double[:, :, ::1] k = out
+    cdef double[3] cb
+    cdef Py_ssize_t e, i, j, m
+    for e in range(b.shape[0]):
+        for j in range(6):
+            for m in range(3):
+                cb[m] = c[e, m, 0] * b[e, 0, j] + c[e, m, 1] * b[e, 1, j] + c[e, m, 2] * b[e, 2, j]
+            for i in range(6):
+                k[e, i, j] = b[e, 0, i] * cb[0] + b[e, 1, i] * cb[1] + b[e, 2, i] * cb[2]
+    return out
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def assemble_matrices(system_matrix, var_stiffness_matrices, dofs):
+    """
+    Add the stiffness matrices of a stack of elements to the system matrix, in place.
+
+    :param system_matrix: (array) Shape (n_dofs, n_dofs)
+    :param var_stiffness_matrices: (array) Shape (n, 6, 6)
+    :param dofs: (array) Degrees of freedom of the elements in the system. Shape (n, 6)
+    """
+    cdef double[:, :] matrix = system_matrix
+    cdef const double[:, :, :] k = np.asarray(var_stiffness_matrices, dtype=np.float64)
+    cdef const Py_ssize_t[:, :] d = np.asarray(dofs, dtype=np.intp)
+    cdef Py_ssize_t e, i, j
+    for e in range(k.shape[0]):
+        for i in range(6):
+            for j in range(6):
+                matrix[d[e, i], d[e, j]] += k[e, i, j]
@@ -1,4 +1,23 @@
 from functools import lru_cache
+import numpy as np
+
+
+def det_moment_array(kl, kr, q, x, EI, L):
+    """
+    Same as `det_moment`, without caching. Works element wise on NumPy arrays.
+    """
+    return EI*(-L**3*kl*q*(6*EI + L*kr)/(12*EI*(12*EI**2 + 4*EI*L*kl + 4*EI*L*kr + L**2*kl*kr)) +
+               L*q*x*(12*EI**2 + 5*EI*L*kl + 3*EI*L*kr +
+                      L**2*kl*kr)/(2*EI*(12*EI**2 + 4*EI*L*kl + 4*EI*L*kr + L**2*kl*kr)) - q*x**2/(2*EI))
+
+
+def det_shear_array(kl, kr, q, x, EI, L):
+    """
+    Same as `det_shear`, without caching. Works element wise on NumPy arrays.
+    """
+    return EI*(L*q*(12*EI**2 + 5*EI*L*kl + 3*EI*L*kr + L**2*kl*kr) /
+               (2*EI*(12*EI**2 + 4*EI*L*kl + 4*EI*L*kr + L**2*kl*kr)) - q*x/EI)
+
 
 @lru_cache(32000)
 def det_moment(kl, kr, q, x, EI, L):
@@ -13,9 +32,7 @@ def det_moment(kl, kr, q, x, EI, L):
     :param L: (flt) Length of the beam
     :return: (flt)
     """
-    return EI*(-L**3*kl*q*(6*EI + L*kr)/(12*EI*(12*EI**2 + 4*EI*L*kl + 4*EI*L*kr + L**2*kl*kr)) +
-               L*q*x*(12*EI**2 + 5*EI*L*kl + 3*EI*L*kr +
-                      L**2*kl*kr)/(2*EI*(12*EI**2 + 4*EI*L*kl + 4*EI*L*kr + L**2*kl*kr)) - q*x**2/(2*EI))
+    return det_moment_array(kl, kr, q, x, EI, L)
 
 
 @lru_cache(32000)
@@ -31,7 +48,98 @@ def det_shear(kl, kr, q, x, EI, L):
     :param L: (flt) Length of the beam
     :return: (flt)
     """
-    return EI*(L*q*(12*EI**2 + 5*EI*L*kl + 3*EI*L*kr + L**2*kl*kr) /
-               (2*EI*(12*EI**2 + 4*EI*L*kl + 4*EI*L*kr + L**2*kl*kr)) - q*x/EI)
+    return det_shear_array(kl, kr, q, x, EI, L)
+
 
+def stiffness_matrix(var_constitutive_matrix, var_kinematic_matrix):
+    kinematic_transposed_times_constitutive = np.dot(var_kinematic_matrix.transpose(), var_constitutive_matrix)
+    return np.dot(kinematic_transposed_times_constitutive, var_kinematic_matrix)
 
+
+def kinematic_matrices(a1, a2, l):
+    """
+    Vectorized :func:`kinematic_matrix` for a stack of elements.
+
+    :param a1: (array) Angles with respect to the x axis at node 1.
+    :param a2: (array) Angles with respect to the x axis at node 2.
+    :param l: (array) Lengths
+    :return: (array) Shape (n, 3, 6)
+    """
+    c1 = np.cos(a1)
+    s1 = np.sin(a1)
+    c2 = np.cos(a2)
+    s2 = np.sin(a2)
+    matrix = np.zeros((len(l), 3, 6))
+    matrix[:, 0, 0] = -c1
+    matrix[:, 0, 1] = s1
+    matrix[:, 0, 3] = c2
+    matrix[:, 0, 4] = -s2
+    matrix[:, 1, 0] = s1 / l
+    matrix[:, 1, 1] = c1 / l
+    matrix[:, 1, 2] = -1
+    matrix[:, 1, 3] = -s2 / l
+    matrix[:, 1, 4] = -c2 / l
+    matrix[:, 2, 0] = -s1 / l
+    matrix[:, 2, 1] = -c1 / l
+    matrix[:, 2, 3] = s2 / l
+    matrix[:, 2, 4] = c2 / l
+    matrix[:, 2, 5] = 1
+    return matrix
+
+
+def constitutive_matrices(EA, EI, l, spring_1=None, spring_2=None):
+    """
+    Vectorized :func:`constitutive_matrix` for a stack of elements.
+
+    :param EA: (array) Young's modules * Area
+    :param EI: (array) Young's modules * Moment of Inertia
+    :param l: (array) Length
+    :param spring_1: (array) Rotational spring stiffness at node 1. NaN means no spring, 0 means a hinge.
+    :param spring_2: (array) Rotational spring stiffness at node 2. NaN means no spring, 0 means a hinge.
+    :return: (array) Shape (n, 3, 3)
+    """
+    matrix = np.zeros((len(l), 3, 3))
+    matrix[:, 0, 0] = EA / l
+    matrix[:, 1, 1] = matrix[:, 2, 2] = 4 * EI / l
+    matrix[:, 1, 2] = matrix[:, 2, 1] = -2 * EI / l
+
+    # Same sequence of updates as the scalar version. Series springs on a hinged side evaluate to zero.
+    with np.errstate(divide='ignore'):
+        if spring_1 is not None:
+            hinge = spring_1 == 0
+            spring = ~np.isnan(spring_1) & ~hinge
+            matrix[hinge, 1, 1] = matrix[hinge, 1, 2] = matrix[hinge, 2, 1] = 0
+            k = spring_1[spring]
+            matrix[spring, 1, 1] = 1 / (1 / matrix[spring, 1, 1] + 1 / k)
+            matrix[spring, 2, 1] = 1 / (1 / matrix[spring, 2, 1] + 1 / k)
+        if spring_2 is not None:
+            hinge = spring_2 == 0
+            spring = ~np.isnan(spring_2) & ~hinge
+            matrix[hinge, 1, 2] = matrix[hinge, 2, 1] = matrix[hinge, 2, 2] = 0
+            k = spring_2[spring]
+            matrix[spring, 2, 1] = 1 / (1 / matrix[spring, 2, 1] + 1 / k)
+            matrix[spring, 1, 2] = 1 / (1 / matrix[spring, 1, 2] + 1 / k)
+    return matrix
+
+
+def stiffness_matrices(var_constitutive_matrices, var_kinematic_matrices):
+    """
+    Vectorized :func:`stiffness_matrix` for a stack of elements.
+
+    :param var_constitutive_matrices: (array) Shape (n, 3, 3)
+    :param var_kinematic_matrices: (array) Shape (n, 3, 6)
+    :return: (array) Shape (n, 6, 6)
+    """
+    return np.matmul(np.matmul(var_kinematic_matrices.transpose(0, 2, 1), var_constitutive_matrices),
+                     var_kinematic_matrices)
+
+
+def assemble_matrices(system_matrix, var_stiffness_matrices, dofs):
+    """
+    Add the stiffness matrices of a stack of elements to the system matrix, in place.
+
+    :param system_matrix: (array) Shape (n_dofs, n_dofs)
+    :param var_stiffness_matrices: (array) Shape (n, 6, 6)
+    :param dofs: (array) Degrees of freedom of the elements in the system. Shape (n, 6)
+    """
+    np.add.at(system_matrix, (dofs[:, :, None], dofs[:, None, :]), var_stiffness_matrices)
@@ -5,9 +5,11 @@ from functools import lru_cache
 import copy
 
 try:
-    from anastruct.fem.cython.celements import det_shear, det_moment
+    from anastruct.fem.cython.celements import det_shear, det_moment, stiffness_matrix, kinematic_matrices, \
+        constitutive_matrices, stiffness_matrices
 except ImportError:
-    from anastruct.fem.cython.elements import det_shear, det_moment
+    from anastruct.fem.cython.elements import det_shear, det_moment, stiffness_matrix, kinematic_matrices, \
+        constitutive_matrices, stiffness_matrices
 
 """
 The matrices underneath are for slender beams, where the most deformation occurs due to bending.
@@ -17,8 +19,68 @@ Shear deformation is not taken into account.
 CACHE_BOUND = 32000
 
 
+def _lazy_result(name):
+    """
+    Element result that is determined on first access after a calculation and cached until the next calculation.
+    """
+    def fget(self):
+        if name not in self._results and self._results_batch is not None:
+            # view in the results of all elements
+            self._results[name] = self._results_batch.element(name, self._results_index)
+        return self._results.get(name)
+
+    def fset(self, value):
+        self._results[name] = value
+
+    return property(fget, fset)
+
+
+def _bound_vector(name):
+    """
+    Element vector that is a row of the (n_elements, 6) arrays of an :class:`ElementVectors`. Assignments are copied
+    into the row.
+    """
+    def fget(self):
+        if self._vectors is None:
+            self._vectors = ElementVectors(1)
+            self._vectors_index = 0
+        return getattr(self._vectors, name)[self._vectors_index]
+
+    def fset(self, value):
+        fget(self)[:] = value
+
+    return property(fget, fset)
+
+
+class ElementVectors:
+    """
+    Displacement, primary force and force vectors of many elements as (n_elements, 6) arrays. The vectors of the
+    elements are rows of these arrays, so the vectors of all elements are determined at once.
+    """
+
+    def __init__(self, n):
+        """
+        :param n: (int) Number of elements.
+        """
+        self.displacement = np.zeros((n, 6))
+        self.primary_force = np.zeros((n, 6))  # acting external forces
+        self.force = np.zeros((n, 6))
+        # (n_elements, 6) degrees of freedom of the elements in the system and the rows of the element ids.
+        self.dofs = None
+        self.rows = None
+
+
 class Element:
-    def __init__(self, id_, EA, EI, l, angle, vertex_1, vertex_2, spring=None):
+    element_displacement_vector = _bound_vector('displacement')
+    element_primary_force_vector = _bound_vector('primary_force')
+    element_force_vector = _bound_vector('force')
+    bending_moment = _lazy_result('bending_moment')
+    shear_force = _lazy_result('shear_force')
+    deflection = _lazy_result('deflection')
+    extension = _lazy_result('extension')
+    max_deflection = _lazy_result('max_deflection')
+
+    def __init__(self, id_, EA, EI, l, angle, vertex_1, vertex_2, spring=None, matrices=None):
         """
         :param id_: integer representing the elements ID
         :param EA: Young's modulus * Area
@@ -37,6 +99,8 @@ class Element:
                                    k: 5e3
                                  }
                             }
+        :param matrices: (tpl) Precomputed (kinematic, constitutive, stiffness) matrices. Used when elements are
+                               created in bulk.
         """
         self.id = id_
         self.type = None
@@ -47,29 +111,31 @@ class Element:
         self.vertex_1 = vertex_1  # location
         self.vertex_2 = vertex_2  # location
         self.angle = self.a1 = self.a2 = angle
-        self.kinematic_matrix = kinematic_matrix(angle, angle, l)
-        self.constitutive_matrix = None
-        self.stiffness_matrix = None
         self.node_id1 = None  # int
         self.node_id2 = None  # int
         self.node_ids = []
         self.node_map = None
-        self.element_displacement_vector = np.empty(6)
-        self.element_primary_force_vector = np.zeros(6)  # acting external forces
-        self.element_force_vector = None
+        # ElementVectors with the displacement, primary force and force vector of this element, created on first use
+        self._vectors = None
+        self._vectors_index = None
         self.q_load = 0
         self.q_direction = None
         self.dead_load = 0
         self.N_1 = None
         self.N_2 = None
-        self.bending_moment = None
-        self.shear_force = None
-        self.deflection = None
-        self.extension = None
-        self.max_deflection = None
+        # bending_moment, shear_force, deflection, extension and max_deflection
+        self._results = {}
+        self._results_batch = None
+        self._results_index = None
         self.nodes_plastic = [False, False]
-        self.compile_constitutive_matrix(self.EA, self.EI, l)
-        self.compile_stiffness_matrix()
+        if matrices is None:
+            self.kinematic_matrix = kinematic_matrix(angle, angle, l)
+            self.constitutive_matrix = None
+            self.stiffness_matrix = None
+            self.compile_constitutive_matrix(self.EA, self.EI, l)
+            self.compile_stiffness_matrix()
+        else:
+            self.kinematic_matrix, self.constitutive_matrix, self.stiffness_matrix = matrices
 
     @property
     def all_q_load(self):
@@ -111,6 +177,8 @@ class Element:
         self.constitutive_matrix = constitutive_matrix(EA, EI, l, self.springs)
 
     def update_stiffness(self, factor, node):
+        # the matrices may be shared with copies of the element, they are never modified in place
+        self.constitutive_matrix = self.constitutive_matrix.copy()
         if node == 1:
             self.constitutive_matrix[1][1] *= factor
             self.constitutive_matrix[1][2] *= factor
@@ -125,14 +193,68 @@ class Element:
         self.compile_stiffness_matrix()
         self.stiffness_matrix += geometric_stiffness_matrix(self.l, self.N_1, self.a1, self.a2)
 
+    def bind_vectors(self, vectors, index):
+        """
+        Use a row of the vectors of all elements as the vectors of this element.
+
+        :param vectors: (:class:`.ElementVectors`)
+        :param index: (int) Row of this element.
+        """
+        self._vectors = vectors
+        self._vectors_index = index
+
+    def reset_results(self, batch, index):
+        """
+        Discard the cached element results. They are read from the results of all elements on first access.
+
+        :param batch: (:class:`.ElementResults`) Results of all elements of a calculation.
+        :param index: (int) Row of this element in the batch.
+        """
+        self._results = {}
+        self._results_batch = batch
+        self._results_index = index
+
+    @property
+    def extension_start(self):
+        """
+        First value of the extension, determined without the extension array.
+        """
+        return self._results_batch.element('extension_start', self._results_index)
+
+    def extrema(self, name):
+        """
+        Exact extremes of a result field of the last calculation, determined analytically.
+
+        :param name: (str) 'bending_moment', 'shear_force' or 'deflection'.
+        :return: (tpl) minimum, location of the minimum, maximum, location of the maximum. The locations are
+                       measured from the first node.
+        """
+        return tuple(float(v[self._results_index]) for v in self._results_batch.extrema(name))
+
     def reset(self):
-        self.element_displacement_vector = np.zeros(6)
-        self.element_primary_force_vector = np.zeros(6)
+        self.element_displacement_vector = 0
+        self.element_primary_force_vector = 0
+
+    def __copy__(self):
+        """
+        Copy that shares the matrices and the vertices with this element. The node ids, plastic nodes and results are
+        not shared.
+        """
+        el = Element.__new__(Element)
+        el.__dict__.update(self.__dict__)
+        el.node_ids = list(self.node_ids)
+        el.nodes_plastic = list(self.nodes_plastic)
+        el._results = dict(self._results)
+        return el
 
     def __add__(self, other):
         if self.id != other.id:
             raise FEMException('Wrong element:', 'only elements with the same id can be added.')
-        el = copy.deepcopy(self)
+        # don't copy the vectors of all elements
+        el = copy.deepcopy(self, {id(self._vectors): None})
+        el.element_displacement_vector = self.element_displacement_vector
+        el.element_primary_force_vector = self.element_primary_force_vector
+        el.element_force_vector = self.element_force_vector
         for unit in ['bending_moment', 'shear_force', 'deflection', 'extension', 'N_1', 'N_2']:
             if getattr(el, unit) is None:
                 setattr(el, unit, getattr(other, unit))
@@ -210,11 +332,6 @@ def constitutive_matrix(EA, EI, l, spring=None):
     return matrix
 
 
-def stiffness_matrix(var_constitutive_matrix, var_kinematic_matrix):
-    kinematic_transposed_times_constitutive = np.dot(var_kinematic_matrix.transpose(), var_constitutive_matrix)
-    return np.dot(kinematic_transposed_times_constitutive, var_kinematic_matrix)
-
-
 def geometric_stiffness_matrix(l, N, a1, a2):
     """
 
@@ -1,4 +1,22 @@
+def _result(index):
+    def fget(self):
+        return self._results[index]
+
+    def fset(self, value):
+        self._results[index] = value
+
+    return property(fget, fset)
+
+
 class Node:
+    # The results are stored in a sequence, that can be bound to a row of the results array of the system.
+    Fx = _result(0)
+    Fz = _result(1)
+    Ty = _result(2)
+    ux = _result(3)
+    uz = _result(4)
+    phi_y = _result(5)
+
     def __init__(self, id, Fx=0, Fz=0, Ty=0, ux=0, uz=0, phi_y=0, vertex=None):
         """
         :param id: ID of the node, integer
@@ -11,18 +29,27 @@ class Node:
         :param vertex: Point object
         """
         self.id = id
-        # forces
-        self.Fx = Fx
-        self.Fz = Fz
-        self.Ty = Ty
-        # displacements
-        self.ux = ux
-        self.uz = uz
-        self.phi_y = phi_y
+        # forces Fx, Fz, Ty and displacements ux, uz, phi_y
+        self._results = [Fx, Fz, Ty, ux, uz, phi_y]
         self.vertex = vertex
         self.hinge = False
         self.elements = {}
 
+    def bind(self, results):
+        """
+        Read and write the results of the node from an array, e.g. a row of the node results of the system.
+
+        :param results: (array) View with the values Fx, Fz, Ty, ux, uz, phi_y.
+        """
+        self._results = results
+
+    def __copy__(self):
+        node = Node.__new__(Node)
+        node.__dict__.update(self.__dict__)
+        # a copy doesn't write in the results of the system
+        node._results = list(self._results)
+        return node
+
     @property
     def Fy(self):
         return -self.Fz
@@ -52,6 +79,6 @@ class Node:
         return Node(self.id, Fx, Fz, Ty, self.ux, self.uz, self.phi_y, self.vertex)
 
     def reset(self):
-        self.Fx = self.Fz = self.Ty = self.ux = self.uz = self.phi_y = 0
+        self._results[:] = [0] * 6
 
 
@@ -1,2 +1,17 @@
-from .mpl import Plotter
+import sys
+import types
 from .values import PlottingValues
+from .element import plot_values_deflection, plot_values_bending_moment, plot_values_axial_force, \
+    plot_values_shear_force, plot_values_element
+
+
+class _PlotterModule(types.ModuleType):
+    # matplotlib is only imported when the Plotter is used. A module level __getattr__ needs Python 3.7, the class of
+    # a module can be replaced since Python 3.5.
+    @property
+    def Plotter(self):
+        from .mpl import Plotter
+        return Plotter
+
+
+sys.modules[__name__].__class__ = _PlotterModule
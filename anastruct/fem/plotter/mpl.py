@@ -14,8 +14,6 @@ class Plotter(PlottingValues):
         super(Plotter, self).__init__(system, mesh)
         self.system = system
         self.one_fig = None
-        self.max_q = 0
-        self.max_system_point_load = 0
 
     def __start_plot(self, figsize):
         plt.close("all")
@@ -152,7 +150,7 @@ class Plotter(PlottingValues):
             else:
                 direction = -1
 
-            h = 0.05 * max_val * abs(el.q_load) / self.max_q
+            h = 0.05 * max_val * abs(el.q_load) / self.system.plot_values.max_q
             x1 = el.vertex_1.x
             y1 = el.vertex_1.y
             x2 = el.vertex_2.x
@@ -214,7 +212,7 @@ class Plotter(PlottingValues):
             Fx, Fz = self.system.loads_point[k]
             F = (Fx ** 2 + Fz ** 2) ** 0.5
             node = self.system.node_map[k]
-            h = 0.1 * max_plot_range * F / self.max_system_point_load
+            h = 0.1 * max_plot_range * F / self.system.plot_values.max_system_point_load
             x, y, len_x, len_y, F = self.__arrow_patch_values(Fx, Fz, node, h)
 
             self.one_fig.arrow(x, y, len_x, len_y, head_width=h * 0.15, head_length=0.2 * h, ec='b', fc='orange',
@@ -367,7 +365,7 @@ class Plotter(PlottingValues):
 
     def bending_moment(self, factor=None, figsize=None, verbosity=0, scale=1, offset=(0, 0), show=True, gridplot=False):
         self.plot_structure(figsize, 1, scale=scale, offset=offset, gridplot=gridplot)
-        con = len(self.system.element_map[1].bending_moment)
+        con = len(next(iter(self.system.element_map.values())).bending_moment)
         if factor is None:
             # maximum moment determined by comparing the node's moments and the sagging moments.
             max_moment = max(map(lambda el: max(abs(el.node_1.Ty),
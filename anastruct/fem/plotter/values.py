@@ -17,6 +17,19 @@ class PlottingValues:
         self.mesh = max(3, mesh)
         # used for scaling the plotting values.
         self._max_val_structure = None
+        # used for scaling the load patches.
+        self.max_q = 0
+        self.max_system_point_load = 0
+
+    def copy(self, system):
+        """
+        :param system: (:class:`.SystemElements`) The system of the copy.
+        :return: (:class:`PlottingValues`)
+        """
+        values = PlottingValues(system, self.mesh)
+        values.max_q = self.max_q
+        values.max_system_point_load = self.max_system_point_load
+        return values
 
     @property
     def max_val_structure(self):
@@ -48,7 +61,7 @@ class PlottingValues:
                                  self.system.element_map.values()))
             factor = det_scaling_factor(max_moment, self.max_val_structure)
 
-        n = len(self.system.element_map[1].bending_moment)
+        n = len(next(iter(self.system.element_map.values())).bending_moment)
         xy = np.hstack([plot_values_bending_moment(el, factor, n) for el in self.system.element_map.values()])
         return xy[0, :], xy[1, :]
 
@@ -1,213 +1,362 @@
-import copy
-import math
 import numpy as np
 
 from anastruct.fem.node import Node
-from anastruct.basic import integrate_array
+from anastruct.fem.system_components import assembly
 
 
 class SystemLevel:
     def __init__(self, system):
         self.system = system
-        # post processor element level
-        self.post_el = ElementLevel(self.system)
+        # ElementResults of the last calculation
+        self.results = None
+        # node results of the element ends and of the system nodes. Node objects are bound to their rows.
+        self.element_node_results = None
+        self.node_results = None
+        # reactions of the last calculation: node ids and (n_supports, 3) array with Fx, Fz, Ty
+        self.reaction_node_ids = None
+        self.reactions = None
+        self.equilibrium_residual = None
 
     def node_results_elements(self):
         """
-        Determines the node results on the system level.
-        Results placed in SystemElements class: self.node_objects (list).
+        Determines the node results on the element level for all elements at once. The results are stored in the
+        (n_elements, 2, 6) array `element_node_results`: Fx, Fz, Ty, ux, uz, phi_y at both ends of the elements.
+        The nodes in the `node_map` of the elements are bound to these rows.
         """
+        elements = list(self.system.element_map.values())
+        n = len(elements)
+        vectors = assembly.element_vectors(self.system)
+        results = np.empty((n, 2, 6))
+        results[:, :, :3] = (vectors.force + vectors.primary_force).reshape(n, 2, 3)
+        results[:, :, 3:] = vectors.displacement.reshape(n, 2, 3)
 
-        for el in self.system.element_map.values():
-            # post processor element level
-            self.post_el.node_results(el)
+        # Local coordinate system. With inclined supports
+        rotation = np.array([(el.a1 - el.angle, el.a2 - el.angle) for el in elements]).reshape(n, 2)
+        inclined = rotation != 0
+        if np.any(inclined):
+            r = results[inclined]
+            c = np.cos(rotation[inclined])
+            s = np.sin(rotation[inclined])
+            Fx, Fz, ux, uz = r[:, 0].copy(), r[:, 1].copy(), r[:, 3].copy(), r[:, 4].copy()
+            r[:, 1] = c * Fz + s * Fx
+            r[:, 0] = -(c * Fx + s * Fz)
+            r[:, 3] = c * ux + s * uz
+            r[:, 4] = c * uz + s * ux
+            results[inclined] = r
+
+        if self.element_node_results is not None and self.element_node_results.shape == results.shape:
+            # the nodes are bound to this array
+            self.element_node_results[:] = results
+        else:
+            self.element_node_results = results
+            for i, el in enumerate(elements):
+                el.node_map[el.node_id1] = Node(el.node_id1)
+                el.node_map[el.node_id1].bind(results[i, 0])
+                el.node_map[el.node_id2] = Node(el.node_id2)
+                el.node_map[el.node_id2].bind(results[i, 1])
 
     def node_results_system(self):
-        for k, v in self.system.node_element_map.items():
-            # reset nodes in case of iterative calculation
-            self.system.node_map[k].reset()
-
-            if k in self.system.loads_moment:
-                self.system.node_map[k].Ty += self.system.loads_moment[k]
-
-            if k in self.system.loads_point:
-                Fx, Fz = self.system.loads_point[k]
-                self.system.node_map[k].Fx += Fx
-                self.system.node_map[k].Fz += Fz
+        """
+        Determines the node results on the system level. The forces of the element ends are accumulated per node, the
+        displacements are read from the system displacement vector, so nodes without elements have displacements as
+        well. The results are stored in the (n_nodes, 6) array `node_results`, row id - 1. The nodes in the
+        `node_map` of the system are bound to these rows.
+        """
+        elements = list(self.system.element_map.values())
+        node_ids = np.array([(el.node_id1, el.node_id2) for el in elements], dtype=int).reshape(-1, 2)
+        results = np.zeros((self.system.id_last_node, 6))
 
-            for i in range(len(v)):
-                node = v[i].node_map[k]
-                self.system.node_map[k] -= node
+        for node_id, Ty in self.system.loads_moment.items():
+            results[node_id - 1, 2] += Ty
+        for node_id, (Fx, Fz) in self.system.loads_point.items():
+            results[node_id - 1, :2] += (Fx, Fz)
 
-                # The displacements are not summarized. Should be assigned only once
-                self.system.node_map[k].ux = -node.ux
-                self.system.node_map[k].uz = -node.uz
-                self.system.node_map[k].phi_y = -node.phi_y
+        np.subtract.at(results[:, :3], node_ids - 1, self.element_node_results[:, :, :3])
+        results[:, 3:] = -self.system.system_displacement_vector.reshape(-1, 3)
 
-    def reaction_forces(self):
-        supports = []
-        for node in self.system.supports_fixed:
-            supports.append(node.id)
-        for node in self.system.supports_hinged:
-            supports.append(node.id)
-        for node in self.system.supports_roll:
-            supports.append(node.id)
-        for node, _ in self.system.supports_spring_x:
-            supports.append(node.id)
-        for node, _ in self.system.supports_spring_z:
-            supports.append(node.id)
-        for node, _ in self.system.supports_spring_y:
-            supports.append(node.id)
-
-        for node_id in supports:
-            node = self.system.node_map[node_id]
-            node = copy.copy(node)
-            self.system.reaction_forces[node_id] = node
-            node.Fx *= -1
-            node.Fz *= -1
-            node.Ty *= -1
-            node.ux = None
-            node.uz = None
-            node.phi_y = None
-
-    def element_results(self):
+        # Local coordinate system. With inclined supports
+        for node_id, angle in self.system.inclined_roll.items():
+            c = np.cos(angle)
+            s = np.sin(angle)
+            ux, uz = results[node_id - 1, 3:5]
+            results[node_id - 1, 3:5] = c * ux + s * uz, c * uz + s * ux
+
+        if self.node_results is not None and self.node_results.shape == results.shape:
+            # the nodes are bound to this array
+            self.node_results[:] = results
+        else:
+            self.node_results = results
+            for node_id, node in self.system.node_map.items():
+                node.bind(results[node_id - 1])
+
+    def reset_bindings(self):
         """
-        Determines the element results for al elements in the system on element level.
+        The nodes and the elements of the system have changed. The result arrays are bound to new nodes in the next
+        post processing.
         """
+        self.element_node_results = None
+        self.node_results = None
 
-        for el in self.system.element_map.values():
-            self.post_el.determine_axial_force(el)
-            con = self.system.plotter.mesh
-            self.post_el.determine_bending_moment(el, con)
-            self.post_el.determine_shear_force(el, con)
-            self.post_el.determine_displacements(el, con)
-
-
-class ElementLevel:
-    def __init__(self, system):
-        self.system = system
+    def reaction_forces(self):
+        """
+        Determines the reaction forces of the supports from the rows of the system: R = K u - F. K u is assembled
+        from the element forces, the stiffness of the support springs is not part of the reactions.
 
-    @staticmethod
-    def node_results(element):
-        """
-        Determine node results on the element level.
-
-        """
-        # Global coordinates system
-        element.node_map[element.node_id1] = Node(
-            id=element.node_id1,
-            Fx=element.element_force_vector[0] + element.element_primary_force_vector[0],
-            Fz=element.element_force_vector[1] + element.element_primary_force_vector[1],
-            Ty=element.element_force_vector[2] + element.element_primary_force_vector[2],
-            ux=element.element_displacement_vector[0],
-            uz=element.element_displacement_vector[1],
-            phi_y=element.element_displacement_vector[2],
-        )
-
-        element.node_map[element.node_id2] = Node(
-            id=element.node_id2,
-            Fx=element.element_force_vector[3] + element.element_primary_force_vector[3],
-            Fz=element.element_force_vector[4] + element.element_primary_force_vector[4],
-            Ty=element.element_force_vector[5] + element.element_primary_force_vector[5],
-            ux=element.element_displacement_vector[3],
-            uz=element.element_displacement_vector[4],
-            phi_y=element.element_displacement_vector[5]
-        )
+        The results are stored in `reaction_node_ids` and `reactions`, a (n_supports, 3) array with Fx, Fz, Ty, and
+        as Node objects in the `reaction_forces` dict of the system. The largest unbalanced force of the free degrees of
+        freedom, relative to the largest load, is stored in `equilibrium_residual`.
+        """
+        system = self.system
+        vectors = assembly.element_vectors(system)
+
+        r = np.zeros(system.id_last_node * 3)
+        np.add.at(r, vectors.dofs.ravel(), vectors.force.ravel())
+        r -= system.system_force_vector
+
+        # equilibrium of the free degrees of freedom, including the support springs
+        unbalanced = r.copy()
+        if system.system_spring_map:
+            spring_dofs = np.fromiter(system.system_spring_map.keys(), dtype=int)
+            k = np.fromiter(system.system_spring_map.values(), dtype=float)
+            unbalanced[spring_dofs] += k * system.system_displacement_vector[spring_dofs]
+        unbalanced = unbalanced[~assembly.constrained_dofs(system)]
+        load = np.max(np.abs(system.system_force_vector), initial=0)
+        self.equilibrium_residual = np.max(np.abs(unbalanced), initial=0) / load if load > 0 else 0.
+
+        supports = [node.id for node in system.supports_fixed + system.supports_hinged + system.supports_roll]
+        supports += [node.id for node, _ in system.supports_spring_x + system.supports_spring_z +
+                     system.supports_spring_y]
+        self.reaction_node_ids = np.unique(np.array(supports, dtype=int))
+        self.reactions = r.reshape(-1, 3)[self.reaction_node_ids - 1]
 
         # Local coordinate system. With inclined supports
-        for i in range(1, 3):
-            a_n = getattr(element, 'a{}'.format(i))
-            if a_n != element.angle:
-                node = element.node_map[getattr(element, 'node_id{}'.format(i))]
-                angle = a_n - element.angle
+        for i, node_id in enumerate(self.reaction_node_ids):
+            angle = system.inclined_roll.get(node_id)
+            if angle is not None:
                 c = np.cos(angle)
                 s = np.sin(angle)
-                Fx = node.Fx
-                Fz = node.Fz
-                ux = node.ux
-                uz = node.uz
-                node.Fz = c * Fz + s * Fx
-                node.Fx = -(c * Fx + s * Fz)
-                node.ux = c * ux + s * uz
-                node.uz = c * uz + s * ux
-
-    @staticmethod
-    def determine_axial_force(element):
-        N_1 = (math.sin(element.angle) * element.node_1.Fz) + -(math.cos(element.angle) * element.node_1.Fx)
-        N_2 = -(math.sin(element.angle) * element.node_2.Fz) + (math.cos(element.angle) * element.node_2.Fx)
-
-        element.N_1 = N_1
-        element.N_2 = N_2
-
-    @staticmethod
-    def determine_bending_moment(element, con):
-        dT = -(element.node_2.Ty + element.node_1.Ty)  # T2 - (-T1)
-
-        iteration_factor = np.linspace(0, 1, con)
-        x = iteration_factor * element.l
-        m_val = element.node_1.Ty + iteration_factor * dT
-        if element.all_q_load:
-            q = element.all_q_load
-            q_part = (-0.5 * -q * x ** 2 + 0.5 * -q * element.l * x)
-            m_val += q_part
+                Fx, Fz = self.reactions[i, :2]
+                self.reactions[i, :2] = -(c * Fx + s * Fz), c * Fz + s * Fx
 
-        element.bending_moment = m_val
+        system.reaction_forces.clear()
+        for node_id, (Fx, Fz, Ty) in zip(self.reaction_node_ids.tolist(), self.reactions.tolist()):
+            system.reaction_forces[node_id] = Node(node_id, Fx, Fz, Ty, None, None, None,
+                                                   vertex=system.node_map[node_id].vertex)
 
-    @staticmethod
-    def determine_shear_force(element, con):
+    def determine_axial_force(self):
         """
-        Determines the shear force by differentiating the bending moment.
-        :param element: (object) of the Element class
+        Determines the axial forces N_1 and N_2 of all elements from the forces at the element ends in
+        `element_node_results`.
         """
-        dV = np.diff(element.bending_moment)
-        dx = element.l / (con - 1)
-        shear_force = dV / dx
+        elements = list(self.system.element_map.values())
+        angle = np.array([el.angle for el in elements], dtype=float)
+        s = np.sin(angle)
+        c = np.cos(angle)
+        ends = self.element_node_results
+        N_1 = s * ends[:, 0, 1] - c * ends[:, 0, 0]
+        N_2 = -s * ends[:, 1, 1] + c * ends[:, 1, 0]
+        for el, n1, n2 in zip(elements, N_1.tolist(), N_2.tolist()):
+            el.N_1 = n1
+            el.N_2 = n2
 
-        # Due to differentiation the first and the last values must be corrected.
-        correction = shear_force[1] - shear_force[0]
-        shear_force = np.insert(shear_force, 0, [shear_force[0] - 0.5 * correction])
-        shear_force = np.insert(shear_force, con, [shear_force[-1] + 0.5 * correction])
-        element.shear_force = shear_force
-
-    @staticmethod
-    def determine_displacements(element, con):
+    def element_results(self):
         """
-        Determines the displacement by integrating the bending moment.
-        :param element: (object) of the Element class
-
-        w = -M''
+        Determines the element results for al elements in the system on element level.
 
-        This gives you the formula
+        The axial forces are determined directly. The bending moment, shear force, deflection and extension are
+        determined on first access and cached until the next calculation.
+        """
+        self.determine_axial_force()
+        elements = list(self.system.element_map.values())
+
+        batch = ElementResults(elements, self.system.result_points or self.system.plot_values.mesh,
+                               self.system.result_dtype)
+        for i, el in enumerate(elements):
+            el.reset_results(batch, i)
+        self.results = batch
+
+
+def real_roots(coefficients):
+    """
+    Real roots of a batch of polynomials, determined as the eigenvalues of their companion matrices.
+
+    :param coefficients: (array) Shape (n, degree + 1), highest power first. Leading zeros lower the degree.
+    :return: (array) Shape (n, degree). NaN for roots that don't exist or are complex.
+    """
+    coefficients = np.asarray(coefficients, dtype=float)
+    n, degree = coefficients.shape[0], coefficients.shape[1] - 1
+    roots = np.full((n, degree), np.nan)
+    nonzero = coefficients != 0
+    leading = np.where(np.any(nonzero, axis=1), np.argmax(nonzero, axis=1), degree)
+
+    for lead in range(degree):
+        rows = np.flatnonzero(leading == lead)
+        if rows.size == 0:
+            continue
+        d = degree - lead
+        c = coefficients[rows, lead:]
+        companion = np.zeros((rows.size, d, d))
+        companion[:, 0, :] = -c[:, 1:] / c[:, :1]
+        companion[:, np.arange(1, d), np.arange(d - 1)] = 1
+        r = np.linalg.eigvals(companion)
+        real = np.abs(r.imag) <= 1e-7 * np.maximum(1, np.abs(r.real))
+        roots[rows, :d] = np.where(real, r.real, np.nan)
+    return roots
+
+
+class ElementResults:
+    """
+    Results of all elements of a calculation as (n_elements, mesh) arrays. Every quantity is determined for all
+    elements at once on first access. The results of the elements are views into these arrays.
+    """
+
+    def __init__(self, elements, con, dtype=np.float64):
+        """
+        :param elements: (list) Element objects with the node results of the calculation.
+        :param con: (int) Number of result points along the elements.
+        :param dtype: (np.dtype) Floating point type of the sampled results.
+        """
+        self.con = con
+        self.dtype = dtype
+        data = np.array([(el.l, el.EA, el.EI, el.node_1.Ty, el.node_2.Ty, el.all_q_load, el.N_1, el.N_2)
+                         for el in elements], dtype=float).reshape(-1, 8)
+        self.l, self.EA, self.EI, self.T_1, self.T_2, self.q, self.N_1, self.N_2 = data.T
+        self.general = np.array([el.type == 'general' for el in elements], dtype=bool)
+        self._arrays = {}
+
+    def __deepcopy__(self, memo):
+        # The results are the same for all copies of a calculation and only read, so they are shared.
+        return self
+
+    def __getitem__(self, name):
+        """
+        :param name: (str) 'bending_moment', 'shear_force', 'deflection', 'max_deflection' or 'extension'.
+        :return: (array) The results of all elements.
+        """
+        if name not in self._arrays:
+            if name == 'bending_moment':
+                self._arrays[name] = self.determine_bending_moment().astype(self.dtype, copy=False)
+            elif name == 'shear_force':
+                self._arrays[name] = self.determine_shear_force().astype(self.dtype, copy=False)
+            elif name == 'extension':
+                self._arrays[name] = self.determine_extension().astype(self.dtype, copy=False)
+            elif name == 'extension_start':
+                self._arrays[name] = 0.5 * (self.N_1 + self.N_2) / self.EA * self.l / self.con
+            else:
+                w, self._arrays['max_deflection'] = self.determine_deflection()
+                self._arrays['deflection'] = w.astype(self.dtype, copy=False)
+        return self._arrays[name]
+
+    def element(self, name, index):
+        """
+        :param name: (str) See `__getitem__`.
+        :param index: (int) Row of the element.
+        :return: (array/ flt) The result of one element. None for the deflection of a truss element.
+        """
+        if name in ('deflection', 'max_deflection') and not self.general[index]:
+            return None
+        result = self[name][index]
+        return float(result) if name in ('max_deflection', 'extension_start') else result
 
-        w = -aMx +bx + c
+    def polynomial(self):
+        """
+        Coefficients of the bending moment M(x) = a + b * x + c * x ** 2 along the elements. The moment field is exact
+        for prismatic elements with a uniform perpendicular q-load.
 
-        a = already defined by the integral
-        b = Scale the slope of the parabola. This is the rotation of the deflection. You can think of this as
-            the angle of the deflection beam. By rotating the beam so that the last deflection w = 0 you get the correct
-            value for b. w[-1] = 0.
-        c = Translate the parabola. Translate it so that w[0] = 0
+        :return: (tpl) a, b, c. Arrays with shape (n_elements,)
         """
+        dT = -(self.T_2 + self.T_1)  # T2 - (-T1)
+        return self.T_1, dT / self.l - 0.5 * self.q * self.l, 0.5 * self.q
 
-        if element.type == 'general':
-            dx = element.l / (len(element.bending_moment) - 1)
+    def evaluate(self, name, x):
+        """
+        Evaluate a result field at arbitrary positions along the elements.
 
-            # Take the average of cumulative integration from both sides. This is due to numerical differences, that
-            # would be observable in symmetrical structures.
-            phi_neg = -0.5 * (
-                        integrate_array(element.bending_moment, dx) + integrate_array(element.bending_moment[::-1],
-                                                                                      dx)) / element.EI
-            w = integrate_array(phi_neg, dx)
+        :param name: (str) 'bending_moment', 'shear_force' or 'deflection'.
+        :param x: (flt/ array) Distance from the first node. Either the same positions for all elements, shape (k,),
+                               or positions per element, shape (n_elements, k).
+        :return: (array) Values with shape (n_elements, k). The deflection of truss elements is NaN.
+        """
+        x = np.asarray(x, dtype=float)
+        if x.ndim < 2:
+            x = x.reshape(1, -1)
+        a, b, c = (coefficient[:, None] for coefficient in self.polynomial())
+
+        if name == 'bending_moment':
+            return a + b * x + c * x ** 2
+        elif name == 'shear_force':
+            return b + 2 * c * x + np.zeros_like(a)
+        elif name == 'deflection':
+            # Solution of EI w'' = M with w(0) = w(l) = 0. The deflection is relative to the elements chord.
+            l = self.l[:, None]
+            EI = np.where(self.general, self.EI, np.nan)[:, None]
+            w = a * x ** 2 / 2 + b * x ** 3 / 6 + c * x ** 4 / 12
+            w_l = a * l ** 2 / 2 + b * l ** 3 / 6 + c * l ** 4 / 12
+            return (w - w_l * x / l) / EI
+        raise ValueError("Unknown result field {}".format(name))
+
+    def extrema(self, name):
+        """
+        Exact extremes of a result field and their locations, without sampling the field.
 
-            # Angle between last w and elements axis. The w array will be corrected so that this angle == 0.
-            alpha = np.arctan(w[-1] / element.l)
+        The candidates are the element ends and the stationary points of the field, i.e. the vertex of the bending
+        moment parabola and the real roots of the cubic rotation field for the deflection.
 
-            lx = np.linspace(0, element.l, con)
+        :param name: (str) 'bending_moment', 'shear_force' or 'deflection'.
+        :return: (tpl) minimum, location of the minimum, maximum, location of the maximum. Arrays with shape
+                       (n_elements,). NaN for the deflection of truss elements.
+        """
+        key = 'extrema_' + name
+        if key not in self._arrays:
+            a, b, c = self.polynomial()
+            n = self.l.size
+            if name == 'bending_moment':
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    stationary = np.where(c != 0, -b / (2 * c), np.nan)[:, None]
+            elif name == 'shear_force':
+                stationary = np.empty((n, 0))
+            elif name == 'deflection':
+                # EI w' = a x + b x ** 2 / 2 + c x ** 3 / 3 - w_l / l, see `evaluate`
+                l = self.l
+                w_l = a * l ** 2 / 2 + b * l ** 3 / 6 + c * l ** 4 / 12
+                stationary = real_roots(np.stack((c / 3, b / 2, a, -w_l / l), axis=1))
+            else:
+                raise ValueError("Unknown result field {}".format(name))
+
+            x = np.hstack((np.zeros((n, 1)), self.l[:, None], stationary))
+            x[~((x >= 0) & (x <= self.l[:, None]))] = np.nan
+            values = self.evaluate(name, x)
+            missing = np.all(np.isnan(values), axis=1)
+            rows = np.arange(n)
+
+            i_min = np.argmin(np.where(np.isnan(values), np.inf, values), axis=1)
+            i_max = np.argmax(np.where(np.isnan(values), -np.inf, values), axis=1)
+            result = []
+            for i in (i_min, i_max):
+                result.append(np.where(missing, np.nan, values[rows, i]))
+                result.append(np.where(missing, np.nan, x[rows, i]))
+            self._arrays[key] = tuple(result)
+        return self._arrays[key]
+
+    def determine_bending_moment(self):
+        return self.evaluate('bending_moment', np.linspace(0, 1, self.con) * self.l[:, None])
+
+    def determine_shear_force(self):
+        """
+        The shear force at the first node, between the mesh points and at the last node. This layout has one value more
+        than the mesh.
+        """
+        factor = np.hstack((0, (np.arange(self.con - 1) + 0.5) / (self.con - 1), 1))
+        return self.evaluate('shear_force', factor * self.l[:, None])
 
-            w = w - lx * np.sin(alpha)
-            element.deflection = -w
-            element.max_deflection = np.max(np.abs(w))
+    def determine_deflection(self):
+        """
+        :return: (tpl) deflection (n_elements, mesh), max_deflection (n_elements)
+        """
+        w = self.evaluate('deflection', np.linspace(0, 1, self.con) * self.l[:, None])
+        return w, np.max(np.abs(w), axis=1)
 
-        # Extension
-        u = 0.5 * (element.N_1 + element.N_2) / element.EA * element.l
-        du = u / con
-        element.extension = du * (np.arange(con) + 1)
+    def determine_extension(self):
+        u = 0.5 * (self.N_1 + self.N_2) / self.EA * self.l
+        du = u / self.con
+        return du[:, None] * (np.arange(self.con) + 1)
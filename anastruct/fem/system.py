@@ -1,14 +1,50 @@
-import math, re, collections, copy
+import math, re, collections, copy, functools
 import numpy as np
 from anastruct.basic import FEMException, args_to_lists
 from anastruct.fem.postprocess import SystemLevel as post_sl
-from anastruct.fem.elements import Element
+from anastruct.fem.elements import Element, kinematic_matrices, constitutive_matrices, stiffness_matrices
 from anastruct.vertex import Vertex
 from anastruct.fem import plotter
+from anastruct.fem.util import cache, memory, serialize, instrument
+from anastruct.fem.util.stats import SolveStats, NO_STATS
+import time
 from . import system_components
 from anastruct.vertex import vertex_range
 
 
+# The containers of the state that is shared with snapshots, per part of the model. See SystemElements.snapshot.
+_SHARED_STATE = {
+    'loads': ('loads_point', 'loads_q', 'loads_moment', 'loads_dead_load'),
+    'supports': ('supports_fixed', 'supports_hinged', 'supports_roll', 'supports_spring_x', 'supports_spring_z',
+                 'supports_spring_y', 'supports_roll_direction', 'supports_spring_args', '_supports_by_node',
+                 'inclined_roll', 'system_spring_map'),
+    'model': ('element_map', 'node_map', 'node_element_map', 'non_linear_elements', '_vertices',
+              'system_matrix_locations'),
+    'results': ('reaction_forces',)
+}
+# the parts modified by the methods that change the nodes and elements
+_TOPOLOGY = ('model', 'loads', 'supports')
+
+
+def _modifies(*parts):
+    """
+    Decorator of the methods that modify the model. The parts of the state that are shared with snapshots and
+    modified by the method are copied first.
+
+    :param parts: (str) 'loads', 'supports', 'model' and/ or 'results', see `_SHARED_STATE`.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self._shared:
+                self._unshare(*parts)
+            return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 class SystemElements:
     """
     Modelling any structure starts with an object of this class.
@@ -23,6 +59,11 @@ class SystemElements:
     :ivar loads_q: (dict) Maps element ids to q-loads.
     :ivar loads_moment: (dict) Maps node ids to moment loads.
     :ivar loads_dead_load: (set) Element ids that have a dead load applied.
+    :ivar result_cache: (:class:`.ResultCache`) Opt-in disk cache of solved results. Default is None.
+    :ivar collect_solve_stats: (bool) Record the time per phase of every solve in `last_solve_stats`. Default is False.
+    :ivar last_solve_stats: (:class:`.SolveStats`) Statistics of the last solve, if collected.
+    :ivar non_linear_history: (:class:`.NonLinearHistory`) Convergence history of the last non linear calculation.
+    :ivar hooks: (list) Callbacks that receive the events of the solves, see :mod:`anastruct.fem.util.instrument`.
     """
 
     def __init__(self, figsize=(12, 8), EA=15e3, EI=5e3, load_factor=1, mesh=50):
@@ -39,7 +80,8 @@ class SystemElements:
         """
         # init object
         self.post_processor = post_sl(self)
-        self.plotter = plotter.Plotter(self, mesh)
+        # matplotlib is only imported when the first plot is made, see the plotter property.
+        self._plotter = None
         self.plot_values = plotter.PlottingValues(self, mesh)
 
         # standard values if none provided
@@ -70,6 +112,8 @@ class SystemElements:
 
         # save tuples of the arguments for copying purposes.
         self.supports_spring_args = []
+        # maps node ids to the names of the support lists above that hold the node
+        self._supports_by_node = {}
 
         # keep track of the loads
         self.loads_point = {}  # node ids with a point loads
@@ -85,6 +129,7 @@ class SystemElements:
 
         # previous point of element
         self._previous_point = Vertex(0, 0)
+        self._last_node_id = 0
         self.load_factor = load_factor
 
         # Objects state
@@ -97,6 +142,24 @@ class SystemElements:
         self.reduced_force_vector = None
         self.reduced_system_matrix = None
         self._vertices = {}  # maps vertices to node ids
+        self.result_cache = None  # opt-in ResultCache, see anastruct.fem.util.cache
+        self.collect_solve_stats = False
+        self.last_solve_stats = None
+        self.non_linear_history = None  # NonLinearHistory of the last non linear solve
+        self.hooks = []
+        self._solve_stats = None  # SolveStats of the running solve, shared with nested solves
+        # storage of the sampled element results, see set_result_storage
+        self.result_dtype = np.float64
+        self.result_points = None
+        # Parts of the model changed since the last solve: 'stiffness' and/ or 'supports'. Loads aren't tracked, the
+        # force vector is rebuilt on every solve. If nothing is dirty, solve reuses the factorized system matrix.
+        self._dirty = frozenset(('stiffness', 'supports'))
+        self._lu = None  # LU factorization of the reduced system matrix
+        self._element_vectors = None  # ElementVectors of the current topology
+        self._element_stiffness = None  # (n_elements, 6, 6) stiffness matrices of the assembled system
+        self._shared = frozenset()  # parts of the state that are shared with a snapshot, see snapshot
+        # ids of the nodes and elements copied since the last snapshot. None if no node or element is shared.
+        self._copied = None
 
     @property
     def id_last_element(self):
@@ -106,6 +169,26 @@ class SystemElements:
     def id_last_node(self):
         return max(self.node_map.keys())
 
+    @classmethod
+    def from_arrays(cls, nodes, connectivity, EA=None, EI=None, g=0, springs=None, element_type='general', **kwargs):
+        """
+        Create a model from NumPy arrays in one go. See the `add_elements_bulk` method.
+
+        :param nodes: (array) Node coordinates, shape (n_nodes, 2).
+        :param connectivity: (array) Zero based node indexes of the elements, shape (n_elements, 2).
+        :param EA: (flt/ array) See 'add_elements_bulk' method
+        :param EI: (flt/ array) See 'add_elements_bulk' method
+        :param g: (flt/ array) See 'add_elements_bulk' method
+        :param springs: (array) See 'add_elements_bulk' method
+        :param element_type: (str/ array) See 'add_elements_bulk' method
+        :param kwargs: Passed to the :class:`.SystemElements` constructor.
+        :return: (:class:`.SystemElements`)
+        """
+        system = cls(**kwargs)
+        system.add_elements_bulk(nodes, connectivity, EA, EI, g, springs, element_type)
+        return system
+
+    @_modifies(*_TOPOLOGY)
     def add_element_grid(self, x, y, EA=None, EI=None, g=None, mp=None, spring=None, **kwargs):
         """
         Add multiple elements defined by two containers with coordinates.
@@ -132,9 +215,21 @@ class SystemElements:
         EI = EI * a
         g = g * a
 
+        if mp is None:
+            springs = None
+            if spring is not None:
+                springs = np.full((len(x) - 1, 2), np.nan)
+                for node_no, k in spring.items():
+                    springs[:, node_no - 1] = k
+            connectivity = np.arange(len(x) - 1)[:, None] + np.array([0, 1])
+            self.add_elements_bulk(np.column_stack((x, y)), connectivity, EA[:-1], EI[:-1], g[:-1], springs,
+                                   kwargs.get("element_type", "general"))
+            return
+
         for i in range(len(x) - 1):
             self.add_element([[x[i], y[i]], [x[i + 1], y[i + 1]]], EA[i], EI[i], g[i], mp, spring, **kwargs)
 
+    @_modifies(*_TOPOLOGY)
     def add_truss_element(self, location, EA=None):
         """
         .. highlight:: python
@@ -157,6 +252,7 @@ class SystemElements:
         """
         return self.add_element(location, EA, element_type='truss')
 
+    @_modifies(*_TOPOLOGY)
     def add_element(self, location, EA=None, EI=None, g=0, mp=None, spring=None, **kwargs):
         """
         :param location: (list/ Vertex) The two nodes of the element or the next node of the element.
@@ -211,6 +307,15 @@ class SystemElements:
         self.count += 1
 
         point_1, point_2 = system_components.util.det_vertices(self, location)
+        return self._add_element(self.count, point_1, point_2, EA, EI, g, mp, spring, element_type)
+
+    def _add_element(self, element_id, point_1, point_2, EA, EI, g=0, mp=None, spring=None, element_type='general'):
+        """
+        Create an element between two vertices and register it. An element with the same id is replaced at its
+        position in the element map. The replaced element should already be unregistered from its nodes.
+
+        :return: (int) Elements ID.
+        """
         node_id1, node_id2 = system_components.util.det_node_ids(self, point_1, point_2)
 
         point_1, point_2, node_id1, node_id2, spring, mp, angle = \
@@ -218,9 +323,12 @@ class SystemElements:
 
         system_components.util.append_node_id(self, point_1, point_2, node_id1, node_id2)
         system_components.util.ensure_single_hinge(self, spring, node_id1, node_id2)
+        # the element is registered at its nodes
+        self._own_node(node_id1)
+        self._own_node(node_id2)
 
         # add element
-        element = Element(self.count, EA, EI, (point_2 - point_1).modulus(), angle, point_1, point_2, spring)
+        element = Element(element_id, EA, EI, (point_2 - point_1).modulus(), angle, point_1, point_2, spring)
         element.node_id1 = node_id1
         element.node_id2 = node_id2
         element.node_map = {node_id1: self.node_map[node_id1],
@@ -228,7 +336,7 @@ class SystemElements:
 
         element.type = element_type
 
-        self.element_map[self.count] = element
+        self.element_map[element_id] = element
 
         for node in (node_id1, node_id2):
             if node in self.node_element_map:
@@ -245,9 +353,11 @@ class SystemElements:
             self.non_linear_elements[element.id] = mp
             self.non_linear = True
         system_components.assembly.dead_load(self, g, element.id)
+        self._topology_changed()
 
-        return self.count
+        return element_id
 
+    @_modifies(*_TOPOLOGY)
     def add_multiple_elements(self, location, n=None, dl=None, EA=None, EI=None, g=0, mp=None, spring=None,
                               **kwargs):
         """
@@ -319,14 +429,141 @@ class SystemElements:
                                          element_type=last["element_type"]))
         return elements
 
+    @_modifies(*_TOPOLOGY)
+    def add_elements_bulk(self, nodes, connectivity, EA=None, EI=None, g=0, springs=None, element_type='general'):
+        """
+        Add many elements at once. The inputs are validated, the elements are oriented and the element matrices are
+        computed with vectorized operations, which is much faster than calling `add_element` for every element.
+
+        Plastic moment capacities (mp) are not supported, use `add_element` for those elements.
+
+        :param nodes: (array) Node coordinates, shape (n_nodes, 2). Nodes that coincide with existing nodes are
+                              merged.
+        :param connectivity: (array) Zero based indexes in `nodes` of the first and second node of the elements,
+                                     shape (n_elements, 2).
+        :param EA: (flt/ array) EA per element.
+        :param EI: (flt/ array) EI per element.
+        :param g: (flt/ array) Weight per meter per element. [kN/m] / [N/m]
+        :param springs: (array) Rotational spring stiffness at node 1 and node 2 of every element,
+                                shape (n_elements, 2). NaN means no spring, 0 means a hinge.
+        :param element_type: (str/ array) 'general' or 'truss' per element.
+        :return: (array) Element IDs.
+        """
+        nodes = np.asarray(nodes, dtype=float)
+        connectivity = np.asarray(connectivity)
+        if nodes.ndim != 2 or nodes.shape[1] != 2:
+            raise FEMException("Flawed inputs", "nodes should have the shape (n_nodes, 2).")
+        if connectivity.ndim != 2 or connectivity.shape[1] != 2 or \
+                not np.issubdtype(connectivity.dtype, np.integer):
+            raise FEMException("Flawed inputs", "connectivity should be an integer array with the shape "
+                                                "(n_elements, 2).")
+        if not np.all(np.isfinite(nodes)):
+            raise FEMException("Flawed inputs", "The node coordinates should be finite.")
+        n = len(connectivity)
+        if n == 0:
+            return np.array([], dtype=int)
+        if connectivity.min() < 0 or connectivity.max() >= len(nodes):
+            raise FEMException("Flawed inputs", "connectivity refers to nodes that are not defined.")
+
+        def per_element(name, value, dtype=float):
+            value = np.asarray(value, dtype=dtype)
+            if value.ndim > 1 or value.size not in (1, n):
+                raise FEMException("Flawed inputs", "{} should be a single value or an array with a value per "
+                                                    "element, shape ({},).".format(name, n))
+            return np.broadcast_to(value.reshape(-1), n)
+
+        EA = per_element('EA', self.EA if EA is None else EA)
+        EI = per_element('EI', self.EI if EI is None else EI)
+        g = per_element('g', g)
+        element_type = per_element('element_type', element_type, dtype=None)
+        truss = element_type == 'truss'
+        if not np.all(truss | (element_type == 'general')):
+            raise FEMException("Flawed inputs", "element_type should be 'general' or 'truss'.")
+        EI = np.where(truss, 1e-14, EI)
+
+        if springs is None:
+            springs = np.full((n, 2), np.nan)
+        else:
+            springs = np.array(springs, dtype=float)
+            if springs.size != 2 * n:
+                raise FEMException("Flawed inputs", "springs should have the shape ({}, 2).".format(n))
+            springs = springs.reshape(n, 2)
+
+        # Same precision as the Vertex objects.
+        coordinates = nodes.astype(np.float32)
+        point_1 = coordinates[connectivity[:, 0]]
+        point_2 = coordinates[connectivity[:, 1]]
+        delta = (point_2 - point_1).astype(float)
+        l = np.sqrt(np.sum(delta**2, axis=1))
+        if np.any(l == 0):
+            raise FEMException("Flawed inputs", "Elements {} have a length of zero.".format(
+                (np.flatnonzero(l == 0) + self.count + 1).tolist()))
+
+        # Only register the nodes that are used by an element. Ordered as in `nodes`.
+        used = np.unique(connectivity)
+        node_ids = np.zeros(len(nodes), dtype=int)
+        # Creating many objects triggers the cyclic garbage collector over and over, while none of these objects
+        # can be garbage yet.
+        with system_components.util.gc_paused():
+            node_ids[used] = system_components.util.det_node_ids_bulk(self, coordinates[used])
+        node_ids = node_ids[connectivity]
+
+        previous_point = self.node_map[node_ids[-1, 1]].vertex
+        _, angle = system_components.util.force_elements_orientation_bulk(point_1, point_2, node_ids, springs)
+        system_components.util.ensure_single_hinge_bulk(self, node_ids, springs)
+
+        if self._copied is not None:
+            # the elements are registered at their nodes
+            for node_id in np.unique(node_ids).tolist():
+                self._own_node(node_id)
+
+        kinematic = kinematic_matrices(angle, angle, l)
+        constitutive = constitutive_matrices(EA, EI, l, springs[:, 0], springs[:, 1])
+        stiffness = stiffness_matrices(constitutive, kinematic)
+
+        spring_dicts = [None] * n
+        for i in np.flatnonzero(~np.all(np.isnan(springs), axis=1)).tolist():
+            spring_dicts[i] = {node_no: k for node_no, k in zip((1, 2), springs[i].tolist()) if not math.isnan(k)}
+
+        element_ids = np.arange(self.count + 1, self.count + n + 1)
+        with system_components.util.gc_paused():
+            for id_, EA_, EI_, l_, angle_, (node_id1, node_id2), spring, type_, g_, matrices in zip(
+                    element_ids.tolist(), EA.tolist(), EI.tolist(), l.tolist(), angle.tolist(), node_ids.tolist(),
+                    spring_dicts, element_type.tolist(), g.tolist(), zip(kinematic, constitutive, stiffness)):
+                node_1 = self.node_map[node_id1]
+                node_2 = self.node_map[node_id2]
+
+                element = Element(id_, EA_, EI_, l_, angle_, node_1.vertex, node_2.vertex, spring, matrices=matrices)
+                element.node_id1 = node_id1
+                element.node_id2 = node_id2
+                element.node_map = {node_id1: node_1,
+                                    node_id2: node_2}
+                element.type = type_
+                element.dead_load = g_
+                self.element_map[id_] = element
+
+                for node in (node_1, node_2):
+                    node.elements[id_] = element
+                    if node.id in self.node_element_map:
+                        self.node_element_map[node.id].append(element)
+                    else:
+                        self.node_element_map[node.id] = [element]
+
+        self.loads_dead_load.update(element_ids.tolist())
+        self.count += n
+        self._previous_point = previous_point
+        self._topology_changed()
+        return element_ids
+
+    @_modifies(*_TOPOLOGY)
     def insert_node(self, element_id, location=None, factor=None):
         """
         Insert a node into an existing structure.
         This can be done by adding a new Vertex at any given location, or by setting a factor of the elements
         length. E.g. if you want a node at 40% of the elements length, you pass factor = 0.4.
 
-        Note: this method completely rebuilds the SystemElements object and is therefore slower then building
-        a model with `add_element` methods.
+        The element is split in place, see the `split_element` method. Node and element ids of the rest of the
+        structure don't change.
 
         :param element_id: (int) Id number of the element you want to insert the node.
         :param location: (list/ Vertex) The nodes of the element or the next node of the element.
@@ -340,38 +577,213 @@ class SystemElements:
 
         :param: factor: (flt) Value between 0 and 1 to determine the new node location.
         """
-        ss = SystemElements(EA=self.EA, EI=self.EI, load_factor=self.load_factor,
-                            mesh=self.plotter.mesh)
-
-        for element in self.element_map.values():
-            g = self.element_map[element.id].dead_load
-            mp = self.non_linear_elements[element.id] if element.id in self.non_linear_elements else None
-            if element_id == element.id:
-                if factor is not None:
-                    location = factor * (element.vertex_2 - element.vertex_1) + element.vertex_1
-                else:
-                    location = Vertex(location)
-
-                mp1 = mp2 = spring1 = spring2 = None
-                if mp is not None:
-                    if 1 in mp:
-                        mp1 = {1: mp[1]}
-                    if 2 in mp:
-                        mp2 = {2: mp[2]}
-                if element.springs is not None:
-                    if 1 in element.springs:
-                        spring1 = {1: element.springs[1]}
-                    if 2 in element.springs:
-                        spring2 = {2: element.springs[2]}
-
-                ss.add_element([element.vertex_1, location], EA=element.EA, EI=element.EI, g=g, mp=mp1, spring=spring1)
-                ss.add_element([location, element.vertex_2], EA=element.EA, EI=element.EI, g=g, mp=mp2, spring=spring2)
+        self.split_element(element_id, location, factor)
+
+    @_modifies(*_TOPOLOGY)
+    def split_element(self, element_id, location=None, factor=None):
+        """
+        Split an element in two at a new node. The first part keeps the element id, the second part gets a new id.
+        The element's properties, springs, plastic capacities and loads are passed on to both parts. Only the split
+        element is touched, so the cost doesn't depend on the size of the structure.
+
+        :param element_id: (int) Id number of the element you want to split.
+        :param location: (list/ Vertex) Location of the new node.
+        :param factor: (flt) Value between 0 and 1 to determine the new node location.
+        :return: (tpl) Node ID of the new node, element ID of the second part.
+        """
+        element_id = _negative_index_to_id(element_id, self.element_map.keys())
+        element = self.element_map[element_id]
+        if factor is not None:
+            location = factor * (element.vertex_2 - element.vertex_1) + element.vertex_1
+        else:
+            location = Vertex(location)
+        if location == element.vertex_1 or location == element.vertex_2:
+            raise FEMException("Flawed inputs", "The new node cannot coincide with the nodes of the element.")
 
+        mp = self.non_linear_elements.get(element_id, {})
+        springs = element.springs if element.springs is not None else {}
+        self._unregister_element(element)
+        self.count += 1
+        new_id = self.count
+
+        for id_, point_1, point_2, node_no in ((element_id, element.vertex_1, location, 1),
+                                               (new_id, location, element.vertex_2, 2)):
+            self.non_linear_elements.pop(id_, None)
+            self._add_element(id_, point_1, point_2, element.EA, element.EI, element.dead_load,
+                              {node_no: mp[node_no]} if node_no in mp else None,
+                              {node_no: springs[node_no]} if node_no in springs else None,
+                              element.type)
+            if element_id in self.loads_q:
+                self.loads_q[id_] = self.loads_q[element_id]
+                self.element_map[id_].q_load = element.q_load
+                self.element_map[id_].q_direction = element.q_direction
+        self.non_linear = len(self.non_linear_elements) > 0
+
+        return self._vertices[tuple(location.coordinates.tolist())], new_id
+
+    @_modifies(*_TOPOLOGY)
+    def remove_element(self, element_id):
+        """
+        Remove an element from the structure. Nodes that are no longer connected to any element are removed
+        together with their loads and supports. The ids of the other nodes and elements don't change.
+
+        :param element_id: (int) Id number of the element you want to remove.
+        """
+        element_id = _negative_index_to_id(element_id, self.element_map.keys())
+        element = self.element_map.pop(element_id)
+        self._unregister_element(element)
+        self.loads_q.pop(element_id, None)
+        self.loads_dead_load.discard(element_id)
+        self.non_linear_elements.pop(element_id, None)
+        self.non_linear = len(self.non_linear_elements) > 0
+
+        for node_id in (element.node_id1, element.node_id2):
+            if node_id not in self.node_element_map:
+                self._remove_node(node_id)
+        self._topology_changed()
+
+    @_modifies(*_TOPOLOGY)
+    def merge_nodes(self, node_id, other_node_id):
+        """
+        Merge a node into another node. The elements connected to `other_node_id` are reconnected to `node_id`,
+        which takes over its loads and supports. Elements between the two nodes are removed. Only the elements
+        connected to the merged node are touched.
+
+        :param node_id: (int) Id of the node that remains.
+        :param other_node_id: (int) Id of the node that is merged and removed.
+        :return: (int) Id of the remaining node.
+        """
+        node_id = _negative_index_to_id(node_id, self.node_map.keys())
+        other_node_id = _negative_index_to_id(other_node_id, self.node_map.keys())
+        if node_id == other_node_id:
+            return node_id
+        node = self._own_node(node_id)
+        other = self._own_node(other_node_id)
+
+        connecting = []
+        for element in list(other.elements.values()):
+            if node_id in (element.node_id1, element.node_id2):
+                connecting.append(element.id)
+                continue
+            if element.node_id1 == other_node_id:
+                points = (node.vertex, element.vertex_2)
             else:
-                ss.add_element([element.vertex_1, element.vertex_2], EA=element.EA,
-                               EI=element.EI, g=g, mp=mp, spring=element.springs)
-        self.__dict__ = ss.__dict__.copy()
+                points = (element.vertex_1, node.vertex)
+            self._unregister_element(element)
+            self._add_element(element.id, *points, element.EA, element.EI, element.dead_load,
+                              self.non_linear_elements.pop(element.id, None),
+                              None if element.springs is None else dict(element.springs), element.type)
+            self.element_map[element.id].q_load = element.q_load
+            self.element_map[element.id].q_direction = element.q_direction
+        for element_id in connecting:
+            self.remove_element(element_id)
+        if node_id not in self.node_map:
+            # There were no other elements at the nodes.
+            return None
 
+        # loads
+        if other_node_id in self.loads_point:
+            Fx, Fz = self.loads_point.pop(other_node_id)
+            Fx0, Fz0 = self.loads_point.get(node_id, (0, 0))
+            self.loads_point[node_id] = (Fx0 + Fx, Fz0 + Fz)
+        if other_node_id in self.loads_moment:
+            self.loads_moment[node_id] = self.loads_moment.get(node_id, 0) + self.loads_moment.pop(other_node_id)
+
+        # supports
+        for name in self._supports_by_node.pop(other_node_id, ()):
+            supports = getattr(self, name)
+            for i, entry in enumerate(supports):
+                if name == 'supports_spring_args':
+                    if entry[0] == other_node_id:
+                        supports[i] = (node_id,) + entry[1:]
+                elif name in ('supports_spring_x', 'supports_spring_z', 'supports_spring_y'):
+                    if entry[0] is other:
+                        supports[i] = (node, entry[1])
+                elif entry is other:
+                    supports[i] = node
+            self._register_support(name, node_id)
+        if other_node_id in self.inclined_roll:
+            self.inclined_roll[node_id] = self.inclined_roll.pop(other_node_id)
+        for translation in range(3):
+            k = self.system_spring_map.pop((other_node_id - 1) * 3 + translation, None)
+            if k is not None:
+                self.system_spring_map[(node_id - 1) * 3 + translation] = k
+
+        if other_node_id in self.node_map:
+            self._remove_node(other_node_id)
+        self._topology_changed()
+        return node_id
+
+    def _unregister_element(self, element):
+        """
+        Remove the element from the node registers. Nodes without elements are removed from the node element map.
+        """
+        for node_id in (element.node_id1, element.node_id2):
+            self._own_node(node_id).elements.pop(element.id, None)
+            elements = self.node_element_map[node_id]
+            elements.remove(element)
+            if len(elements) == 0:
+                del self.node_element_map[node_id]
+
+    def _remove_node(self, node_id):
+        """
+        Remove a node, and its loads and supports, from the structure.
+        """
+        node = self.node_map.pop(node_id)
+        del self._vertices[tuple(node.vertex.coordinates.tolist())]
+        self.loads_point.pop(node_id, None)
+        self.loads_moment.pop(node_id, None)
+        self.inclined_roll.pop(node_id, None)
+
+        for translation in range(3):
+            self.system_spring_map.pop((node_id - 1) * 3 + translation, None)
+
+        # only the support lists that hold the node
+        for name in self._supports_by_node.pop(node_id, ()):
+            supports = getattr(self, name)
+            if name == 'supports_spring_args':
+                self.supports_spring_args = [args for args in supports if args[0] != node_id]
+            elif name == 'supports_roll':
+                self.supports_roll_direction = [d for n, d in zip(supports, self.supports_roll_direction)
+                                                if n is not node]
+                self.supports_roll = [n for n in supports if n is not node]
+            elif name in ('supports_fixed', 'supports_hinged'):
+                setattr(self, name, [n for n in supports if n is not node])
+            else:
+                setattr(self, name, [(n, roll) for n, roll in supports if n is not node])
+
+    def _register_support(self, name, node_id):
+        """
+        Register that a support list holds the node, see `_supports_by_node`.
+
+        :param name: (str) Name of the support list, e.g. 'supports_fixed'.
+        :param node_id: (int)
+        """
+        # A new set, shallow copies of the system must keep their own index.
+        self._supports_by_node[node_id] = self._supports_by_node.get(node_id, frozenset()).union((name,))
+
+    def _invalidate(self, *parts):
+        """
+        Mark parts of the model as changed since the last solve. The next solve rebuilds the system matrix.
+
+        :param parts: (str) 'stiffness' and/ or 'supports'.
+        """
+        # A new set instead of an in place update, shallow copies of the system must keep their own state.
+        self._dirty = self._dirty.union(parts)
+
+    def _topology_changed(self):
+        """
+        Invalidate the state that depends on the nodes and elements of the structure.
+        """
+        self._invalidate('stiffness', 'supports')
+        self.system_displacement_vector = None
+        self._element_vectors = None
+        self.post_processor.reset_bindings()
+        for p in (self._plotter, self.plot_values):
+            if p is not None:
+                p._max_val_structure = None
+
+    @_modifies('model', 'results')
     def solve(self, force_linear=False, verbosity=0, max_iter=200, geometrical_non_linear=False, **kwargs):
 
         """
@@ -388,65 +800,138 @@ class SystemElements:
             :param naked: (bool) Whether or not to run the solve function without doing post processing.
             :param discretize_kwargs: When doing a geometric non linear analysis you can reduce or increase the number
                                       of elements created that are used for determining the buckling_factor
-        """
 
+        Non linear **kwargs:
+            :param stall_iter: (int) Stop the iterations when the convergence didn't improve in this many iterations.
+            :param collapse_ratio: (flt) Stop the iterations when the displacements exceed the linear elastic
+                                   displacements this many times. Default is 100, None doesn't check for a collapse.
+            :param damp_oscillations: (bool) Damp the stiffness updates of oscillating hinges. Default is True.
+            :param accelerate: (str) Acceleration of the stiffness updates, None or 'aitken'. Default is None.
+        """
+        if self._solve_stats is not None or not (self.collect_solve_stats or instrument.active(self)):
+            return self._solve(force_linear, verbosity, max_iter, geometrical_non_linear, **kwargs)
+
+        # Nested solves, also of the copies made for the buckling analysis, add to the same statistics and events.
+        hooks = self.hooks or instrument.HOOKS
+        stats = self._solve_stats = SolveStats(functools.partial(instrument.emit, self) if hooks else None)
+        stats.emit('solve_start', elements=len(self.element_map), nodes=len(self.node_map))
+        t0 = time.perf_counter()
+        try:
+            if instrument.PROFILE_DIRECTORY:
+                with instrument.profile(instrument.profile_path()):
+                    return self._solve(force_linear, verbosity, max_iter, geometrical_non_linear, **kwargs)
+            return self._solve(force_linear, verbosity, max_iter, geometrical_non_linear, **kwargs)
+        finally:
+            stats.total = time.perf_counter() - t0
+            if self.system_matrix is not None:
+                stats.matrix_size = self.system_matrix.shape[0]
+                stats.nonzeros = int(np.count_nonzero(self.system_matrix))
+            if self.reduced_system_matrix is not None:
+                stats.reduced_size = self.reduced_system_matrix.shape[0]
+            self._solve_stats = None
+            if self.collect_solve_stats:
+                self.last_solve_stats = stats
+            stats.emit('solve_end', **stats.as_dict())
+
+    def _solve(self, force_linear, verbosity, max_iter, geometrical_non_linear, **kwargs):
         # kwargs: arguments for the iterative solver callers such as the _stiffness_adaptation method.
         #                naked (bool) Default = False, if True force lines won't be computed.
+        stats = self._solve_stats or NO_STATS
 
-        if self.system_displacement_vector is None:
-            system_components.assembly.process_supports(self)
+        if self.system_displacement_vector is None or self._dirty:
+            # the support conditions are processed on a clean displacement vector
+            self.system_displacement_vector = None
+            with stats.phase('supports'):
+                system_components.assembly.process_supports(self)
 
         naked = kwargs.get("naked", False)
 
-        if not naked:
-            if not self.validate():
+        result_cache = self.result_cache
+        if result_cache is not None and not naked:
+            with stats.phase('cache'):
+                key = self.fingerprint(force_linear=force_linear, max_iter=max_iter,
+                                       geometrical_non_linear=geometrical_non_linear, **kwargs)
+                hit = result_cache.load(self, key)
+            if hit:
+                return self.system_displacement_vector
+
+            # nested solves (e.g. geometrical non linear) shouldn't hit the cache.
+            self.result_cache = None
+            try:
+                self.solve(force_linear, verbosity, max_iter, geometrical_non_linear, **kwargs)
+            finally:
+                self.result_cache = result_cache
+            with stats.phase('cache'):
+                result_cache.store(self, key)
+            return self.system_displacement_vector
+
+        # The stability only depends on the stiffness and the supports.
+        if not naked and self._dirty:
+            with stats.phase('validation'):
+                stable = self.validate()
+            if not stable:
                 if all(['general' in element.type for element in self.element_map.values()]):
                     raise FEMException('StabilityError', 'The eigenvalues of the stiffness matrix are non zero, '
                                                          'which indicates a instable structure. '
                                                          'Check your support conditions')
 
-        # (Re)set force vectors
-        for el in self.element_map.values():
-            el.reset()
-        system_components.assembly.prep_matrix_forces(self)
+        with stats.phase('force_vector'):
+            # (Re)set force vectors
+            vectors = system_components.assembly.element_vectors(self)
+            vectors.displacement[:] = 0
+            vectors.primary_force[:] = 0
+            system_components.assembly.prep_matrix_forces(self)
         assert (self.system_force_vector is not None), "There are no forces on the structure"
 
         if self.non_linear and not force_linear:
-            return system_components.solver.stiffness_adaptation(self, verbosity, max_iter)
+            options = {k: kwargs[k] for k in ('stall_iter', 'collapse_ratio', 'damp_oscillations', 'accelerate')
+                       if k in kwargs}
+            system_components.solver.stiffness_adaptation(self, verbosity, max_iter, **options)
+            # the stiffness of the non linear elements is adapted
+            self._invalidate('stiffness')
+            return self.system_displacement_vector
 
-        system_components.assembly.assemble_system_matrix(self)
         if geometrical_non_linear:
+            with stats.phase('assembly'):
+                system_components.assembly.assemble_system_matrix(self)
             discretize_kwargs = kwargs.get('discretize_kwargs', None)
             self.buckling_factor = system_components.solver.geometrically_non_linear(self, verbosity,
                                                                                      discretize_kwargs=discretize_kwargs)
+            self._invalidate('stiffness')
             return self.system_displacement_vector
 
-        system_components.assembly.process_conditions(self)
+        if self._dirty or self._lu is None:
+            with stats.phase('assembly'):
+                system_components.assembly.assemble_system_matrix(self)
+            with stats.phase('process_conditions'):
+                system_components.assembly.process_conditions(self)
+            with stats.phase('factorization'):
+                self._lu = _linalg().lu_factor(self.reduced_system_matrix)
+            self._dirty = frozenset()
+        else:
+            # Only the loads have changed. Reuse the factorized system matrix.
+            self.reduced_force_vector = self.system_force_vector[self._remainder_indexes]
 
-        # solution of the reduced system (reduced due to support conditions)
-        reduced_displacement_vector = np.linalg.solve(self.reduced_system_matrix, self.reduced_force_vector)
+        with stats.phase('linear_solve'):
+            # solution of the reduced system (reduced due to support conditions)
+            reduced_displacement_vector = _linalg().lu_solve(self._lu, self.reduced_force_vector)
 
-        # add the solution of the reduced system in the complete system displacement vector
-        self.system_displacement_vector = np.zeros(self.shape_system_matrix)
-        np.put(self.system_displacement_vector, self._remainder_indexes, reduced_displacement_vector)
+        with stats.phase('element_forces'):
+            # add the solution of the reduced system in the complete system displacement vector
+            self.system_displacement_vector = np.zeros(self.shape_system_matrix)
+            np.put(self.system_displacement_vector, self._remainder_indexes, reduced_displacement_vector)
 
-        # determine the displacement vector of the elements
-        for el in self.element_map.values():
-            index_node_1 = (el.node_1.id - 1) * 3
-            index_node_2 = (el.node_2.id - 1) * 3
-
-            # node 1 ux, uz, phi
-            el.element_displacement_vector[:3] = self.system_displacement_vector[index_node_1: index_node_1 + 3]
-            # node 2 ux, uz, phi
-            el.element_displacement_vector[3:] = self.system_displacement_vector[index_node_2: index_node_2 + 3]
-            el.determine_force_vector()
+            # determine the displacement and force vectors of all elements at once
+            vectors.displacement[:] = self.system_displacement_vector[vectors.dofs]
+            np.matmul(self._element_stiffness, vectors.displacement[:, :, None], out=vectors.force[:, :, None])
 
         if not naked:
-            # determining the node results in post processing class
-            self.post_processor.node_results_elements()
-            self.post_processor.node_results_system()
-            self.post_processor.reaction_forces()
-            self.post_processor.element_results()
+            with stats.phase('post_processing'):
+                # determining the node results in post processing class
+                self.post_processor.node_results_elements()
+                self.post_processor.node_results_system()
+                self.post_processor.reaction_forces()
+                self.post_processor.element_results()
 
             # check the values in the displacement vector for extreme values, indicating a flawed calculation
             assert (np.any(self.system_displacement_vector < 1e6)), "The displacements of the structure exceed 1e6. " \
@@ -455,6 +940,63 @@ class SystemElements:
 
         return self.system_displacement_vector
 
+    def fingerprint(self, **options):
+        """
+        Deterministic fingerprint of the model. Covers the geometry, stiffness, supports, springs and loads.
+
+        :param options: Solve options that should be part of the fingerprint.
+        :return: (str) Hexadecimal sha256 digest.
+        """
+        return cache.fingerprint(self, **options)
+
+    def save(self, path, results=False, compressed=False):
+        """
+        Save the model in a binary .npz file: geometry, element properties and matrices, supports and loads.
+
+        :param path: (str) File path.
+        :param results: (bool) Include the results of the last calculation.
+        :param compressed: (bool) Compress the arrays. Smaller files, but slower to save and load.
+        """
+        serialize.save(self, path, results, compressed)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a model saved with :meth:`save`. The elements are restored from their arrays, `add_element` is not
+        replayed.
+
+        :param path: (str) File path.
+        :return: (:class:`.SystemElements`)
+        """
+        return serialize.load(path, cls)
+
+    def set_result_storage(self, dtype=np.float64, points=None):
+        """
+        Set how the sampled element results (bending moment, shear force, deflection and extension) are stored. A lower
+        precision or less result points save memory in large models and load combinations. The calculation, the
+        node results and the exact extremes of :meth:`get_element_results` are not affected.
+
+        :param dtype: (np.dtype) Floating point type of the stored results, e.g. np.float32.
+        :param points: (int) Number of result points along the elements. None uses the plotting mesh, 2 stores the
+                             end values only.
+        """
+        if np.dtype(dtype).kind != 'f':
+            raise FEMException('Wrong parameters', 'The result storage dtype should be a floating point type.')
+        if points is not None and (int(points) != points or points < 2):
+            raise FEMException('Wrong parameters', 'At least 2 result points are needed, the values at the ends.')
+        self.result_dtype = np.dtype(dtype).type
+        self.result_points = None if points is None else int(points)
+
+    def memory_footprint(self):
+        """
+        Estimate the memory of the model by component, e.g. to size batch runs.
+
+        :return: (dict) Bytes per component: 'system_matrix', 'element_matrices', 'element_vectors',
+                        'element_results', 'node_results', 'objects' and the 'total'. The element results are
+                        estimated as if all of them are accessed.
+        """
+        return memory.footprint(self)
+
     def validate(self, min_eigen=1e-9):
         """
         Validate the stability of the stiffness matrix.
@@ -475,6 +1017,7 @@ class SystemElements:
         w, _ = np.linalg.eig(ss.reduced_system_matrix)
         return np.all(w > min_eigen)
 
+    @_modifies('supports')
     def add_support_hinged(self, node_id):
         """
         Model a hinged support at a given node.
@@ -490,7 +1033,10 @@ class SystemElements:
 
             # add the support to the support list for the plotter
             self.supports_hinged.append(self.node_map[id_])
+            self._register_support('supports_hinged', id_)
+        self._invalidate('supports')
 
+    @_modifies('supports')
     def add_support_roll(self, node_id, direction='x', angle=None):
         """
         Adds a rolling support at a given node.
@@ -519,7 +1065,10 @@ class SystemElements:
             # add the support to the support list for the plotter
             self.supports_roll.append(self.node_map[id_])
             self.supports_roll_direction.append(direction)
+            self._register_support('supports_roll', id_)
+        self._invalidate('supports')
 
+    @_modifies('supports')
     def add_support_fixed(self, node_id):
         """
         Add a fixed support at a given node.
@@ -535,7 +1084,10 @@ class SystemElements:
 
             # add the support to the support list for the plotter
             self.supports_fixed.append(self.node_map[id_])
+            self._register_support('supports_fixed', id_)
+        self._invalidate('supports')
 
+    @_modifies('supports')
     def add_support_spring(self, node_id, translation, k, roll=False):
         """
         Add a translational support at a given node.
@@ -571,12 +1123,17 @@ class SystemElements:
 
             # add the support to the support list for the plotter
             if translation == 1:
-                self.supports_spring_x.append((self.node_map[id_], roll))
+                name = 'supports_spring_x'
             elif translation == 2:
-                self.supports_spring_z.append((self.node_map[id_], roll))
+                name = 'supports_spring_z'
             else:
-                self.supports_spring_y.append((self.node_map[id_], roll))
+                name = 'supports_spring_y'
+            getattr(self, name).append((self.node_map[id_], roll))
+            self._register_support(name, id_)
+            self._register_support('supports_spring_args', id_)
+        self._invalidate('stiffness', 'supports')
 
+    @_modifies('loads', 'model')
     def q_load(self, q, element_id, direction="element"):
         """
         Apply a q-load to an element.
@@ -589,12 +1146,13 @@ class SystemElements:
 
         for i in range(len(element_id)):
             id_ = _negative_index_to_id(element_id[i], self.element_map.keys())
-            self.plotter.max_q = max(self.plotter.max_q, abs(q[i]))
+            self.plot_values.max_q = max(self.plot_values.max_q, abs(q[i]))
             self.loads_q[id_] = q[i] * self.orientation_cs * self.load_factor
-            el = self.element_map[id_]
+            el = self._own_element(id_)
             el.q_load = q[i] * self.orientation_cs * self.load_factor
             el.q_direction = direction[i]
 
+    @_modifies('loads')
     def point_load(self, node_id, Fx=0, Fy=0, rotation=0):
         """
         Apply a point load to a node.
@@ -608,12 +1166,13 @@ class SystemElements:
 
         for i in range(len(node_id)):
             id_ = _negative_index_to_id(node_id[i], self.node_map.keys())
-            self.plotter.max_system_point_load = max(self.plotter.max_system_point_load,
-                                                     (Fx[i] ** 2 + Fy[i] ** 2) ** 0.5)
+            self.plot_values.max_system_point_load = max(self.plot_values.max_system_point_load,
+                                                         (Fx[i] ** 2 + Fy[i] ** 2) ** 0.5)
             cos = math.cos(math.radians(rotation[i]))
             sin = math.sin(math.radians(rotation[i]))
             self.loads_point[id_] = (Fx[i] * cos + Fy[i] * sin, Fy[i] * self.orientation_cs * cos + Fx[i] * sin)
 
+    @_modifies('loads')
     def moment_load(self, node_id, Ty):
         """
         Apply a moment on a node.
@@ -814,11 +1373,14 @@ class SystemElements:
                 result_list.append((node.id, -node.ux, node.uz, node.phi_y))
         return result_list
 
-    def get_element_results(self, element_id=0, verbose=False):
+    def get_element_results(self, element_id=0, verbose=False, extrema=False):
         """
         :param element_id: (int) representing the elements ID. If elementID = 0 the results of all elements are returned.
         :param verbose: (bool) If set to True the numerical results for the deflection and the bending moments are
                                returned.
+        :param extrema: (bool) Determine the exact extremes of the bending moment, shear force and deflection and
+                               their locations analytically, instead of from the sampled results. The sampled
+                               results are not computed, `verbose` is ignored.
 
         :return:
         |
@@ -834,23 +1396,50 @@ class SystemElements:
         |
 
         """
-        if element_id != 0:
-            element_id = _negative_index_to_id(element_id, self.element_map)
-            el = self.element_map[element_id]
+        def results(el):
+            if extrema:
+                u = el.extension_start
+            else:
+                u = el.extension[0]
+
             if el.type == "truss":
                 return {
                     "id": el.id,
                     "length": el.l,
-                    "alpha": el.ai,
-                    "u": el.extension[0],
+                    "alpha": el.angle,
+                    "u": u,
                     "N": el.N_1,
                 }
+            elif extrema:
+                w_max, x_w_max, w_min, x_w_min = el.extrema("deflection")
+                M_min, x_M_min, M_max, x_M_max = el.extrema("bending_moment")
+                V_min, x_V_min, V_max, x_V_max = el.extrema("shear_force")
+                return {
+                    "id": el.id,
+                    "length": el.l,
+                    "alpha": el.angle,
+                    "u": u,
+                    "N": el.N_1,
+                    "wmax": w_max,
+                    "x_wmax": x_w_max,
+                    "wmin": w_min,
+                    "x_wmin": x_w_min,
+                    "Mmin": M_min,
+                    "x_Mmin": x_M_min,
+                    "Mmax": M_max,
+                    "x_Mmax": x_M_max,
+                    "Vmin": V_min,
+                    "x_Vmin": x_V_min,
+                    "Vmax": V_max,
+                    "x_Vmax": x_V_max,
+                    "q": el.q_load
+                }
             else:
                 return {
                     "id": el.id,
                     "length": el.l,
-                    "alpha": el.ai,
-                    "u": el.extension[0],
+                    "alpha": el.angle,
+                    "u": u,
                     "N": el.N_1,
                     "wmax": np.min(el.deflection),
                     "wmin": np.max(el.deflection),
@@ -860,38 +1449,12 @@ class SystemElements:
                     "M": el.bending_moment if verbose else None,
                     "q": el.q_load
                 }
+
+        if element_id != 0:
+            element_id = _negative_index_to_id(element_id, self.element_map)
+            return results(self.element_map[element_id])
         else:
-            result_list = []
-            for el in self.element_map.values():
-
-                if el.type == "truss":
-                    result_list.append({
-                        "id": el.id,
-                        "length": el.l,
-                        "alpha": el.ai,
-                        "u": el.extension[0],
-                        "N": el.N_1,
-                    }
-                    )
-
-                else:
-                    result_list.append(
-                        {
-                            "id": el.id,
-                            "length": el.l,
-                            "alpha": el.ai,
-                            "u": el.extension[0],
-                            "N": el.N_1,
-                            "wmax": np.min(el.deflection),
-                            "wmin": np.max(el.deflection),
-                            "w": el.deflection if verbose else None,
-                            "Mmin": np.min(el.bending_moment),
-                            "Mmax": np.max(el.bending_moment),
-                            "M": el.bending_moment if verbose else None,
-                            "q": el.q_load
-                        }
-                    )
-            return result_list
+            return [results(el) for el in self.element_map.values()]
 
     def get_element_result_range(self, unit):
         """
@@ -904,12 +1467,13 @@ class SystemElements:
 
         :return: (list)
         """
+        results = self.post_processor.results
         if unit == "shear":
-            return [el.shear_force[0] for el in self.element_map.values()]
+            return results['shear_force'][:, 0].tolist()
         elif unit == "moment":
-            return [el.bending_moment[0] for el in self.element_map.values()]
+            return results['bending_moment'][:, 0].tolist()
         elif unit == "axial":
-            return [el.N_1 for el in self.element_map.values()]
+            return results.N_1.tolist()
 
     def get_node_result_range(self, unit):
         """
@@ -921,12 +1485,80 @@ class SystemElements:
             - 'phi_y'
         :return: (list)
         """
+        results = self._node_result_rows()
         if unit == "uy":
-            return [node.uz for node in self.node_map.values()]  # - * -  = +
+            return results[:, 4].tolist()  # - * -  = +
         elif unit == "ux":
-            return [-node.ux for node in self.node_map.values()]
+            return (-results[:, 3]).tolist()
         elif unit == "phi_y":
-            return [node.phi_y for node in self.node_map.values()]
+            return results[:, 5].tolist()
+
+    def _node_result_rows(self):
+        """
+        :return: (array) Shape (n_nodes, 6). Fx, Fz, Ty, ux, uz, phi_y of the nodes in the `node_map` on the system
+                         level.
+        """
+        ids = np.fromiter(self.node_map.keys(), dtype=int, count=len(self.node_map))
+        if self.post_processor.node_results is None:
+            return np.array([[node.Fx, node.Fz, node.Ty, node.ux, node.uz, node.phi_y]
+                             for node in self.node_map.values()], dtype=float).reshape(-1, 6)
+        return self.post_processor.node_results[ids - 1]
+
+    def get_node_result_arrays(self, dataframe=False):
+        """
+        Columnar counterpart of :meth:`get_node_results_system`. The results of all nodes, in the order of the
+        `node_map`, with the same sign convention.
+
+        :param dataframe: (bool) Return a pandas DataFrame indexed by the node ids. Requires pandas.
+        :return: (dict) Arrays 'id', 'Fx', 'Fy', 'Ty', 'ux', 'uy', 'phi_y'.
+        """
+        results = self._node_result_rows()
+        columns = {
+            "id": np.fromiter(self.node_map.keys(), dtype=int, count=len(self.node_map)),
+            "Fx": results[:, 0],
+            "Fy": -results[:, 1],
+            "Ty": results[:, 2],
+            "ux": results[:, 3],
+            "uy": -results[:, 4],
+            "phi_y": results[:, 5]
+        }
+        return _result_columns(columns, dataframe)
+
+    def get_element_result_arrays(self, extrema=False, dataframe=False):
+        """
+        Columnar counterpart of :meth:`get_element_results`. The results of all elements, in the order of the
+        `element_map`, with the same keys. The deflection results of truss elements are NaN.
+
+        :param extrema: (bool) Determine the exact extremes and their locations analytically. See
+                               :meth:`get_element_results`.
+        :param dataframe: (bool) Return a pandas DataFrame indexed by the element ids. Requires pandas.
+        :return: (dict) Arrays 'id', 'length', 'alpha', 'u', 'N', 'q', 'wmax', 'wmin', 'Mmin', 'Mmax' and with
+                        `extrema` also 'x_wmax', 'x_wmin', 'x_Mmin', 'x_Mmax', 'Vmin', 'x_Vmin', 'Vmax', 'x_Vmax'.
+        """
+        results = self.post_processor.results
+        elements = self.element_map.values()
+        n = len(elements)
+        columns = {
+            "id": np.fromiter(self.element_map.keys(), dtype=int, count=n),
+            "length": results.l,
+            "alpha": np.fromiter((el.angle for el in elements), dtype=float, count=n),
+            "u": results['extension_start'] if extrema else results['extension'][:, 0],
+            "N": results.N_1,
+            "q": np.fromiter((el.q_load for el in elements), dtype=float, count=n)
+        }
+        if extrema:
+            columns["wmax"], columns["x_wmax"], columns["wmin"], columns["x_wmin"] = results.extrema("deflection")
+            columns["Mmin"], columns["x_Mmin"], columns["Mmax"], columns["x_Mmax"] = \
+                results.extrema("bending_moment")
+            columns["Vmin"], columns["x_Vmin"], columns["Vmax"], columns["x_Vmax"] = results.extrema("shear_force")
+        else:
+            deflection = results['deflection']
+            moment = results['bending_moment']
+            columns["wmax"] = np.min(deflection, axis=1)
+            columns["wmin"] = np.max(deflection, axis=1)
+            columns["Mmin"] = np.min(moment, axis=1)
+            columns["Mmax"] = np.max(moment, axis=1)
+        return _result_columns(columns, dataframe)
 
     def find_node_id(self, vertex):
         """
@@ -979,50 +1611,20 @@ class SystemElements:
         else:
             return np.argmin(np.abs(np.array(self.nodes_range(dimension)) - val))
 
+    @_modifies(*_TOPOLOGY)
     def discretize(self, n=10):
         """
         Takes an already defined :class:`.SystemElements` object and increases the number of elements.
+        The elements are split in place, the ids of the existing nodes and elements don't change.
 
         :param n: (int) Divide the elements into n sub-elements.
         """
-        ss = SystemElements(EA=self.EA, EI=self.EI, load_factor=self.load_factor,
-                            mesh=self.plotter.mesh)
-
-        for element in self.element_map.values():
-            g = self.element_map[element.id].dead_load
-            mp = self.non_linear_elements[element.id] if element.id in self.non_linear_elements else None
-
-            for i, v in enumerate(vertex_range(element.vertex_1, element.vertex_2, n)):
-                if i == 0:
-                    last_v = v
-                    continue
-
-                loc = [last_v, v]
-                ss.add_element(loc, EA=element.EA, EI=element.EI, g=g, mp=mp, spring=element.springs)
-                last_v = v
-
-        # supports
-        for node, direction in zip(self.supports_roll, self.supports_roll_direction):
-            ss.add_support_roll((node.id - 1) * n + 1, direction)
-        for node in self.supports_fixed:
-            ss.add_support_fixed((node.id - 1) * n + 1)
-        for node in self.supports_hinged:
-            ss.add_support_hinged((node.id - 1) * n + 1)
-        for args in self.supports_spring_args:
-            ss.add_support_spring((args[0] - 1) * n + 1, *args[1:])
-
-        # loads
-        for node_id, forces in self.loads_point.items():
-            ss.point_load((node_id - 1) * n + 1, Fx=forces[0], Fy=forces[1] / self.orientation_cs)
-        for node_id, forces in self.loads_moment.items():
-            ss.moment_load((node_id - 1) * n + 1, forces)
-        for element_id, forces in self.loads_q.items():
-            ss.q_load(q=forces / self.orientation_cs / self.load_factor,
-                      element_id=element_id,
-                      direction=self.element_map[element_id].q_direction)
-
-        self.__dict__ = ss.__dict__.copy()
+        for element in list(self.element_map.values()):
+            element_id = element.id
+            for v in vertex_range(element.vertex_1, element.vertex_2, n)[1:-1]:
+                _, element_id = self.split_element(element_id, v)
 
+    @_modifies('loads', 'model')
     def remove_loads(self, dead_load=False):
         """
         Remove all the applied loads from the structure.
@@ -1034,10 +1636,12 @@ class SystemElements:
         self.loads_q = {}
         self.loads_moment = {}
 
-        for k in self.element_map:
-            self.element_map[k].q_load = 0
-            if dead_load:
-                self.element_map[k].dead_load = 0
+        for k, el in list(self.element_map.items()):
+            if el.q_load != 0 or (dead_load and el.dead_load != 0):
+                el = self._own_element(k)
+                el.q_load = 0
+                if dead_load:
+                    el.dead_load = 0
         if dead_load:
             self.loads_dead_load = set()
 
@@ -1054,21 +1658,204 @@ class SystemElements:
 
             exec('self.{}({})'.format(method, kwargs))
 
+    def snapshot(self):
+        """
+        Cheap copy of the model. The copy shares the nodes, elements and results with this system until they are
+        modified. Then only the modified part of the model is copied: adding a point load copies the point loads,
+        a q-load copies the q-loads and the loaded elements. Solving copies the nodes, elements and results, the
+        geometry and the matrices of the elements stay shared. Taking a snapshot doesn't depend on the size of the
+        model.
+
+        :return: (:class:`.SystemElements`)
+        """
+        system = copy.copy(self)
+        system._plotter = None
+        system.plot_values = self.plot_values.copy(system)
+        system.post_processor = post_sl(system)
+        system.post_processor.__dict__.update({k: v for k, v in self.post_processor.__dict__.items()
+                                               if k != 'system'})
+        self._shared = system._shared = frozenset(_SHARED_STATE)
+        self._copied = set()
+        system._copied = set()
+        return system
+
+    def _unshare(self, *parts):
+        """
+        Copy the parts of the state that are shared with snapshots, before they are modified. The nodes and elements
+        are copied when they are modified, see `_own_element`, or all at once by a calculation.
+
+        :param parts: (str) See `_SHARED_STATE`.
+        """
+        for part in self._shared.intersection(parts):
+            for name in _SHARED_STATE[part]:
+                setattr(self, name, copy.copy(getattr(self, name)))
+        if 'results' in self._shared and 'results' in parts:
+            self._own_all()
+        self._shared = self._shared.difference(parts)
+
+    def _own_node(self, node_id):
+        """
+        Copy a node that is shared with snapshots, before it is modified. The model must be unshared.
+
+        :param node_id: (int)
+        :return: (:class:`.Node`) The node of this system.
+        """
+        node = self.node_map[node_id]
+        if self._copied is None or id(node) in self._copied:
+            return node
+        copied = copy.copy(node)
+        copied.elements = dict(node.elements)
+        self._copied.add(id(copied))
+        self.node_map[node_id] = copied
+        if node_id in self.node_element_map:
+            self.node_element_map[node_id] = list(self.node_element_map[node_id])
+
+        for name in self._supports_by_node.get(node_id, ()):
+            if name == 'supports_spring_args':
+                continue
+            self._unshare('supports')
+            supports = getattr(self, name)
+            for i, entry in enumerate(supports):
+                if entry is node:
+                    supports[i] = copied
+                elif isinstance(entry, tuple) and entry[0] is node:
+                    supports[i] = (copied, entry[1])
+        return copied
+
+    def _own_element(self, element_id):
+        """
+        Copy an element that is shared with snapshots, and the nodes that register it, before it is modified. The
+        model must be unshared.
+
+        :param element_id: (int)
+        :return: (:class:`.Element`) The element of this system.
+        """
+        element = self.element_map[element_id]
+        if self._copied is None or id(element) in self._copied:
+            return element
+        copied = copy.copy(element)
+        copied.node_map = dict(element.node_map)
+        self._copied.add(id(copied))
+        self.element_map[element_id] = copied
+
+        for node_id in (element.node_id1, element.node_id2):
+            shared = self.node_map[node_id]
+            node = self._own_node(node_id)
+            node.elements[element_id] = copied
+            self.node_element_map[node_id] = [copied if el is element else el
+                                              for el in self.node_element_map[node_id]]
+            if copied.node_map[node_id] is shared:
+                copied.node_map[node_id] = node
+        return copied
+
+    def _own_all(self):
+        """
+        Copy the nodes, elements and results that are shared with snapshots. A calculation writes its results in all
+        nodes and elements. The matrices and the vertices of the elements stay shared, they are replaced instead of
+        modified in place.
+        """
+        copies = {}
+
+        def own(obj):
+            if id(obj) in self._copied:
+                return obj
+            if id(obj) not in copies:
+                copies[id(obj)] = copy.copy(obj)
+            return copies[id(obj)]
+
+        self.node_map = {k: own(node) for k, node in self.node_map.items()}
+        self.element_map = {k: own(el) for k, el in self.element_map.items()}
+        for node in self.node_map.values():
+            node.elements = {k: own(el) for k, el in node.elements.items()}
+        for el in self.element_map.values():
+            el.node_map = {k: own(node) for k, node in el.node_map.items()}
+        self.node_element_map = {k: [own(el) for el in v] for k, v in self.node_element_map.items()}
+        if copies:
+            self._unshare('supports')
+            for name in ('supports_fixed', 'supports_hinged', 'supports_roll'):
+                setattr(self, name, [own(node) for node in getattr(self, name)])
+            for name in ('supports_spring_x', 'supports_spring_z', 'supports_spring_y'):
+                setattr(self, name, [(own(node), roll) for node, roll in getattr(self, name)])
+        self._copied = None
+
+        if self._element_vectors is not None:
+            self._element_vectors = copy.deepcopy(self._element_vectors)
+            for i, el in enumerate(self.element_map.values()):
+                el.bind_vectors(self._element_vectors, i)
+
+        # the node results arrays are bound to the shared nodes, the next calculation creates new ones
+        post_processor = post_sl(self)
+        post_processor.results = self.post_processor.results
+        post_processor.reaction_node_ids = self.post_processor.reaction_node_ids
+        post_processor.reactions = self.post_processor.reactions
+        post_processor.equilibrium_residual = self.post_processor.equilibrium_residual
+        self.post_processor = post_processor
+
+    @property
+    def plotter(self):
+        """
+        The matplotlib plotter. Is created, and matplotlib imported, on first use.
+        """
+        if self._plotter is None:
+            from anastruct.fem.plotter.mpl import Plotter
+            self._plotter = Plotter(self, self.plot_values.mesh)
+        return self._plotter
+
+    @plotter.setter
+    def plotter(self, value):
+        self._plotter = value
+
+    def __getstate__(self):
+        # The matplotlib plotter is recreated on first use after unpickling.
+        state = self.__dict__.copy()
+        state['_plotter'] = None
+        # callbacks often hold files or connections
+        state['hooks'] = []
+        # nothing is shared with the unpickled system
+        state['_shared'] = frozenset()
+        state['_copied'] = None
+        return state
+
     def __deepcopy__(self, memo):
         system = copy.copy(self)
-        mesh = self.plotter.mesh
-        system.plotter = None
+        system._plotter = None
         system.post_processor = None
         system.plot_values = None
+        system.hooks = None
 
         system.__dict__ = copy.deepcopy(system.__dict__)
-        system.plotter = plotter.Plotter(system, mesh)
+        # the callbacks are shared
+        system.hooks = list(self.hooks)
         system.post_processor = post_sl(system)
-        system.plot_values = plotter.PlottingValues
+        # the element results of a calculation are shared between copies
+        system.post_processor.results = self.post_processor.results
+        system.plot_values = self.plot_values.copy(system)
+        system._shared = frozenset()
+        system._copied = None
 
         return system
 
 
+def _linalg():
+    # scipy is imported on the first calculation, not on import of anastruct.
+    from scipy import linalg
+    return linalg
+
+
+def _result_columns(columns, dataframe):
+    """
+    :param columns: (dict) Result arrays with an 'id' array.
+    :param dataframe: (bool) Return a pandas DataFrame indexed by the ids instead of the dict.
+    """
+    if not dataframe:
+        return columns
+    try:
+        import pandas as pd
+    except ImportError:
+        raise FEMException('Missing dependency', 'pandas is required to return the results as a DataFrame.')
+    return pd.DataFrame(columns).set_index("id")
+
+
 def _negative_index_to_id(idx, collection):
     if idx > 0:
         return idx
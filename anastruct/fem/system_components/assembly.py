@@ -1,6 +1,10 @@
-from anastruct.fem.elements import det_moment, det_shear
+from anastruct.fem.elements import ElementVectors
 import numpy as np
-import math
+
+try:
+    from anastruct.fem.cython.celements import det_moment_array, det_shear_array, assemble_matrices
+except ImportError:
+    from anastruct.fem.cython.elements import det_moment_array, det_shear_array, assemble_matrices
 
 
 def set_force_vector(system, force_list):
@@ -19,105 +23,112 @@ def set_force_vector(system, force_list):
     return system.system_force_vector
 
 
+def system_size(system):
+    """
+    Number of degrees of freedom of the system. Node ids map to the rows (id - 1) * 3 till (id - 1) * 3 + 3. Ids of
+    removed nodes leave gaps, which are eliminated as constrained degrees of freedom.
+    """
+    return system.id_last_node * 3
+
+
+def element_vectors(system):
+    """
+    The displacement, primary force and force vectors of all elements. Created once per topology, the vectors of the
+    elements are bound to the rows. The gather index `dofs` maps the rows to the degrees of freedom of the system.
+
+    :return: (:class:`.ElementVectors`)
+    """
+    vectors = system._element_vectors
+    if vectors is None or len(vectors.rows) != len(system.element_map):
+        elements = list(system.element_map.values())
+        vectors = ElementVectors(len(elements))
+        node_ids = np.array([(el.node_id1, el.node_id2) for el in elements], dtype=int).reshape(-1, 2)
+        vectors.dofs = ((node_ids[:, :, None] - 1) * 3 + np.arange(3)).reshape(-1, 6)
+        vectors.rows = {el.id: i for i, el in enumerate(elements)}
+        for i, el in enumerate(elements):
+            el.bind_vectors(vectors, i)
+        system._element_vectors = vectors
+    return vectors
+
+
 def prep_matrix_forces(system):
-    system.system_force_vector = system.system_force_vector = np.zeros(len(system._vertices) * 3)
+    system.system_force_vector = np.zeros(system_size(system))
     apply_perpendicular_q_load(system)
     apply_point_load(system)
     apply_moment_load(system)
 
 
 def apply_moment_load(system):
-    for node_id, Ty in system.loads_moment.items():
-        set_force_vector(system, [(node_id, 3, Ty * system.load_factor)])
+    if system.loads_moment:
+        node_ids = np.fromiter(system.loads_moment.keys(), dtype=int)
+        Ty = np.fromiter(system.loads_moment.values(), dtype=float)
+        np.add.at(system.system_force_vector, (node_ids - 1) * 3 + 2, Ty * system.load_factor)
 
 
 def apply_point_load(system):
-    for node_id in system.loads_point:
-        Fx, Fz = system.loads_point[node_id]
-        # system force vector.
-        set_force_vector(system, [(node_id, 1, Fx * system.load_factor), (node_id, 2, Fz * system.load_factor)])
+    if system.loads_point:
+        node_ids = np.fromiter(system.loads_point.keys(), dtype=int)
+        F = np.array(list(system.loads_point.values()), dtype=float).reshape(-1, 2)
+        dofs = (node_ids[:, None] - 1) * 3 + np.arange(2)
+        np.add.at(system.system_force_vector, dofs, F * system.load_factor)
 
 
 def apply_perpendicular_q_load(system):
-    for element_id in system.loads_dead_load:
-        element = system.element_map[element_id]
-        q_perpendicular = element.all_q_load
-
-        if q_perpendicular == 0:
-            continue
-        elif element.q_direction == "x" or element.q_direction == "y" or element.dead_load:
-            apply_parallel_q_load(system, element)
-
-        kl = element.constitutive_matrix[1][1] * 1e6
-        kr = element.constitutive_matrix[2][2] * 1e6
-
-        if math.isclose(kl, kr):
-            left_moment = det_moment(kl, kr, q_perpendicular, 0, element.EI, element.l)
-            right_moment = -left_moment
-            rleft = det_shear(kl, kr, q_perpendicular, 0, element.EI, element.l)
-            rright = rleft
-        else:
-            # minus because of systems positive rotation
-            left_moment = det_moment(kl, kr, q_perpendicular, 0, element.EI, element.l)
-            right_moment = -det_moment(kl, kr, q_perpendicular, element.l, element.EI, element.l)
-            rleft = det_shear(kl, kr, q_perpendicular, 0, element.EI, element.l)
-            rright = -det_shear(kl, kr, q_perpendicular, element.l, element.EI, element.l)
-
-        rleft_x = rleft * math.sin(element.angle)
-        rright_x = rright * math.sin(element.angle)
-
-        rleft_z = rleft * math.cos(element.angle)
-        rright_z = rright * math.cos(element.angle)
-
-        if element.type == 'truss':
-            left_moment = 0
-            right_moment = 0
-
-        primary_force = np.array([rleft_x, rleft_z, left_moment, rright_x, rright_z, right_moment])
-        element.element_primary_force_vector -= primary_force
-
-        # Set force vector
-        system.system_force_vector[(element.node_id1 - 1) * 3: (element.node_id1 - 1) * 3 + 3] += primary_force[0:3]
-        system.system_force_vector[(element.node_id2 - 1) * 3: (element.node_id2 - 1) * 3 + 3] += primary_force[3:]
-
-
-def apply_parallel_q_load(system, element):
-    direction = element.q_direction
-    # dead load
-    factor_dl = abs(math.sin(element.angle))
-
-    def update(Fx, Fz):
-        element.element_primary_force_vector[0] -= Fx
-        element.element_primary_force_vector[1] -= Fz
-        element.element_primary_force_vector[3] -= Fx
-        element.element_primary_force_vector[4] -= Fz
-
-        set_force_vector(system, [
-            (element.node_1.id, 2, Fz), (element.node_2.id, 2, Fz),
-            (element.node_1.id, 1, Fx), (element.node_2.id, 1, Fx)])
-
-    if direction == "x":
-        factor = abs(math.cos(element.angle))
-
-        for q_element in (element.q_load * factor, element.dead_load * factor_dl):
-            # q_load working at parallel to the elements x-axis          # set the proper direction
-            Fx = -q_element * math.cos(element.angle) * element.l * 0.5
-            Fz = q_element * abs(math.sin(element.angle)) * element.l * 0.5 * np.sign(math.sin(element.angle))
-
-            update(Fx, Fz)
-
-    else:
-        if math.isclose(element.angle, 0):
-            # horizontal element cannot have parallel forces due to self weight or q-load in y direction.
-            return None
-        factor = abs(math.sin(element.angle))
-
-        for q_element in (element.q_load * factor, element.dead_load * factor_dl):
-            # q_load working at parallel to the elements x-axis          # set the proper direction
-            Fx = q_element * math.cos(element.angle) * element.l * 0.5 * -np.sign(math.sin(element.angle))
-            Fz = q_element * abs(math.sin(element.angle)) * element.l * 0.5
-
-            update(Fx, Fz)
+    """
+    Apply the equivalent nodal loads of the q-loads and dead loads of all elements at once. The loads perpendicular to
+    the elements result in end shear forces and fixed end moments, the loads parallel to the elements are divided over
+    the nodes. The element primary force vectors are updated with the same nodal loads.
+    """
+    elements = [system.element_map[element_id] for element_id in system.loads_dead_load]
+    q_perpendicular = np.array([el.all_q_load for el in elements], dtype=float)
+    loaded = np.flatnonzero(q_perpendicular != 0)
+    if loaded.size == 0:
+        return
+    elements = [elements[i] for i in loaded.tolist()]
+    q_perpendicular = q_perpendicular[loaded]
+
+    data = np.array([(el.angle, el.l, el.EI, el.constitutive_matrix[1][1], el.constitutive_matrix[2][2], el.q_load,
+                      el.dead_load, el.node_id1, el.node_id2) for el in elements], dtype=float)
+    angle, l, EI, c_11, c_22, q_load, g = data[:, :7].T
+    node_ids = data[:, 7:].astype(int)
+    direction = np.array([el.q_direction for el in elements], dtype=object)
+    truss = np.array([el.type == 'truss' for el in elements], dtype=bool)
+    sin = np.sin(angle)
+    cos = np.cos(angle)
+
+    kl = c_11 * 1e6
+    kr = c_22 * 1e6
+    left_moment = det_moment_array(kl, kr, q_perpendicular, 0, EI, l)
+    rleft = det_shear_array(kl, kr, q_perpendicular, 0, EI, l)
+    # equal end stiffness, use the symmetry of the solution (math.isclose)
+    symmetric = np.abs(kl - kr) <= 1e-9 * np.maximum(np.abs(kl), np.abs(kr))
+    right_moment = np.where(symmetric, -left_moment, -det_moment_array(kl, kr, q_perpendicular, l, EI, l))
+    rright = np.where(symmetric, rleft, -det_shear_array(kl, kr, q_perpendicular, l, EI, l))
+    left_moment[truss] = 0
+    right_moment[truss] = 0
+
+    primary_force = np.stack((rleft * sin, rleft * cos, left_moment, rright * sin, rright * cos, right_moment), axis=1)
+
+    # q-loads parallel to the elements. Only applied for q-loads in x or y direction or with a dead load.
+    parallel = (direction == "x") | (direction == "y") | (g != 0)
+    x_direction = parallel & (direction == "x")
+    # horizontal elements cannot have parallel forces due to self weight or q-load in y direction.
+    y_direction = parallel & (direction != "x") & (angle != 0)
+    q_x = q_load * np.abs(cos) + g * np.abs(sin)
+    q_y = (q_load + g) * np.abs(sin)
+    Fx = np.where(x_direction, -q_x * cos * l * 0.5, 0) + np.where(y_direction, q_y * cos * l * 0.5 * -np.sign(sin), 0)
+    Fz = np.where(x_direction, q_x * np.abs(sin) * l * 0.5 * np.sign(sin), 0) + \
+        np.where(y_direction, q_y * np.abs(sin) * l * 0.5, 0)
+    primary_force[:, [0, 3]] += Fx[:, None]
+    primary_force[:, [1, 4]] += Fz[:, None]
+
+    vectors = element_vectors(system)
+    rows = np.array([vectors.rows[el.id] for el in elements], dtype=int)
+    np.subtract.at(vectors.primary_force, rows, primary_force)
+
+    # Set force vector
+    dofs = (node_ids[:, :, None] - 1) * 3 + np.arange(3)
+    np.add.at(system.system_force_vector, dofs.ravel(), primary_force.ravel())
 
 
 def dead_load(system, g, element_id):
@@ -132,7 +143,7 @@ def assemble_system_matrix(system, validate=False, geometric_matrix=False):
     """
     system._remainder_indexes = []
     if not geometric_matrix:
-        shape = len(system.node_map) * 3
+        shape = system_size(system)
         system.shape_system_matrix = shape
         system.system_matrix = np.zeros((shape, shape))
 
@@ -161,18 +172,12 @@ def assemble_system_matrix(system, validate=False, geometric_matrix=False):
     #
     # thus with appending numbers in the system matrix: column = row
 
-    for i in range(len(system.element_map)):
-        element = system.element_map[i + 1]
-        element_matrix = element.stiffness_matrix
-
-        # n1 and n2 are starting indexes of the rows and the columns for node 1 and node 2
-        n1 = (element.node_1.id - 1) * 3
-        n2 = (element.node_2.id - 1) * 3
-        system.system_matrix[n1: n1 + 3, n1: n1 + 3] += element_matrix[0:3, :3]
-        system.system_matrix[n1: n1 + 3, n2: n2 + 3] += element_matrix[0:3, 3:]
-
-        system.system_matrix[n2: n2 + 3, n1: n1 + 3] += element_matrix[3:6, :3]
-        system.system_matrix[n2: n2 + 3, n2: n2 + 3] += element_matrix[3:6, 3:]
+    # The element matrices are stacked in the order of the element vectors, the gather index of the element vectors
+    # gives the locations in the system matrix. The stack is kept to determine the element forces.
+    vectors = element_vectors(system)
+    system._element_stiffness = np.array([el.stiffness_matrix for el in system.element_map.values()],
+                                         dtype=float).reshape(-1, 6, 6)
+    assemble_matrices(system.system_matrix, system._element_stiffness, vectors.dofs)
 
     # returns True if symmetrical.
     if validate:
@@ -188,7 +193,7 @@ def set_displacement_vector(system, nodes_list):
     to NaN)
     """
     if system.system_displacement_vector is None:
-        system.system_displacement_vector = np.ones(len(system._vertices) * 3) * np.NaN
+        system.system_displacement_vector = np.ones(system_size(system)) * np.NaN
 
     for i in nodes_list:
         index = (i[0] - 1) * 3 + i[1] - 1
@@ -210,33 +215,50 @@ def process_conditions(system):
         else:
             system._remainder_indexes.append(i)
 
+    system._remainder_indexes = np.array(system._remainder_indexes, dtype=int)
     system.system_displacement_vector = np.delete(system.system_displacement_vector, indexes, 0)
     system.reduced_force_vector = np.delete(system.system_force_vector, indexes, 0)
     system.reduced_system_matrix = np.delete(system.system_matrix, indexes, 0)
     system.reduced_system_matrix = np.delete(system.reduced_system_matrix, indexes, 1)
 
 
-def process_supports(system):
+def constrained_dofs(system):
+    """
+    Degrees of freedom that are prevented by the supports, and the degrees of freedom of removed nodes.
+
+    :return: (array) Boolean mask with the size of the system.
+    """
+    mask = np.zeros((system.id_last_node, 3), dtype=bool)
+    if len(system.node_map) != system.id_last_node:
+        mask[:] = True
+        mask[np.fromiter(system.node_map, dtype=int) - 1] = False
+
     for node in system.supports_hinged:
-        set_displacement_vector(system, [(node.id, 1), (node.id, 2)])
+        mask[node.id - 1, :2] = True
 
-    for i in range(len(system.supports_roll)):
-        set_displacement_vector(system, [(system.supports_roll[i].id, system.supports_roll_direction[i])])
+    for node, direction in zip(system.supports_roll, system.supports_roll_direction):
+        mask[node.id - 1, direction - 1] = True
 
     for node in system.supports_fixed:
-        set_displacement_vector(system, [(node.id, 1), (node.id, 2), (node.id, 3)])
+        mask[node.id - 1] = True
 
     for node, roll in system.supports_spring_x:
         if not roll:
-            set_displacement_vector(system, [(node.id, 2)])
+            mask[node.id - 1, 1] = True
 
     for node, roll in system.supports_spring_z:
         if not roll:
-            set_displacement_vector(system, [(node.id, 1)])
+            mask[node.id - 1, 0] = True
 
     for node, roll in system.supports_spring_y:
         if not roll:
-            set_displacement_vector(system, [(node.id, 1), (node.id, 2)])
+            mask[node.id - 1, :2] = True
+    return mask.ravel()
+
+
+def process_supports(system):
+    set_displacement_vector(system, [])
+    system.system_displacement_vector[constrained_dofs(system)] = 0
 
     for node_id, angle in system.inclined_roll.items():
         for el in system.node_element_map[node_id]:
@@ -1,60 +1,201 @@
 import numpy as np
 import copy
-from anastruct.basic import converge
+from anastruct.basic import FEMException
+from anastruct.fem.util.stats import NO_STATS, NonLinearHistory
 import logging
-from scipy import linalg
 
+try:
+    from anastruct.fem.cython.celements import stiffness_matrices
+except ImportError:
+    from anastruct.fem.cython.elements import stiffness_matrices
 
-def stiffness_adaptation(system, verbosity, max_iter):
+
+def _converge(moments, mp):
+    """
+    Vectorized :func:`anastruct.basic.converge`.
+
+    :param moments: (np.array) Moments in the hinges.
+    :param mp: (np.array) Plastic moments of the hinges.
+    :return: (np.array) Convergence factors.
+    """
+    moments = np.abs(moments)
+    div = np.maximum(moments, mp) / np.minimum(moments, mp) * 2
+    return (mp / moments - 1) / div + 1
+
+
+class _Aitken:
+    """
+    Aitken Δ² acceleration of the stiffness updates of the hinges. The logarithms of the convergence factors of two
+    successive iterations determine a relaxation factor for the update of all hinges.
+    """
+    # largest update of the stiffness of a hinge in one iteration, as logarithm of the factor
+    max_step = np.log(2)
+
+    def __init__(self):
+        self.plastic = None
+        self.previous = None
+        self.relaxation = 1.0
+
+    def __call__(self, plastic, factors):
+        """
+        :param plastic: (np.array) Mask of the plastic hinges.
+        :param factors: (np.array) Convergence factors of the plastic hinges.
+        :return: (np.array) Accelerated factors.
+        """
+        residual = np.log(factors)
+        if self.plastic is None or not np.array_equal(plastic, self.plastic):
+            # the extrapolation only holds for the same set of plastic hinges
+            self.plastic = plastic.copy()
+            self.relaxation = 1.0
+        elif self.previous is not None:
+            difference = residual - self.previous
+            denominator = difference @ difference
+            if denominator > 0:
+                self.relaxation *= -(self.previous @ difference) / denominator
+        self.previous = residual
+        return np.exp(np.clip(self.relaxation * residual, -self.max_step, self.max_step))
+
+
+def stiffness_adaptation(system, verbosity, max_iter, stall_iter=None, collapse_ratio=100, damp_oscillations=True,
+                         accelerate=None):
     """
     Non linear solver for the nodes by adapting the stiffness of the elements (nodes).
 
+    The state of all hinges is held in (n_elements, 2) arrays, one row per non linear element and one column per node.
+    Every iteration checks the moments of all hinges and updates the stiffness of the elements at once.
+
+    The convergence history is stored in `system.non_linear_history`.
+
     :param system: (SystemElements)
     :param verbosity: (int)
     :param max_iter: (int)
+    :param stall_iter: (int) Stop when the largest deviation of the convergence factors from 1 didn't improve by 1%
+                       in this many iterations. Default is None, never stop early.
+    :param collapse_ratio: (flt) Stop when the displacements exceed the linear elastic displacements this many times,
+                           the plastic hinges form a collapse mechanism. None doesn't check for a collapse.
+    :param damp_oscillations: (bool) Halve the stiffness updates of hinges of which the convergence factor
+                              oscillates around 1, down to 1/8 of the update.
+    :param accelerate: (str) Acceleration of the stiffness updates. Default is None, every hinge is updated with its
+                       convergence factor.
+
+                       - 'aitken': Aitken Δ² extrapolation over all hinges. Replaces the damping of
+                         `damp_oscillations`.
     :return: (np.array) Vector with displacements.
     """
+    if accelerate not in (None, 'aitken'):
+        raise FEMException('Wrong parameters', "accelerate should be None or 'aitken', not {}".format(accelerate))
     system.solve(True, naked=True)
+    # displacements of a collapse, the plastic hinges form a mechanism
+    u_collapse = np.inf
+    if collapse_ratio is not None:
+        u_collapse = collapse_ratio * np.max(np.abs(system.system_displacement_vector))
     if verbosity == 0:
         logging.info("Starting stiffness adaptation calculation.")
 
+    elements = [system.element_map[k] for k in system.non_linear_elements]
+    # plastic moments, nan for nodes without a hinge
+    mp = np.array([[v.get(1, np.nan), v.get(2, np.nan)] for v in system.non_linear_elements.values()],
+                  dtype=float).reshape(-1, 2)
+    hinge = ~np.isnan(mp)
+
     # check validity
-    assert all([mp > 0 for mpd in system.non_linear_elements.values() for mp in mpd]), \
+    assert np.all(mp[hinge] > 0), \
         "Cannot solve for an mp = 0. If you want a hinge set the spring stiffness equal to 0."
 
+    vectors = system._element_vectors
+    rows = np.array([vectors.rows[el.id] for el in elements], dtype=int)
+    plastic = np.array([el.nodes_plastic for el in elements], dtype=bool).reshape(-1, 2) & hinge
+    constitutive = np.array([el.constitutive_matrix for el in elements], dtype=float).reshape(-1, 3, 3)
+    kinematic = np.array([el.kinematic_matrix for el in elements], dtype=float).reshape(-1, 3, 6)
+
+    history = system.non_linear_history = NonLinearHistory()
+    # per hinge: sign of (factor - 1) in the last iteration, whether it flipped and the damping of the updates
+    signs = np.zeros(mp.shape)
+    flipped = np.zeros(mp.shape, dtype=bool)
+    damping = np.ones(mp.shape)
+    aitken = _Aitken() if accelerate == 'aitken' else None
+
     for c in range(max_iter):
-        factors = []
-
-        # update the elements stiffnesses
-        for k, v in system.non_linear_elements.items():
-            el = system.element_map[k]
-
-            for node_no, mp in v.items():
-                if node_no == 1:
-                    # Fast Ty
-                    m_e = el.element_force_vector[2] + el.element_primary_force_vector[2]
-                else:
-                    # Fast Ty
-                    m_e = el.element_force_vector[5] + el.element_primary_force_vector[5]
-
-                if abs(m_e) > mp:
-                    el.nodes_plastic[node_no - 1] = True
-                if el.nodes_plastic[node_no - 1]:
-                    factor = converge(m_e, mp)
-                    factors.append(factor)
-                    el.update_stiffness(factor, node_no)
-
-        if not np.allclose(factors, 1, 1e-3):
-            system.solve(force_linear=True, naked=True)
+        # moments at the nodes, Ty of the element force vectors
+        moments = vectors.force[rows][:, [2, 5]] + vectors.primary_force[rows][:, [2, 5]]
+        plastic |= np.abs(moments) > mp
+        factors = np.ones(mp.shape)
+        factors[plastic] = _converge(moments[plastic], mp[plastic])
+        residual = np.max(np.abs(np.abs(moments[plastic]) - mp[plastic]), initial=0)
+
+        if aitken is not None:
+            updates = np.ones(mp.shape)
+            if plastic.any():
+                updates[plastic] = aitken(plastic, factors[plastic])
+        elif damp_oscillations:
+            sign = np.sign(factors - 1)
+            flip = sign * signs < 0
+            # two flips in a row is an oscillation, a single flip is a hinge converging from the other side
+            damping = np.where(flip & flipped & plastic, np.maximum(damping * 0.5, 0.125), damping)
+            signs = np.where(plastic, sign, signs)
+            flipped = np.where(plastic, flip, flipped)
+            updates = 1 + damping * (factors - 1)
         else:
+            updates = factors
+
+        changed = np.flatnonzero(plastic.any(axis=1))
+        if changed.size:
+            # scale the rotational stiffness of the hinges, see Element.update_stiffness
+            scale = np.ones((changed.size, 3, 3))
+            scale[:, 1, 1] = updates[changed, 0]
+            scale[:, 2, 2] = updates[changed, 1]
+            scale[:, 1, 2] = scale[:, 2, 1] = updates[changed, 0] * updates[changed, 1]
+            # new arrays, the matrices of the elements are views in them and may be shared with copies of the elements
+            constitutive = constitutive.copy()
+            constitutive[changed] *= scale
+            stiffness = stiffness_matrices(constitutive[changed], kinematic[changed])
+            for i, j in enumerate(changed.tolist()):
+                elements[j].constitutive_matrix = constitutive[j]
+                elements[j].stiffness_matrix = stiffness[i]
+            system._invalidate('stiffness')
+
+        plastic_factors = factors[plastic]
+        history.append(np.max(np.abs(plastic_factors - 1), initial=0), int(plastic.sum()), residual,
+                       int(np.count_nonzero(damping < 1)))
+        if system._solve_stats is not None:
+            system._solve_stats.emit('iteration', iteration=c, factors=plastic_factors.tolist(),
+                                     max_deviation=history.max_deviation[-1], plastic_nodes=history.plastic_nodes[-1],
+                                     residual=residual)
+        # the hinges of a mechanism converge to their plastic moments as well, so check the collapse first
+        if np.max(np.abs(system.system_displacement_vector)) > u_collapse:
+            history.reason = 'collapsed'
+        elif np.allclose(plastic_factors, 1, 1e-3):
+            history.reason = 'converged'
+        elif stall_iter is not None and history.stalled(stall_iter):
+            history.reason = 'stalled'
+        else:
+            system.solve(force_linear=True, naked=True)
+            continue
+
+        with (system._solve_stats or NO_STATS).phase('post_processing'):
             system.post_processor.node_results_elements()
             system.post_processor.node_results_system()
             system.post_processor.reaction_forces()
             system.post_processor.element_results()
-            break
-
-    if c == max_iter - 1:
-        logging.warning("Couldn't solve the in the amount of iterations given. max_iter={}".format(max_iter))
+        break
+    else:
+        history.reason = 'max_iter'
+
+    for el, nodes_plastic in zip(elements, plastic.tolist()):
+        el.nodes_plastic = nodes_plastic
+
+    if system._solve_stats is not None:
+        system._solve_stats.non_linear_iterations += len(history)
+    if history.reason == 'max_iter':
+        logging.warning("Couldn't solve the in the amount of iterations given. max_iter={}. Maximum deviation of the "
+                        "convergence factors: {:.3g}".format(max_iter, history.max_deviation[-1]))
+    elif history.reason == 'stalled':
+        logging.warning("The non linear calculation stalled after {} iterations. Maximum deviation of the convergence "
+                        "factors: {:.3g}".format(len(history), history.max_deviation[-1]))
+    elif history.reason == 'collapsed':
+        logging.warning("The structure collapsed after {} iterations, the plastic hinges form a mechanism. The "
+                        "displacements exceed {} times the linear elastic displacements.".format(
+                            len(history), collapse_ratio))
     elif verbosity == 0:
         logging.info("Solved in {} iterations".format(c))
     return system.system_displacement_vector
@@ -90,12 +231,14 @@ def det_linear_buckling(system):
     for el in system.element_map.values():
         el.compile_geometric_non_linear_stiffness_matrix()
         el.reset()
+    system._invalidate('stiffness')
 
     system.solve()
     kg = system.reduced_system_matrix - k0
     # solve (k -λkg)x = 0
-
-    eigenvalues = np.abs(linalg.eigvals(k0, kg))
+    from scipy import linalg
+    with (system._solve_stats or NO_STATS).phase('buckling_eigensolver'):
+        eigenvalues = np.abs(linalg.eigvals(k0, kg))
     return np.min(eigenvalues)
 
 
@@ -114,18 +257,25 @@ def geometrically_non_linear(system, verbosity=0, buckling_factor=True, discreti
         logging.info("Starting geometrical non linear calculation")
 
     if buckling_factor:
-        buckling_system = copy.copy(system)
         if discretize_kwargs is not None:
+            # discretize modifies the model, the snapshot copies the model state first.
+            buckling_system = system.snapshot()
             buckling_system.discretize(**discretize_kwargs)
+        else:
+            buckling_system = copy.copy(system)
 
         buckling_factor = det_linear_buckling(buckling_system)
     else:
         buckling_factor = None
 
+    # the elements may be shared with the buckling system
+    system._invalidate('stiffness')
+
     system.solve()
 
     for el in system.element_map.values():
         el.compile_geometric_non_linear_stiffness_matrix()
+    system._invalidate('stiffness')
 
     system.solve()
 
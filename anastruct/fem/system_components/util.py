@@ -1,25 +1,27 @@
+import gc
+from contextlib import contextmanager
+import numpy as np
 from anastruct.fem.node import Node
 from anastruct.vertex import Vertex
 from anastruct.basic import FEMException, angle_x_axis
 
 
 def ensure_single_hinge(system, spring, node_id1, node_id2):
-    if spring is not None and 0 in spring:
+    if spring is not None and 0 in spring.values():
         """
         Must be one rotational fixed element per node. Thus keep track of the hinges (k == 0).
         """
 
         for node in range(1, 3):
-            if spring[node] == 0:  # node is a hinged node
+            if spring.get(node) == 0:  # node is a hinged node
                 if node == 1:
                     node_id = node_id1
                 else:
                     node_id = node_id2
 
-                system.node_map[node_id].hinge = True
-
                 if len(system.node_map[node_id].elements) > 0:
-                    pass_hinge = not all([el.hinge == node for el in system.node_map[node_id].elements.values()])
+                    pass_hinge = not all([_hinged_end(el, node_id) for el in
+                                          system.node_map[node_id].elements.values()])
                 else:
                     pass_hinge = True
                 if not pass_hinge:
@@ -57,11 +59,12 @@ def det_vertices(system, location_list):
 def det_node_ids(system, point_1, point_2):
     node_ids = []
     for p in (point_1, point_2):
-        k = str(p)
+        k = tuple(p.coordinates.tolist())
         if k in system._vertices:
             node_id = system._vertices[k]
         else:
-            node_id = len(system._vertices) + 1
+            system._last_node_id += 1
+            node_id = system._last_node_id
             system._vertices[k] = node_id
         node_ids.append(node_id)
     return node_ids
@@ -109,3 +112,98 @@ def force_elements_orientation(point_1, point_2, node_id1, node_id2, spring, mp)
             elif 2 in mp:
                 mp[1] = mp.pop(2)
     return point_1, point_2, node_id1, node_id2, spring, mp, angle
+
+
+def det_node_ids_bulk(system, coordinates):
+    """
+    Vectorized counterpart of `det_node_ids` and `append_node_id`. Unknown coordinates are registered as new nodes.
+
+    :param coordinates: (array) Float32 coordinates, shape (n, 2).
+    :return: (array) Node ids, shape (n,).
+    """
+    keys = list(map(tuple, coordinates.tolist()))
+    node_ids = list(map(system._vertices.get, keys))
+    for i in [i for i, node_id in enumerate(node_ids) if node_id is None]:
+        node_id = system._vertices.get(keys[i])
+        if node_id is None:
+            system._last_node_id += 1
+            node_id = system._last_node_id
+            system._vertices[keys[i]] = node_id
+            system.node_map[node_id] = Node(node_id, vertex=Vertex(coordinates[i]))
+        node_ids[i] = node_id
+    return np.array(node_ids, dtype=int)
+
+
+def force_elements_orientation_bulk(point_1, point_2, node_ids, springs):
+    """
+    Vectorized counterpart of `force_elements_orientation`. Node ids and springs are swapped in place for the
+    elements pointing in negative x direction.
+
+    :param point_1: (array) Coordinates of the first nodes, shape (n, 2).
+    :param point_2: (array) Coordinates of the second nodes, shape (n, 2).
+    :param node_ids: (array) Node ids, shape (n, 2).
+    :param springs: (array) Rotational springs, shape (n, 2).
+    :return: (array) flipped elements mask, (array) angles
+    """
+    delta_x = (point_2[:, 0] - point_1[:, 0]).astype(float)
+    delta_z = -(point_2[:, 1] - point_1[:, 1]).astype(float)  # minus sign to work with an opposite z-axis
+
+    flip = delta_x < 0
+    delta_x[flip] *= -1
+    delta_z[flip] *= -1
+    node_ids[flip] = node_ids[flip, ::-1]
+    springs[flip] = springs[flip, ::-1]
+
+    ai = np.arccos(delta_x / np.sqrt(delta_x**2 + delta_z**2))
+    ai[delta_z < 0] = 2 * np.pi - ai[delta_z < 0]
+    return flip, -ai
+
+
+def ensure_single_hinge_bulk(system, node_ids, springs):
+    """
+    Vectorized counterpart of `ensure_single_hinge`, with the same result as adding the elements one by one. A hinged
+    element end is removed if all the element ends that are already connected to the node are hinged.
+
+    :param node_ids: (array) Node ids, shape (n, 2).
+    :param springs: (array) Rotational springs, shape (n, 2). Updated in place.
+    """
+    hinged = (springs == 0).ravel()
+    if not hinged.any():
+        return
+    ends = node_ids.ravel()
+
+    # the first and the second new end at every node
+    nodes, first = np.unique(ends, return_index=True)
+    rest = np.ones(len(ends), dtype=bool)
+    rest[first] = False
+    second_nodes, second = np.unique(ends[rest], return_index=True)
+    second = dict(zip(second_nodes.tolist(), np.flatnonzero(rest)[second].tolist()))
+
+    # only a hinged first end can be followed by a removed hinge
+    for node_id, i in zip(nodes[hinged[first]].tolist(), first[hinged[first]].tolist()):
+        existing = system.node_map[node_id].elements.values()
+        if len(existing) > 0:
+            if all(_hinged_end(el, node_id) for el in existing):
+                springs.flat[i] = np.nan
+        elif node_id in second and hinged[second[node_id]]:
+            springs.flat[second[node_id]] = np.nan
+
+
+def _hinged_end(element, node_id):
+    if element.springs is None:
+        return False
+    return element.springs.get(1 if element.node_id1 == node_id else 2) == 0
+
+
+@contextmanager
+def gc_paused():
+    """
+    Pause the cyclic garbage collector while creating many objects.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -0,0 +1,59 @@
+from anastruct.fem.cython import elements as python_kernels
+import numpy as np
+import time
+
+try:
+    from anastruct.fem.cython import celements as compiled_kernels
+except ImportError:
+    compiled_kernels = None
+    print("The compiled kernels are not built, only the pure Python/ NumPy kernels are timed.")
+
+n = 5
+n_elements = int(1e5)
+n_assembly = 2000  # the system matrix is dense
+
+rng = np.random.default_rng(0)
+a = rng.uniform(0, 2 * np.pi, n_elements)
+l = rng.uniform(1, 5, n_elements)
+EA = np.full(n_elements, 15e3)
+EI = np.full(n_elements, 5e3)
+spring = np.where(rng.random(n_elements) < 0.1, 0, np.nan)
+q = rng.uniform(-10, 10, n_elements)
+k = rng.uniform(1e6, 1e9, n_elements)
+node_ids = np.column_stack((np.arange(1, n_assembly + 1), np.arange(2, n_assembly + 2)))
+dofs = ((node_ids[:, :, None] - 1) * 3 + np.arange(3)).reshape(-1, 6)
+
+
+def best_of(f, *args):
+    min_ = 1e8
+    for i in range(n):
+        t0 = time.perf_counter()
+        f(*args)
+        min_ = min(min_, time.perf_counter() - t0)
+    return min_
+
+
+def run(kernels):
+    kinematic = kernels.kinematic_matrices(a, a, l)
+    constitutive = kernels.constitutive_matrices(EA, EI, l, spring, spring)
+    stiffness = kernels.stiffness_matrices(constitutive, kinematic)
+    shape = (n_assembly + 1) * 3
+    return {
+        "kinematic_matrices": best_of(kernels.kinematic_matrices, a, a, l),
+        "constitutive_matrices": best_of(kernels.constitutive_matrices, EA, EI, l, spring, spring),
+        "stiffness_matrices": best_of(kernels.stiffness_matrices, constitutive, kinematic),
+        "equivalent loads": best_of(lambda: (kernels.det_moment_array(k, k, q, 0, EI, l),
+                                             kernels.det_shear_array(k, k, q, 0, EI, l))),
+        "assembly": best_of(lambda: kernels.assemble_matrices(np.zeros((shape, shape)), stiffness[:n_assembly],
+                                                              dofs))
+    }
+
+
+python_times = run(python_kernels)
+compiled_times = run(compiled_kernels) if compiled_kernels is not None else {}
+
+print("Best of {}, {} elements, assembly of {} elements.".format(n, n_elements, n_assembly))
+print("{:<24}{:>12}{:>14}".format("kernel", "python (s)", "compiled (s)"))
+for name, t in python_times.items():
+    compiled = format(compiled_times[name], ".5f") if name in compiled_times else "-"
+    print("{:<24}{:>12.5f}{:>14}".format(name, t, compiled))
@@ -0,0 +1,154 @@
+"""
+Model generators of the benchmark suite. Every generator takes a size parameter and returns a supported and loaded
+model that is ready to be solved. The generators of `BUILD_MODELS` only time the creation of large models.
+"""
+from anastruct.fem.system import SystemElements
+from anastruct.material.profile import HEA
+from anastruct.material.units import to_kNm2, to_kN
+from anastruct.vertex import Vertex
+import numpy as np
+
+
+def beam(n):
+    """
+    Continuous beam of n elements with a support every 10 elements, created from arrays.
+
+    :param n: (int) Number of elements.
+    """
+    x = np.linspace(0, n, n + 1)
+    nodes = np.column_stack((x, np.zeros(n + 1)))
+    connectivity = np.column_stack((np.arange(n), np.arange(1, n + 1)))
+    ss = SystemElements.from_arrays(nodes, connectivity)
+    ss.add_support_hinged(1)
+    ss.add_support_roll(list(range(11, n + 2, 10)) or [n + 1])
+    ss.q_load(-10, list(ss.element_map))
+    return ss
+
+
+def frame(n):
+    """
+    Multi-storey frame of n storeys and n bays, fixed at the base. Wind loads on the left column line and q-loads on
+    the beams.
+
+    :param n: (int) Number of storeys and bays.
+    """
+    ss = SystemElements(EA=5e6, EI=2e4)
+    width = 6
+    height = 3.5
+    for storey in range(n):
+        for column in range(n + 1):
+            ss.add_element([[column * width, storey * height], [column * width, (storey + 1) * height]])
+        for bay in range(n):
+            id_ = ss.add_element([[bay * width, (storey + 1) * height], [(bay + 1) * width, (storey + 1) * height]])
+            ss.q_load(-15, id_)
+        ss.point_load(ss.find_node_id(Vertex(0, (storey + 1) * height)), Fx=10)
+    ss.add_support_fixed([ss.find_node_id(Vertex(column * width, 0)) for column in range(n + 1)])
+    return ss
+
+
+def truss(n):
+    """
+    Pratt truss of n panels with point loads on the bottom chord.
+
+    :param n: (int) Number of panels.
+    """
+    ss = SystemElements(EA=1e6)
+    width = 2
+    height = 2
+    for panel in range(n):
+        x1 = panel * width
+        x2 = x1 + width
+        ss.add_truss_element([[x1, 0], [x2, 0]])
+        ss.add_truss_element([[x1, height], [x2, height]])
+        ss.add_truss_element([[x1, 0], [x1, height]])
+        if panel < n / 2:
+            ss.add_truss_element([[x1, height], [x2, 0]])
+        else:
+            ss.add_truss_element([[x1, 0], [x2, height]])
+    ss.add_truss_element([[n * width, 0], [n * width, height]])
+    bottom = [ss.find_node_id(Vertex(panel * width, 0)) for panel in range(n + 1)]
+    ss.add_support_hinged(bottom[0])
+    ss.add_support_roll(bottom[-1])
+    ss.point_load(bottom[1:-1], Fy=[-20] * (n - 1))
+    return ss
+
+
+def portal(n):
+    """
+    Plastic portal frame of n bays with plastic hinges in the beams and the columns, see example 8. Solved non
+    linear.
+
+    :param n: (int) Number of bays.
+    """
+    profile = HEA[180]
+    E = 210e3
+    mp = profile["Wy"] * 235 * 1e-6
+    ss = SystemElements(EA=to_kN(E * profile['A']), EI=to_kNm2(E * profile['Iy']), load_factor=3)
+    width = 4
+    for bay in range(n):
+        x = bay * width
+        if bay == 0:
+            ss.q_load(-1, ss.add_element([[x, 0], [x, 4]], mp={2: mp}))
+            ss.q_load(-1, ss.add_element([[x, 4], [x, 8]], mp={1: mp, 2: mp}))
+        for x1, x2 in ((x, x + width / 2), (x + width / 2, x + width)):
+            id_ = ss.add_element([[x1, 8], [x2, 8]], mp={1: mp, 2: mp})
+            ss.q_load(-20, id_)
+        ss.add_element([[x + width, 8], [x + width, 4]], mp={1: mp, 2: mp})
+        ss.add_element([[x + width, 4], [x + width, 0]], mp={1: mp, 2: mp})
+        ss.add_truss_element([[x, 4], [x + width, 4]])
+    ss.add_support_hinged(ss.find_node_id(Vertex(0, 0)))
+    ss.add_support_fixed([ss.find_node_id(Vertex((bay + 1) * width, 0)) for bay in range(n)])
+    return ss
+
+
+def plastic_frame(n):
+    """
+    Multi-storey frame of n storeys and n bays with plastic hinges at both ends of all columns and beam halves. Wind
+    loads on the left column line and q-loads on the beams. Solved non linear.
+
+    :param n: (int) Number of storeys and bays.
+    """
+    profile = HEA[180]
+    E = 210e3
+    mp = profile["Wy"] * 235 * 1e-6
+    ss = SystemElements(EA=to_kN(E * profile['A']), EI=to_kNm2(E * profile['Iy']))
+    width = 6
+    height = 3.5
+    for storey in range(n):
+        y1 = storey * height
+        y2 = y1 + height
+        for column in range(n + 1):
+            ss.add_element([[column * width, y1], [column * width, y2]], mp={1: mp, 2: mp})
+        for bay in range(n):
+            x = bay * width
+            for x1, x2 in ((x, x + width / 2), (x + width / 2, x + width)):
+                ss.q_load(-25, ss.add_element([[x1, y2], [x2, y2]], mp={1: mp, 2: mp}))
+        ss.point_load(ss.find_node_id(Vertex(0, y2)), Fx=20)
+    ss.add_support_fixed([ss.find_node_id(Vertex(column * width, 0)) for column in range(n + 1)])
+    return ss
+
+
+def line(n):
+    """
+    Straight inclined line of n elements, created from arrays. Not supported or loaded, only the creation is timed.
+
+    :param n: (int) Number of elements.
+    """
+    x = np.linspace(0, 10, n + 1)
+    nodes = np.column_stack((x, x))
+    connectivity = np.column_stack((np.arange(n), np.arange(1, n + 1)))
+    return SystemElements.from_arrays(nodes, connectivity)
+
+
+# name: (generator, sizes, quick sizes)
+MODELS = {
+    'beam': (beam, (10, 100, 400), (10, 100)),
+    'frame': (frame, (2, 4, 8), (2, 4)),
+    'truss': (truss, (10, 50, 100), (10, 50)),
+    'portal': (portal, (1, 4, 16), (1, 4)),
+    'plastic': (plastic_frame, (2, 4, 8), (2, 4))
+}
+# models of which only the build phase is run
+BUILD_MODELS = {
+    'line': (line, (1000, 10000, 100000), (1000, 10000))
+}
@@ -0,0 +1,37 @@
+"""
+Iterations and time of the stiffness adaptation of non linear models, with and without acceleration of the stiffness
+updates.
+
+    python -m anastruct.fem.tests.benchmark.non_linear
+"""
+import copy
+import time
+from anastruct.fem.examples.ex_8_non_linear_portal import ss as ex_8
+from anastruct.fem.tests.benchmark.models import portal, plastic_frame
+
+ACCELERATE = (None, 'aitken')
+CASES = [('ex_8_non_linear_portal', lambda: copy.deepcopy(ex_8))] + \
+    [('portal({})'.format(n), lambda n=n: portal(n)) for n in (4, 16, 32)] + \
+    [('plastic_frame({})'.format(n), lambda n=n: plastic_frame(n)) for n in (2, 4, 8, 12)]
+
+
+def run(build, accelerate, max_iter=500):
+    """
+    :return: (tuple) Number of hinges, iterations, why the iterations stopped and the time (s).
+    """
+    ss = build()
+    t0 = time.perf_counter()
+    ss.solve(max_iter=max_iter, accelerate=accelerate)
+    t = time.perf_counter() - t0
+    history = ss.non_linear_history
+    hinges = sum(len(v) for v in ss.non_linear_elements.values())
+    return hinges, len(history), history.reason, t
+
+
+if __name__ == '__main__':
+    print('{:<26}{:>8}'.format('model', 'hinges') +
+          ''.join('{:>22}'.format(str(accelerate)) for accelerate in ACCELERATE))
+    for name, build in CASES:
+        results = [run(build, accelerate) for accelerate in ACCELERATE]
+        print('{:<26}{:>8}'.format(name, results[0][0]) +
+              ''.join('{:>5} {:<10}{:>6.3f} s'.format(iterations, reason, t) for _, iterations, reason, t in results))
@@ -0,0 +1,38 @@
+"""
+Time of `import anastruct` and the plotting and scipy modules it imports. matplotlib and scipy should only be imported
+on first use.
+
+    python -m anastruct.fem.tests.benchmark.startup
+"""
+import subprocess
+import sys
+
+# Every run imports anastruct in a fresh interpreter, the interpreter start itself is subtracted.
+CODE = "import time; t0 = time.perf_counter(); {} print(time.perf_counter() - t0)"
+
+
+def import_time(n=10):
+    """
+    :param n: (int) Number of runs.
+    :return: (flt) Best time (s) of n imports.
+    """
+    best = float('inf')
+    for _ in range(n):
+        t_import = float(subprocess.check_output([sys.executable, "-c", CODE.format("import anastruct;")]))
+        t_empty = float(subprocess.check_output([sys.executable, "-c", CODE.format("")]))
+        best = min(best, t_import - t_empty)
+    return best
+
+
+def imported_modules():
+    """
+    :return: (str) The matplotlib and scipy modules that are imported by `import anastruct`.
+    """
+    return subprocess.check_output([sys.executable, "-c", "import sys, anastruct; print(sorted(m for m in sys.modules "
+                                                          "if m.split('.')[0] in ('matplotlib', 'scipy')))"]).decode()
+
+
+if __name__ == "__main__":
+    n = 10
+    print("Best of {} = {:.4f} s.".format(n, import_time(n)))
+    print("Imported plotting and scipy modules: {}".format(imported_modules().strip()))
@@ -0,0 +1,235 @@
+"""
+Benchmark suite. Times the phases of the calculation of generated models of increasing size and measures the peak
+memory of every phase. The results are written as JSON and can be compared with a stored baseline.
+
+Run the suite and store a baseline::
+
+    python -m anastruct.fem.tests.benchmark.suite run -o baseline.json
+
+Compare later runs with the baseline. Exits with status 1 when a phase regressed::
+
+    python -m anastruct.fem.tests.benchmark.suite run -o current.json
+    python -m anastruct.fem.tests.benchmark.suite compare baseline.json current.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+from anastruct.fem.tests.benchmark.models import MODELS, BUILD_MODELS
+
+SUITE_VERSION = 1
+PHASES = ('build', 'solve', 'resolve', 'results', 'snapshot')
+
+
+def _phases(generator, size):
+    """
+    The phases of one benchmark case, in order. Every phase gets the model returned by the previous phase.
+    """
+    def build(_):
+        return generator(size)
+
+    def solve(ss):
+        ss.solve()
+        return ss
+
+    def resolve(ss):
+        # a load change only, linear models reuse the factorized system matrix.
+        ss.point_load(max(ss.node_map), Fx=1)
+        ss.solve()
+        return ss
+
+    def results(ss):
+        ss.get_node_result_arrays()
+        ss.get_element_result_arrays(extrema=True)
+        return ss
+
+    def snapshot(ss):
+        # a load change on a snapshot and on the original only copies the loads, not the model.
+        copied = ss.snapshot()
+        copied.point_load(max(ss.node_map), Fx=2)
+        ss.point_load(max(ss.node_map), Fx=3)
+        return ss
+
+    return build, solve, resolve, results, snapshot
+
+
+def run_case(generator, size, repeat=3, build_only=False):
+    """
+    Benchmark one model. The phases are timed `repeat` times, the best time is kept. The peak memory is measured in
+    an extra run, as tracing the memory allocations slows down the phases.
+
+    :param generator: (function) Model generator, see :mod:`.models`.
+    :param size: (int) Size parameter of the generator.
+    :param repeat: (int) Number of timed runs.
+    :param build_only: (bool) Only run the build phase, see `BUILD_MODELS`.
+    :return: (dict) Model size and the time (s) and peak memory (bytes) of every phase.
+    """
+    phases = PHASES[:1] if build_only else PHASES
+    times = {name: float('inf') for name in phases}
+    for _ in range(repeat):
+        ss = None
+        for name, phase in zip(phases, _phases(generator, size)):
+            t0 = time.perf_counter()
+            ss = phase(ss)
+            times[name] = min(times[name], time.perf_counter() - t0)
+
+    peaks = {}
+    ss = None
+    for name, phase in zip(phases, _phases(generator, size)):
+        tracemalloc.start()
+        try:
+            ss = phase(ss)
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'n_elements': len(ss.element_map),
+        'n_nodes': len(ss.node_map),
+        'n_dofs': 3 * len(ss.node_map),
+        'phases': {name: {'time': times[name], 'peak_memory': peaks[name]} for name in phases}
+    }
+
+
+def _git_label():
+    try:
+        return subprocess.check_output(['git', 'describe', '--tags', '--always', '--dirty'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """
+    :return: (dict) Description of the machine and the versions, stored with the results.
+    """
+    import scipy
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'platform': platform.platform(),
+        'processor': platform.machine(),
+        'git': _git_label()
+    }
+
+
+def run(models=None, quick=False, repeat=3, verbose=True):
+    """
+    Run the benchmark suite.
+
+    :param models: (list) Names of the models, see `MODELS` and `BUILD_MODELS`. Default all models.
+    :param quick: (bool) Only the smaller sizes.
+    :param repeat: (int) Number of timed runs of every case.
+    :param verbose: (bool) Print the cases while running.
+    :return: (dict) The environment and a list of results, one per model and size.
+    """
+    results = []
+    for name in models or list(MODELS) + list(BUILD_MODELS):
+        build_only = name in BUILD_MODELS
+        generator, sizes, quick_sizes = BUILD_MODELS[name] if build_only else MODELS[name]
+        for size in quick_sizes if quick else sizes:
+            case = run_case(generator, size, repeat, build_only)
+            case = dict(model=name, size=size, **case)
+            results.append(case)
+            if verbose:
+                print('{:<8}{:>6}{:>8} elements  '.format(name, size, case['n_elements']) +
+                      '  '.join('{} {:.4f} s'.format(phase, v['time']) for phase, v in case['phases'].items()))
+    return {'version': SUITE_VERSION, 'environment': environment(), 'repeat': repeat, 'results': results}
+
+
+def compare(baseline, current, tolerance=0.25, memory_tolerance=0.1, min_time=1e-3, min_memory=2 ** 16):
+    """
+    Compare the results of two runs of the suite. A phase regressed when it takes more than `tolerance` longer, or
+    uses more than `memory_tolerance` more peak memory, than in the baseline. Small absolute differences are ignored
+    as timing noise.
+
+    :param baseline: (dict) Results of :func:`run`.
+    :param current: (dict) Results of :func:`run`.
+    :param tolerance: (flt) Allowed relative increase of the time.
+    :param memory_tolerance: (flt) Allowed relative increase of the peak memory.
+    :param min_time: (flt) Time differences below this value (s) are never a regression.
+    :param min_memory: (int) Memory differences below this value (bytes) are never a regression.
+    :return: (list) One dict per compared phase with the 'time_ratio', 'memory_ratio' and whether it 'regressed'.
+    """
+    reference = {(case['model'], case['size']): case for case in baseline['results']}
+    rows = []
+    for case in current['results']:
+        base = reference.get((case['model'], case['size']))
+        if base is None:
+            continue
+        for phase, new in case['phases'].items():
+            old = base['phases'].get(phase)
+            if old is None:
+                continue
+            slower = new['time'] > old['time'] * (1 + tolerance) and new['time'] - old['time'] > min_time
+            larger = new['peak_memory'] > old['peak_memory'] * (1 + memory_tolerance) and \
+                new['peak_memory'] - old['peak_memory'] > min_memory
+            rows.append({
+                'model': case['model'],
+                'size': case['size'],
+                'phase': phase,
+                'time_ratio': new['time'] / old['time'] if old['time'] > 0 else float('inf'),
+                'memory_ratio': new['peak_memory'] / old['peak_memory'] if old['peak_memory'] > 0 else float('inf'),
+                'regressed': slower or larger
+            })
+    return rows
+
+
+def _print_comparison(rows):
+    print('{:<8}{:>6}  {:<8}{:>8}{:>8}'.format('model', 'size', 'phase', 'time', 'memory'))
+    for row in rows:
+        print('{:<8}{:>6}  {:<8}{:>8.2f}{:>8.2f}{}'.format(row['model'], row['size'], row['phase'], row['time_ratio'],
+                                                          row['memory_ratio'], '  REGRESSION' if row['regressed']
+                                                          else ''))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='anaStruct benchmark suite.')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks.')
+    run_parser.add_argument('-o', '--output', help='Write the results to this JSON file.')
+    run_parser.add_argument('-m', '--models', nargs='+', choices=sorted(list(MODELS) + list(BUILD_MODELS)),
+                            help='Models to run. Default all.')
+    run_parser.add_argument('--quick', action='store_true', help='Only run the smaller sizes.')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs per case.')
+    run_parser.add_argument('--baseline', help='Compare with the results in this JSON file.')
+
+    compare_parser = commands.add_parser('compare', help='Compare results with a baseline.')
+    compare_parser.add_argument('baseline', help='JSON file with the baseline results.')
+    compare_parser.add_argument('current', help='JSON file with the current results.')
+
+    for p in (run_parser, compare_parser):
+        p.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative increase of the time.')
+        p.add_argument('--memory-tolerance', type=float, default=0.1,
+                       help='Allowed relative increase of the peak memory.')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        current = run(args.models, args.quick, args.repeat)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(current, f, indent=2)
+        if not args.baseline:
+            return 0
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+
+    rows = compare(baseline, current, args.tolerance, args.memory_tolerance)
+    _print_comparison(rows)
+    return 1 if any(row['regressed'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,39 @@
 import unittest
+import os
+import subprocess
 import sys
+import tempfile
+import copy
+import pickle
 
 sys.path.append("..")
 from anastruct.fem import system as se
+from anastruct.fem.util.cache import ResultCache
+from anastruct.fem.util.store import ResultStore
 import numpy as np
 from anastruct.fem.examples.ex_8_non_linear_portal import ss as SS_8
 
+try:
+    from anastruct.fem.cython import celements
+except ImportError:
+    celements = None
+
+
+def two_element_beam(q=None):
+    """
+    Beam of 10 m in two elements, hinged at the left end and on a roller at the right end.
+
+    :param q: (flt) Distributed load on the first element.
+    """
+    ss = se.SystemElements()
+    ss.add_element([[0, 0], [5, 0]])
+    ss.add_element([10, 0])
+    ss.add_support_hinged(1)
+    ss.add_support_roll(3)
+    if q is not None:
+        ss.q_load(q, element_id=1)
+    return ss
+
 
 class SimpleTest(unittest.TestCase):
     def test_example_1(self):
@@ -181,8 +209,8 @@ class SimpleTest(unittest.TestCase):
     def test_ex_19_nummerical_displacements_averaging(self):
         from anastruct.fem.examples.ex_19_num_displacements import ss
         ss.solve()
-        self.assertTrue(np.allclose([el.deflection.max() for el in ss.element_map.values()], [0.10318963656044,
-                                                                                              0.10318963656044]))
+        self.assertTrue(np.allclose([el.deflection.max() for el in ss.element_map.values()], [0.10796125908140,
+                                                                                              0.10796125908140]))
 
     def test_ex_20_insert_node(self):
         from anastruct.fem.examples.ex_20_insert_node import ss
@@ -236,6 +264,776 @@ class SimpleTest(unittest.TestCase):
         ss.solve()
         self.assertAlmostEqual(50, ss.get_node_results_system(3)['Fx'])
 
+    def test_add_elements_bulk(self):
+        x = np.array([0, 3, 6, 6, 3, 0])
+        y = np.array([0, 1, 0, 4, 5, 4])
+        springs = np.full((5, 2), np.nan)
+        springs[2, 1] = 1e3
+        ss1 = se.SystemElements()
+        for i in range(5):
+            spring = {2: 1e3} if i == 2 else None
+            ss1.add_element([[x[i], y[i]], [x[i + 1], y[i + 1]]], EI=100 * (i + 1), spring=spring)
+        ss2 = se.SystemElements.from_arrays(np.column_stack((x, y)), np.c_[np.arange(5), np.arange(1, 6)],
+                                            EI=100 * np.arange(1, 6), springs=springs)
+        for ss in (ss1, ss2):
+            ss.add_support_fixed([1, 6])
+            ss.point_load(3, Fx=10, Fy=-20)
+            ss.q_load(-3, [1, 4])
+        self.assertTrue(np.allclose(ss1.solve(), ss2.solve()))
+        for el1, el2 in zip(ss1.element_map.values(), ss2.element_map.values()):
+            self.assertEqual((el1.node_id1, el1.node_id2, el1.springs), (el2.node_id1, el2.node_id2, el2.springs))
+
+        ss2.add_elements_bulk([[6, 4], [6, 8]], [[0, 1]], element_type='truss')
+        self.assertEqual(ss2.element_map[6].node_id1, 4)
+        self.assertRaises(se.FEMException, ss2.add_elements_bulk, [[0, 0], [0, 0]], [[0, 1]])
+        self.assertRaises(se.FEMException, ss2.add_elements_bulk, [[0, 0], [1, 0]], [[0, 2]])
+        self.assertRaises(se.FEMException, ss2.add_elements_bulk, [[0, 0], [1, 0]], [[0, 1]], EA=[1, 2])
+        self.assertRaises(se.FEMException, ss2.add_elements_bulk, [[0, 0], [1, 0]], [[0, 1]], springs=[0, 0, 0])
+
+    def test_single_hinge(self):
+        nan = np.nan
+        # combinations of hinged and fixed element ends at node 2
+        x = [0, 5, 10, 5]
+        y = [0, 0, 0, 5]
+        connectivity = [[0, 1], [1, 2], [1, 3]]
+        for springs in ([[nan, 0], [0, nan], [nan, nan]], [[nan, 0], [0, nan], [0, nan]],
+                        [[nan, nan], [0, nan], [0, nan]], [[nan, 0], [nan, nan], [0, nan]]):
+            ss1 = se.SystemElements()
+            for (i, j), (k1, k2) in zip(connectivity, springs):
+                spring = {node: k for node, k in ((1, k1), (2, k2)) if not np.isnan(k)} or None
+                ss1.add_element([[x[i], y[i]], [x[j], y[j]]], spring=spring)
+            ss2 = se.SystemElements.from_arrays(np.column_stack((x, y)), connectivity, springs=springs)
+            # the same elements, partly added to an existing structure
+            ss3 = se.SystemElements.from_arrays(np.column_stack((x, y)), connectivity[:1], springs=springs[:1])
+            ss3.add_elements_bulk(np.column_stack((x, y)), connectivity[1:], springs=springs[1:])
+            # not all element ends at node 2 are hinged
+            self.assertFalse(all((el.springs or {}).get(1 if el.node_id1 == 2 else 2) == 0
+                                 for el in ss1.node_map[2].elements.values()))
+            for ss in (ss2, ss3):
+                self.assertEqual([el.springs or None for el in ss1.element_map.values()],
+                                 [el.springs for el in ss.element_map.values()], springs)
+
+        ss1 = se.SystemElements()
+        for i in range(3):
+            ss1.add_element([[i, 0], [i + 1, 0]], spring={1: 0})
+        ss2 = se.SystemElements()
+        ss2.add_element_grid([0, 1, 2, 3], [0, 0, 0, 0], spring={1: 0})
+        self.assertEqual([el.springs or None for el in ss1.element_map.values()],
+                         [el.springs for el in ss2.element_map.values()])
+
+    def test_split_element(self):
+        ss1 = se.SystemElements()
+        ss1.add_element([[0, 0], [3, 0]])
+        ss1.add_element([10, 0])
+        ss1.add_support_hinged(1)
+        ss1.add_support_roll(3)
+        ss1.q_load(-10, [1, 2])
+        ss1.point_load(2, Fy=-3)
+        ss1.solve()
+
+        ss2 = se.SystemElements()
+        ss2.add_element([[0, 0], [10, 0]])
+        ss2.add_support_hinged(1)
+        ss2.add_support_roll(2)
+        ss2.q_load(-10, 1)
+        self.assertEqual(ss2.split_element(1, factor=0.3), (3, 2))
+        ss2.point_load(3, Fy=-3)
+        ss2.solve()
+        self.assertAlmostEqual(ss1.get_node_displacements(2)["uy"], ss2.get_node_displacements(3)["uy"])
+
+    def test_remove_element_and_merge_nodes(self):
+        ss = se.SystemElements()
+        ss.add_element([[0, 0], [5, 0]])
+        ss.add_element([10, 0])
+        ss.add_element([[5, 0], [5, 5]])
+        ss.add_support_fixed(1)
+        ss.add_support_hinged(3)
+        ss.point_load(4, Fx=10)
+        ss.remove_element(2)
+        self.assertEqual(sorted(ss.node_map), [1, 2, 4])
+        self.assertEqual(ss.supports_hinged, [])
+        ss.solve()
+        self.assertAlmostEqual(ss.get_node_results_system(1)["Fx"], 10)
+
+        ss = se.SystemElements()
+        ss.add_element([[0, 0], [5, 0]])
+        ss.add_element([[5, 0.5], [10, 0]])
+        ss.add_support_hinged(1)
+        ss.add_support_roll(4)
+        ss.point_load(3, Fy=-5)
+        self.assertEqual(ss.merge_nodes(2, 3), 2)
+        self.assertEqual(sorted(ss.node_map), [1, 2, 4])
+        ss.solve()
+        self.assertAlmostEqual(ss.get_node_results_system(1)["Fy"], -2.5)
+
+        ss = se.SystemElements()
+        ss.add_element([[0, 0], [5, 0]])
+        ss.add_element([10, 0])
+        ss.add_element([15, 0])
+        ss.add_support_roll(1, direction='y')
+        ss.add_support_hinged(2)
+        ss.add_support_roll(4)
+        ss.add_support_spring(4, 3, 1e3)
+        ss.q_load(-10, [2, 3])
+        ss.remove_element(1)
+        self.assertEqual(ss.supports_roll, [ss.node_map[4]])
+        self.assertEqual(ss.supports_roll_direction, [2])
+        self.assertEqual(ss._supports_by_node[4], {'supports_roll', 'supports_spring_y', 'supports_spring_args'})
+        self.assertNotIn(1, ss._supports_by_node)
+        ss.solve()
+        # the results of the remaining elements can be plotted
+        self.assertEqual(len(ss.plot_values.bending_moment(None)[0]), 2 * (ss.plot_values.mesh + 2))
+
+    def test_result_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory)
+            ss1 = two_element_beam(-10)
+            ss1.result_cache = cache
+            key = ss1.fingerprint(force_linear=False, max_iter=200, geometrical_non_linear=False)
+            ss1.solve()
+            self.assertIn(key, cache)
+
+            ss2 = two_element_beam(-10)
+            self.assertEqual(ss2.fingerprint(), two_element_beam(-10).fingerprint())
+            ss2.result_cache = cache
+            u = ss2.solve()
+            self.assertTrue(np.allclose(u, ss1.system_displacement_vector))
+            self.assertAlmostEqual(ss2.get_node_results_system(1)["Fy"], ss1.get_node_results_system(1)["Fy"])
+
+            ss3 = two_element_beam(-10)
+            ss3.point_load(2, Fy=-1)
+            self.assertNotEqual(ss3.fingerprint(), ss2.fingerprint())
+
+            ss3.result_cache = cache
+            ss3.solve()
+
+            # a hit restores the adapted stiffness of the non linear elements
+            from anastruct.fem.tests.benchmark.models import portal
+            uncached = portal(1)
+            uncached.solve()
+            ss4 = portal(1)
+            ss4.result_cache = cache
+            ss4.solve()
+            ss5 = portal(1)
+            ss5.result_cache = cache
+            ss5.solve()
+            self.assertEqual(ss5.non_linear_history.as_dict(), uncached.non_linear_history.as_dict())
+            for el, expected in zip(ss5.element_map.values(), uncached.element_map.values()):
+                self.assertEqual(el.nodes_plastic, expected.nodes_plastic)
+                self.assertTrue(np.allclose(el.constitutive_matrix, expected.constitutive_matrix))
+                self.assertTrue(np.allclose(el.stiffness_matrix, expected.stiffness_matrix))
+
+            for ss in (uncached, ss5):
+                ss.point_load(2, Fx=1)
+                ss.solve()
+            self.assertTrue(np.allclose(ss5.system_displacement_vector, uncached.system_displacement_vector))
+            self.assertEqual(len(ss5.non_linear_history), len(uncached.non_linear_history))
+            # other files in the directory are no entries
+            ss5.save(os.path.join(directory, 'model.npz'))
+            cache.max_bytes = 1
+            cache.evict()
+            self.assertEqual(cache.size, 0)
+            cache.clear()
+            self.assertEqual(os.listdir(directory), ['model.npz'])
+
+    def test_solve_reuses_factorization(self):
+        ss = two_element_beam()
+        ss.point_load(2, Fy=-10)
+        ss.solve()
+        lu = ss._lu
+        self.assertEqual(ss._dirty, frozenset())
+
+        # only the loads changed
+        ss.q_load(-2, element_id=1)
+        ss.point_load(2, Fx=3)
+        ss.solve()
+        self.assertIs(ss._lu, lu)
+
+        ss2 = two_element_beam()
+        ss2.q_load(-2, element_id=1)
+        ss2.point_load(2, Fx=3)
+        ss2.solve()
+        self.assertTrue(np.allclose(ss.system_displacement_vector, ss2.system_displacement_vector))
+
+        # a changed support triggers a new factorization
+        ss.add_support_hinged(3)
+        ss.solve()
+        self.assertIsNot(ss._lu, lu)
+        self.assertAlmostEqual(ss.get_node_displacements(3)["ux"], 0)
+
+    def test_lazy_element_results(self):
+        ss = se.SystemElements()
+        ss.add_element([[0, 0], [5, 0]])
+        ss.add_support_hinged(1)
+        ss.add_support_roll(2)
+        ss.q_load(-10, element_id=1)
+        ss.solve()
+        el = ss.element_map[1]
+        batch = el._results_batch
+        self.assertEqual(batch._arrays, {})
+
+        el.shear_force
+        self.assertEqual(sorted(batch._arrays), ["shear_force"])
+        self.assertEqual(batch["bending_moment"].shape, (1, ss.plotter.mesh))
+        self.assertEqual(len(el.bending_moment), ss.plotter.mesh)
+        self.assertAlmostEqual(np.max(np.abs(el.bending_moment)), 10 * 5 ** 2 / 8, places=1)
+
+        # closed form fields
+        self.assertAlmostEqual(batch.evaluate("deflection", 2.5)[0, 0], 5 * 10 * 5 ** 4 / (384 * 5e3))
+        self.assertAlmostEqual(batch.evaluate("shear_force", [0, 5])[0, 1] - batch.evaluate("shear_force", 0)[0, 0], 50)
+
+        # the results belong to the loads of the last calculation
+        ss.q_load(-20, element_id=1)
+        self.assertAlmostEqual(el.max_deflection, 5 * 10 * 5 ** 4 / (384 * 5e3), places=3)
+        ss.solve()
+        self.assertAlmostEqual(el.max_deflection, 5 * 20 * 5 ** 4 / (384 * 5e3), places=3)
+
+    def test_element_results_extrema(self):
+        ss = se.SystemElements(mesh=4)
+        ss.add_element([[0, 0], [5, 0]])
+        ss.add_support_hinged(1)
+        ss.add_support_roll(2)
+        ss.q_load(-10, element_id=1)
+        ss.solve()
+        r = ss.get_element_results(1, extrema=True)
+        self.assertAlmostEqual(r["Mmin"], -10 * 5 ** 2 / 8)
+        self.assertAlmostEqual(r["x_Mmin"], 2.5)
+        self.assertAlmostEqual(r["wmin"], 5 * 10 * 5 ** 4 / (384 * 5e3))
+        self.assertAlmostEqual(r["x_wmin"], 2.5)
+        self.assertAlmostEqual(r["Vmax"] - r["Vmin"], 50)
+        # the sampled arrays are not computed
+        self.assertNotIn("bending_moment", ss.post_processor.results._arrays)
+        self.assertNotIn("deflection", ss.post_processor.results._arrays)
+
+    def test_node_results_arrays(self):
+        ss = se.SystemElements()
+        ss.add_element([[0, 0], [5, 0]])
+        ss.add_element([10, 0])
+        ss.add_support_hinged(1)
+        ss.add_support_roll(3)
+        ss.point_load(2, Fy=-10)
+        ss.solve()
+        node = ss.node_map[2]
+        self.assertTrue(np.allclose(ss.post_processor.node_results[1], [node.Fx, node.Fz, node.Ty, node.ux, node.uz,
+                                                                         node.phi_y]))
+        self.assertAlmostEqual(ss.reaction_forces[1].Fy, 5)
+
+        ss.point_load(2, Fy=-20)
+        ss.solve()
+        # the nodes are updated in place
+        self.assertIs(ss.node_map[2], node)
+        # the load is in equilibrium with the element end forces
+        self.assertAlmostEqual(node.Fy, 0)
+        self.assertAlmostEqual(ss.reaction_forces[1].Fy, 10)
+        self.assertAlmostEqual(ss.node_map[1].Fy, -10)
+        # the displacements are read from the system displacement vector
+        self.assertTrue(np.allclose(ss.post_processor.node_results[:, 3:],
+                                    -ss.system_displacement_vector.reshape(-1, 3)))
+
+        ss = two_element_beam(-2)
+        ss.add_element([15, 0])
+        ss.add_support_roll(4, angle=30)
+        ss.solve()
+        # inclined supports in the local coordinate system, as at the element ends
+        for el in ss.element_map.values():
+            for node_id, end in ((el.node_id1, 0), (el.node_id2, 1)):
+                self.assertTrue(np.allclose(ss.post_processor.node_results[node_id - 1, 3:],
+                                            -ss.post_processor.element_node_results[el.id - 1, end, 3:]))
+
+    def test_reaction_forces_arrays(self):
+        ss = se.SystemElements(load_factor=2)
+        ss.add_element([[0, 0], [5, 0]])
+        ss.add_element([10, 0])
+        ss.add_support_fixed(1)
+        ss.add_support_spring(3, 2, 1e3)
+        ss.point_load(2, Fy=-10)
+        ss.solve()
+        pp = ss.post_processor
+        self.assertEqual(pp.reaction_node_ids.tolist(), [1, 3])
+        # vertical equilibrium with the factored load
+        self.assertAlmostEqual(-pp.reactions[:, 1].sum(), 20)
+        self.assertAlmostEqual(ss.reaction_forces[3].Fy, 1e3 * -ss.get_node_displacements(3)["uy"])
+        self.assertLess(pp.equilibrium_residual, 1e-9)
+
+    def test_element_vectors_batched(self):
+        ss = se.SystemElements()
+        ss.add_element([[0, 0], [5, 0]])
+        ss.add_element([5, 5])
+        ss.add_support_fixed(1)
+        ss.add_support_hinged(3)
+        ss.q_load(-2, 1)
+        ss.point_load(2, Fx=5)
+        ss.solve()
+        vectors = ss._element_vectors
+        for i, el in enumerate(ss.element_map.values()):
+            # the element vectors are rows of the arrays of all elements
+            self.assertTrue(np.shares_memory(el.element_force_vector, vectors.force))
+            self.assertTrue(np.allclose(el.element_force_vector,
+                                        np.dot(el.stiffness_matrix, el.element_displacement_vector)))
+            self.assertTrue(np.allclose(el.element_displacement_vector, ss.system_displacement_vector[vectors.dofs[i]]))
+
+        # copies have their own vectors
+        ss2 = copy.deepcopy(ss)
+        ss2.point_load(2, Fx=10)
+        ss2.solve()
+        self.assertFalse(np.allclose(ss2.element_map[1].element_force_vector, ss.element_map[1].element_force_vector))
+        self.assertTrue(np.allclose(ss.element_map[1].element_force_vector, vectors.force[0]))
+
+    def test_result_arrays(self):
+        ss = se.SystemElements()
+        ss.add_element([[0, 0], [5, 0]])
+        ss.add_element([10, 0])
+        ss.add_truss_element([[5, 0], [5, 4]])
+        ss.add_support_hinged(1)
+        ss.add_support_roll(3)
+        ss.add_support_hinged(4)
+        ss.point_load(2, Fx=2, Fy=-10)
+        ss.q_load(-2, 1)
+        ss.solve()
+
+        nodes = ss.get_node_result_arrays()
+        for row in ss.get_node_results_system():
+            i = nodes["id"].tolist().index(row[0])
+            self.assertTrue(np.allclose(row[1:], [nodes[k][i] for k in ("Fx", "Fy", "Ty", "ux", "uy", "phi_y")]))
+
+        elements = ss.get_element_result_arrays(extrema=True)
+        for result in ss.get_element_results(extrema=True):
+            i = elements["id"].tolist().index(result["id"])
+            for k, v in result.items():
+                self.assertAlmostEqual(v, elements[k][i])
+        # trusses don't have a deflection
+        self.assertTrue(np.isnan(elements["wmax"][2]))
+
+    def test_result_storage(self):
+        ss = two_element_beam(-2)
+        ss.solve()
+        ss_compact = two_element_beam(-2)
+        ss_compact.set_result_storage(np.float32, points=2)
+        ss_compact.solve()
+
+        el = ss_compact.element_map[1]
+        self.assertEqual(el.bending_moment.dtype, np.float32)
+        self.assertEqual(el.bending_moment.size, 2)
+        self.assertEqual(el.shear_force.size, 3)
+        self.assertTrue(np.allclose(el.bending_moment, ss.element_map[1].bending_moment[[0, -1]], atol=1e-5))
+        # the exact extremes don't depend on the storage
+        self.assertAlmostEqual(ss_compact.get_element_results(1, extrema=True)["Mmin"],
+                               ss.get_element_results(1, extrema=True)["Mmin"])
+
+        self.assertLess(ss_compact.memory_footprint()["element_results"], ss.memory_footprint()["element_results"])
+        footprint = ss.memory_footprint()
+        self.assertEqual(footprint["total"], sum(v for k, v in footprint.items() if k != "total"))
+
+        with self.assertRaises(se.FEMException):
+            ss.set_result_storage(int)
+
+    def test_snapshot(self):
+        ss = two_element_beam(-2)
+        ss.solve()
+        moment = ss.element_map[1].bending_moment.copy()
+        nodes = ss.get_node_results_system()
+
+        snapshot = ss.snapshot()
+        self.assertIs(snapshot.element_map[1], ss.element_map[1])
+        snapshot.point_load(2, Fy=-10)
+        # only the modified part of the model is copied
+        self.assertIsNot(snapshot.loads_point, ss.loads_point)
+        self.assertIs(snapshot.element_map, ss.element_map)
+        self.assertIs(snapshot.supports_roll, ss.supports_roll)
+        snapshot.q_load(-2, 2)
+        self.assertIsNot(snapshot.element_map[2], ss.element_map[2])
+        self.assertIs(snapshot.element_map[1], ss.element_map[1])
+        self.assertIs(snapshot.node_map[2].elements[2], snapshot.element_map[2])
+        self.assertIs(snapshot.node_map[1], ss.node_map[1])
+        self.assertEqual(ss.element_map[2].q_load, 0)
+        # the model state is copied by the calculation, the matrices stay shared
+        snapshot.solve()
+        self.assertIsNot(snapshot.element_map[1], ss.element_map[1])
+        self.assertIs(snapshot.element_map[1].stiffness_matrix, ss.element_map[1].stiffness_matrix)
+
+        reference = two_element_beam(-2)
+        reference.point_load(2, Fy=-10)
+        reference.q_load(-2, 2)
+        reference.solve()
+        self.assertTrue(np.allclose(snapshot.get_node_results_system(), reference.get_node_results_system()))
+        self.assertTrue(np.allclose(ss.element_map[1].bending_moment, moment))
+        self.assertTrue(np.allclose(ss.get_node_results_system(), nodes))
+        self.assertEqual(ss.loads_point, {})
+
+        # editing the topology of a snapshot copies the touched nodes and elements
+        def edit(system):
+            system.add_element([15, 0])
+            system.add_support_hinged(4)
+            system.remove_element(1)
+            system.q_load(-1, 2)
+
+        snapshot = ss.snapshot()
+        snapshot.add_element([15, 0])
+        self.assertIs(snapshot.element_map[1], ss.element_map[1])
+        self.assertIsNot(snapshot.node_map[3], ss.node_map[3])
+        self.assertEqual(list(ss.node_map[3].elements), [2])
+        self.assertIs(snapshot.supports_roll[0], snapshot.node_map[3])
+        self.assertIs(ss.supports_roll[0], ss.node_map[3])
+        snapshot = ss.snapshot()
+        edit(snapshot)
+        self.assertIn(1, ss.element_map)
+        self.assertEqual(len(ss.node_element_map[2]), 2)
+        snapshot.solve()
+        reference = two_element_beam(-2)
+        edit(reference)
+        reference.solve()
+        self.assertTrue(np.allclose(snapshot.get_node_results_system(), reference.get_node_results_system()))
+        ss.solve()
+        self.assertTrue(np.allclose(ss.get_node_results_system(), nodes))
+
+        # a load change doesn't depend on the size of the model
+        from anastruct.fem.tests.benchmark.models import beam
+        ss = beam(20000)
+        snapshot = ss.snapshot()
+        snapshot.point_load(2, Fy=-1)
+        ss.point_load(3, Fy=-1)
+        self.assertTrue(snapshot.node_map is ss.node_map and snapshot.element_map is ss.element_map)
+        # the maps are copied, the loaded element and its nodes are copied
+        snapshot.q_load(-1, 2)
+        self.assertEqual(sum(a is not b for a, b in zip(snapshot.element_map.values(), ss.element_map.values())), 1)
+        self.assertEqual(sum(a is not b for a, b in zip(snapshot.node_map.values(), ss.node_map.values())), 2)
+
+    def test_save_load(self):
+        ss = se.SystemElements()
+        ss.add_element([[0, 0], [5, 0]], mp={2: 40})
+        ss.add_element([10, 0], spring={2: 0})
+        ss.add_truss_element([[10, 0], [5, 4]])
+        ss.add_support_hinged(1)
+        ss.add_support_roll(3, angle=30)
+        ss.add_support_spring(4, 1, 100)
+        ss.q_load(-2, 1)
+        ss.point_load(2, Fx=2, Fy=-10)
+        ss.solve()
+        nodes = ss.get_node_results_system()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = directory + '/model.npz'
+            ss.save(path, results=True)
+            loaded = se.SystemElements.load(path)
+            self.assertTrue(np.allclose(loaded.get_node_results_system(), nodes))
+            self.assertEqual(loaded.non_linear_elements, ss.non_linear_elements)
+
+            ss.save(path)
+            loaded = se.SystemElements.load(path)
+            self.assertIsNone(loaded.system_displacement_vector)
+            loaded.solve()
+            self.assertTrue(np.allclose(loaded.get_node_results_system(), nodes))
+
+        ss.plotter
+        self.assertIsNone(ss.__getstate__()['_plotter'])
+        unpickled = pickle.loads(pickle.dumps(ss))
+        self.assertTrue(np.allclose(unpickled.get_node_results_system(), nodes))
+        self.assertIs(unpickled.plot_values.system, unpickled)
+        self.assertIs(unpickled.plotter.system, unpickled)
+
+    def test_result_store(self):
+        ss = se.SystemElements()
+        ss.add_element([[0, 0], [5, 0]])
+        ss.add_element([10, 0])
+        ss.add_support_hinged(1)
+        ss.add_support_roll(3)
+        ss.q_load(-2, 1)
+        ss.solve()
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = ResultStore.create(directory, ss, capacity=2)
+
+            # same number of nodes, elements and supports, but other element ids
+            other = se.SystemElements()
+            other.add_element([[0, 0], [5, 0]])
+            other.add_element([10, 0])
+            other.add_element([15, 0])
+            other.remove_element(2)
+            other.add_element([[5, 0], [10, 0]])
+            other.remove_element(3)
+            other.add_support_hinged(1)
+            other.add_support_roll(3)
+            other.point_load(2, Fy=-10)
+            other.solve()
+            with self.assertRaises(se.FEMException):
+                store.append(other)
+
+            for F in (-10, -20):
+                ss.point_load(2, Fy=F)
+                ss.solve()
+                store.append(ss, F=F)
+            with self.assertRaises(se.FEMException):
+                store.append(ss)
+
+            reader = ResultStore(directory)
+            self.assertEqual(len(reader), 2)
+            self.assertEqual(reader.runs, [{"F": -10}, {"F": -20}])
+            self.assertAlmostEqual(reader['node_displacements'][1, 1, 1], ss.get_node_displacements(2)["uy"] * -1)
+            self.assertAlmostEqual(reader['reactions'][1, 0, 1], ss.reaction_forces[1].Fy)
+            self.assertAlmostEqual(reader['element_envelopes'][1, 0, 0],
+                                   ss.get_element_results(1, extrema=True)["Mmin"])
+            del store, reader
+
+    def test_lazy_imports(self):
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (root, os.environ.get("PYTHONPATH")))))
+        out = subprocess.check_output(
+            [sys.executable, "-c", "import sys, anastruct; print('matplotlib' in sys.modules, 'scipy' in sys.modules); "
+                                   "from anastruct.fem.plotter import Plotter; print('matplotlib' in sys.modules)"],
+            env=dict(env, MPLBACKEND="Agg"))
+        self.assertEqual(out.split(), [b"False", b"False", b"True"])
+
+        ss = se.SystemElements()
+        ss.add_element([[0, 0], [5, 0]])
+        ss.add_support_hinged(1)
+        ss.add_support_roll(2)
+        ss.q_load(-2, 1)
+        ss.point_load(2, Fx=3, Fy=4)
+        self.assertIsNone(ss._plotter)
+        self.assertEqual((ss.plot_values.max_q, ss.plot_values.max_system_point_load), (2, 5))
+        self.assertIs(ss.plotter.system, ss)
+        self.assertIs(ss.snapshot()._plotter, None)
+
+    def test_kernels(self):
+        from anastruct.fem import elements
+        from anastruct.fem.system_components import assembly
+        angle = np.array([0.3, 1.2, 4.0])
+        l = np.array([2.0, 3.0, 4.5])
+        spring = np.array([np.nan, 0, 500.0])
+        kinematic = elements.kinematic_matrices(angle, angle, l)
+        constitutive = elements.constitutive_matrices(np.full(3, 1e3), np.full(3, 2e3), l, spring, spring[::-1])
+        stiffness = elements.stiffness_matrices(constitutive, kinematic)
+        for i in range(3):
+            springs = {n: k for n, k in ((1, spring[i]), (2, spring[::-1][i])) if not np.isnan(k)}
+            self.assertTrue(np.allclose(kinematic[i], elements.kinematic_matrix(angle[i], angle[i], l[i])))
+            self.assertTrue(np.allclose(constitutive[i], elements.constitutive_matrix(1e3, 2e3, l[i], springs or None)))
+            self.assertTrue(np.allclose(stiffness[i], elements.stiffness_matrix(constitutive[i], kinematic[i])))
+
+        ss = se.SystemElements()
+        ss.add_element([[0, 0], [3, 4]])
+        ss.add_element([8, 4], spring={2: 100})
+        ss.add_element([[3, 4], [3, 0]])
+        ss.add_support_fixed([1, 4])
+        ss.add_support_hinged(3)
+        ss.q_load(-10, [1, 2])
+        ss.solve()
+        expected = np.zeros_like(ss.system_matrix)
+        for el in ss.element_map.values():
+            dofs = ((np.array([el.node_id1, el.node_id2]) - 1)[:, None] * 3 + np.arange(3)).ravel()
+            expected[np.ix_(dofs, dofs)] += el.stiffness_matrix
+        assembly.assemble_system_matrix(ss)
+        self.assertTrue(np.allclose(ss.system_matrix, expected))
+        self.assertEqual(ss._element_stiffness.shape, (3, 6, 6))
+
+    @unittest.skipUnless(celements, "The compiled kernels are not built.")
+    def test_compiled_kernels(self):
+        from anastruct.fem.cython import elements as fallback
+        rng = np.random.default_rng(0)
+        n = 50
+        a1 = rng.uniform(0, 2 * np.pi, n)
+        a2 = a1 + rng.uniform(-0.1, 0.1, n)
+        l = rng.uniform(1, 5, n)
+        EA = rng.uniform(1e3, 1e6, n)
+        EI = rng.uniform(1e3, 1e5, n)
+        # hinges, springs and rigid connections
+        spring_1, spring_2 = np.where(rng.random((2, n)) < 0.3, 0, np.where(rng.random((2, n)) < 0.5, np.nan,
+                                                                            rng.uniform(1e2, 1e5, (2, n))))
+        q = rng.uniform(-10, 10, n)
+        kl, kr = rng.uniform(0, 1e6, (2, n))
+        x = rng.uniform(0, 1, n) * l
+        dofs = (np.column_stack((np.arange(n), (np.arange(n) + 7) % n))[:, :, None] * 3 + np.arange(3)).reshape(n, 6)
+
+        def kernels(module):
+            kinematic = module.kinematic_matrices(a1, a2, l)
+            constitutive = module.constitutive_matrices(EA, EI, l, spring_1, spring_2)
+            stiffness = module.stiffness_matrices(constitutive, kinematic)
+            system_matrix = np.zeros((3 * n, 3 * n))
+            module.assemble_matrices(system_matrix, stiffness, dofs)
+            return {
+                "kinematic_matrices": kinematic,
+                "constitutive_matrices": constitutive,
+                "constitutive_matrices_rigid": module.constitutive_matrices(EA, EI, l),
+                "stiffness_matrices": stiffness,
+                "stiffness_matrix": [module.stiffness_matrix(c, k) for c, k in zip(constitutive, kinematic)],
+                "assemble_matrices": system_matrix,
+                # the q-load arrays, at the element ends as in the assembly and along the elements
+                "det_moment_array": [module.det_moment_array(kl, kr, q, v, EI, l) for v in (0, l, x)],
+                "det_shear_array": [module.det_shear_array(kl, kr, q, v, EI, l) for v in (0, l, x)],
+                "det_moment": [module.det_moment(*v) for v in zip(kl, kr, q, x, EI, l)],
+                "det_shear": [module.det_shear(*v) for v in zip(kl, kr, q, x, EI, l)],
+            }
+
+        expected = kernels(fallback)
+        for name, result in kernels(celements).items():
+            self.assertTrue(np.allclose(result, expected[name], rtol=1e-9, atol=1e-9), name)
+
+    def test_benchmark_suite(self):
+        from anastruct.fem.tests.benchmark import models, suite
+        case = suite.run_case(models.beam, 10, repeat=1)
+        self.assertEqual(case["n_elements"], 10)
+        self.assertEqual(set(case["phases"]), set(suite.PHASES))
+        self.assertTrue(all(v["time"] > 0 and v["peak_memory"] > 0 for v in case["phases"].values()))
+
+        baseline = {"results": [dict(model="beam", size=10, **case)]}
+        current = copy.deepcopy(baseline)
+        self.assertFalse(any(row["regressed"] for row in suite.compare(baseline, current)))
+        current["results"][0]["phases"]["solve"]["time"] = case["phases"]["solve"]["time"] * 2 + 1
+        rows = suite.compare(baseline, current)
+        self.assertEqual([row["phase"] for row in rows if row["regressed"]], ["solve"])
+
+        for name, (generator, _, quick_sizes) in models.MODELS.items():
+            ss = generator(quick_sizes[0])
+            ss.solve()
+            self.assertTrue(np.all(np.isfinite(ss.get_node_result_arrays()["uy"])), name)
+
+        case = suite.run_case(models.line, 1000, repeat=1, build_only=True)
+        self.assertEqual((case["n_elements"], list(case["phases"])), (1000, ["build"]))
+
+    def test_solve_stats(self):
+        from anastruct.fem.tests.benchmark.models import portal
+        ss = portal(1)
+        ss.solve()
+        self.assertIsNone(ss.last_solve_stats)
+
+        ss = portal(1)
+        ss.collect_solve_stats = True
+        ss.solve()
+        stats = ss.last_solve_stats
+        self.assertGreater(stats.non_linear_iterations, 1)
+        self.assertEqual(stats.calls["factorization"], stats.non_linear_iterations)
+        self.assertEqual(stats.calls["post_processing"], 1)
+        self.assertEqual(stats.matrix_size, 21)
+        self.assertEqual(stats.nonzeros, np.count_nonzero(ss.system_matrix))
+        self.assertLessEqual(sum(stats.times.values()), stats.total)
+        self.assertIsNone(ss._solve_stats)
+
+        ss = se.SystemElements()
+        ss.add_element([[0, 0], [0, 4]])
+        ss.add_element([[0, 4], [4, 4]])
+        ss.add_support_fixed(1)
+        ss.add_support_hinged(3)
+        ss.point_load(2, Fy=-10)
+        ss.collect_solve_stats = True
+        ss.solve(geometrical_non_linear=True, discretize_kwargs=dict(n=3))
+        self.assertEqual(ss.last_solve_stats.calls["buckling_eigensolver"], 1)
+        ss.solve()
+        ss.point_load(2, Fx=1)
+        ss.solve()
+        self.assertNotIn("factorization", ss.last_solve_stats.calls)
+        self.assertEqual(ss.last_solve_stats.as_dict()["calls"]["linear_solve"], 1)
+
+    def test_instrumentation(self):
+        from anastruct.fem.tests.benchmark.models import portal
+        from anastruct.fem.util.instrument import JsonLinesSink, profile
+        ss = portal(1)
+        events = []
+        ss.hooks.append(events.append)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "events.jsonl")
+            sink = JsonLinesSink(path)
+            ss.hooks.append(sink)
+            self.assertIs(copy.deepcopy(ss).hooks[1], sink)
+            self.assertEqual(pickle.loads(pickle.dumps(ss)).hooks, [])
+            with profile(memory=True) as p:
+                ss.solve()
+            sink.close()
+            with open(path) as f:
+                self.assertEqual(len(f.readlines()), len(events))
+
+            names = [e["event"] for e in events]
+            self.assertEqual((names[0], names[-1]), ("solve_start", "solve_end"))
+            iterations = [e for e in events if e["event"] == "iteration"]
+            self.assertEqual(len(iterations), events[-1]["non_linear_iterations"])
+            self.assertTrue(np.allclose(iterations[-1]["factors"], 1, 1e-3))
+            self.assertEqual(names.count("phase_start"), names.count("phase_end"))
+            self.assertIsNone(ss.last_solve_stats)
+            self.assertIn("_solve", p.report())
+            self.assertGreater(p.peak_memory, 0)
+
+            root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+            env = dict(os.environ, ANASTRUCT_PROFILE=directory, ANASTRUCT_EVENTS=path,
+                       PYTHONPATH=os.pathsep.join(filter(None, (root, os.environ.get("PYTHONPATH")))))
+            subprocess.check_call([sys.executable, "-c", "from anastruct.fem.tests.benchmark.models import beam; "
+                                                         "beam(10).solve()"], env=env)
+            self.assertEqual(len([f for f in os.listdir(directory) if f.endswith(".prof")]), 1)
+            with open(path) as f:
+                self.assertIn("solve_end", f.readlines()[-1])
+
+    def test_non_linear_history(self):
+        from anastruct.fem.tests.benchmark.models import portal
+        ss = portal(1)
+        ss.solve()
+        history = ss.non_linear_history
+        self.assertTrue(history.converged)
+        self.assertLess(history.max_deviation[-1], 1e-3)
+        self.assertEqual(history.plastic_nodes[-1], 4)
+        self.assertEqual(history.damped_nodes[-1], 0)
+        self.assertEqual(len(history.as_dict()["residual"]), len(history))
+
+        def overloaded():
+            ss = portal(1)
+            ss.q_load(-160 / 3, [3, 4])
+            ss.q_load(-8 / 3, [1, 2])
+            return ss
+
+        ss = portal(1)
+        with self.assertLogs(level="WARNING"):
+            ss.solve(max_iter=10)
+        self.assertEqual(ss.non_linear_history.reason, "max_iter")
+
+        # the hinges form a mechanism, the damped and accelerated updates must not report it as converged
+        for options in ({}, {"damp_oscillations": False}, {"accelerate": "aitken"}):
+            ss = overloaded()
+            with self.assertLogs(level="WARNING") as logs:
+                ss.solve(**options)
+            self.assertEqual(ss.non_linear_history.reason, "collapsed")
+            self.assertIn("collapsed", logs.output[0])
+
+        ss = overloaded()
+        with self.assertLogs(level="WARNING"):
+            ss.solve(collapse_ratio=None, damp_oscillations=False, max_iter=100)
+        self.assertEqual(ss.non_linear_history.reason, "max_iter")
+
+        ss = overloaded()
+        with self.assertLogs(level="WARNING"):
+            ss.solve(stall_iter=10)
+        self.assertEqual(ss.non_linear_history.reason, "stalled")
+        self.assertLess(len(ss.non_linear_history), 100)
+
+    def test_non_linear_acceleration(self):
+        from anastruct.basic import FEMException
+        from anastruct.fem.tests.benchmark.models import portal, plastic_frame
+        for generator, n in ((portal, 1), (plastic_frame, 4)):
+            ss = generator(n)
+            ss.solve()
+            accelerated = generator(n)
+            accelerated.solve(accelerate="aitken")
+            self.assertTrue(accelerated.non_linear_history.converged)
+            self.assertLess(len(accelerated.non_linear_history), len(ss.non_linear_history) / 3)
+            self.assertEqual(accelerated.non_linear_history.plastic_nodes[-1], ss.non_linear_history.plastic_nodes[-1])
+            self.assertTrue(np.allclose(accelerated.get_element_result_range("moment"),
+                                        ss.get_element_result_range("moment"), atol=0.5))
+
+        with self.assertRaises(FEMException):
+            portal(1).solve(accelerate="anderson")
+
+    def test_non_linear_element_state(self):
+        from anastruct.fem.cython.elements import stiffness_matrix
+        from anastruct.fem.tests.benchmark.models import portal
+        ss = portal(1)
+        original = {id_: el.constitutive_matrix.copy() for id_, el in ss.element_map.items()}
+        copied = ss.snapshot()
+        ss.solve()
+        self.assertEqual(sum(sum(el.nodes_plastic) for el in ss.element_map.values()),
+                         ss.non_linear_history.plastic_nodes[-1])
+        for id_, el in ss.element_map.items():
+            self.assertTrue(np.allclose(el.stiffness_matrix, stiffness_matrix(el.constitutive_matrix,
+                                                                              el.kinematic_matrix)))
+            if any(el.nodes_plastic):
+                self.assertLess(abs(el.constitutive_matrix[1][2]), abs(original[id_][1][2]) * 0.999)
+            # the matrices of the snapshot are not modified
+            self.assertTrue(np.array_equal(copied.element_map[id_].constitutive_matrix, original[id_]))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,185 @@
+import hashlib
+import os
+import re
+import tempfile
+import numpy as np
+from anastruct.fem.util import serialize
+
+# Bump when the layout of the fingerprint or the stored arrays changes, so old cache files are never reused.
+CACHE_VERSION = 3
+# Only files named after a fingerprint are entries, other files in the directory (e.g. saved models) are left alone.
+_ENTRY = re.compile(r'[0-9a-f]{64}\.npz$')
+
+
+def fingerprint(system, **options):
+    """
+    Deterministic fingerprint of a model. Two models with equal fingerprints give the same results.
+
+    The fingerprint covers the geometry, the element stiffness (including the current state of non linear
+    elements), the supports, the springs, the loads and the given solve options.
+
+    :param system: (:class:`.SystemElements`)
+    :param options: Solve options that influence the results, e.g. force_linear, max_iter, geometrical_non_linear.
+    :return: (str) Hexadecimal sha256 digest.
+    """
+    h = hashlib.sha256()
+
+    def update_array(a):
+        a = np.ascontiguousarray(a)
+        h.update(repr((a.dtype.str, a.shape)).encode())
+        h.update(a.tobytes())
+
+    def update_object(obj):
+        h.update(repr(obj).encode())
+        h.update(b'\x00')
+
+    update_object(CACHE_VERSION)
+
+    elements = list(system.element_map.values())
+    update_array(np.array([(el.id, el.node_id1, el.node_id2) for el in elements], dtype=np.int64))
+    update_array(np.array([(el.vertex_1.x, el.vertex_1.y, el.vertex_2.x, el.vertex_2.y, el.EA, el.EI,
+                            el.dead_load, el.q_load) for el in elements], dtype=float))
+    update_object([(el.type, el.q_direction, el.springs) for el in elements])
+    if elements:
+        update_array(np.stack([el.stiffness_matrix for el in elements]))
+
+    update_object(sorted(system.node_map.keys()))
+    update_object([node.id for node in system.supports_fixed])
+    update_object([node.id for node in system.supports_hinged])
+    update_object([node.id for node in system.supports_roll])
+    update_object(system.supports_roll_direction)
+    update_object(sorted(system.inclined_roll.items()))
+    update_object(sorted(system.supports_spring_args))
+    update_object(sorted(system.non_linear_elements.items()))
+
+    update_object(sorted(system.loads_point.items()))
+    update_object(sorted(system.loads_moment.items()))
+    update_object(sorted(system.loads_q.items()))
+    update_object(sorted(system.loads_dead_load))
+    update_object((system.load_factor, system.orientation_cs))
+
+    update_object(sorted(options.items()))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Opt-in disk cache of solved results, keyed by the :func:`fingerprint` of a model.
+
+    Every entry is a compressed .npz file in `directory`, named after the fingerprint. When the total size of the
+    entries exceeds `max_bytes` the least recently used entries are removed.
+
+    Activate the cache by assigning it to a system::
+
+        ss.result_cache = ResultCache('~/.cache/anastruct')
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 ** 2):
+        """
+        :param directory: (str) Directory where the cache files are stored. Is created if it doesn't exist.
+        :param max_bytes: (int) Maximum total size of the cache files.
+        """
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def _entries(self):
+        for name in os.listdir(self.directory):
+            if _ENTRY.match(name):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def __contains__(self, key):
+        return os.path.isfile(self._path(key))
+
+    @property
+    def size(self):
+        """
+        :return: (int) Total size of the cache files in bytes.
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    def get(self, key):
+        """
+        :param key: (str) Fingerprint of the model.
+        :return: (dict) Stored arrays, or None if the key is not cached.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as f:
+                arrays = {k: f[k] for k in f.files}
+        except (OSError, ValueError):
+            return None
+        # mark as recently used
+        os.utime(path)
+        return arrays
+
+    def put(self, key, **arrays):
+        """
+        Store arrays under a key and evict the least recently used entries if the cache is too large.
+
+        :param key: (str) Fingerprint of the model.
+        :param arrays: (array) Arrays to store.
+        """
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the total size is within `max_bytes`.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        for _, _, path in list(self._entries()):
+            os.remove(path)
+
+    def store(self, system, key):
+        """
+        Store the results of a solved system.
+
+        :param system: (:class:`.SystemElements`)
+        :param key: (str) Fingerprint of the model.
+        """
+        self.put(key, **serialize.result_arrays(system))
+
+    def load(self, system, key):
+        """
+        Load cached results into a system and do the post processing.
+
+        :param system: (:class:`.SystemElements`)
+        :param key: (str) Fingerprint of the model.
+        :return: (bool) True if the results were found in the cache.
+        """
+        arrays = self.get(key)
+        if arrays is None:
+            return False
+
+        return serialize.restore_results(system, arrays)
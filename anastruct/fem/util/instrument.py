@@ -0,0 +1,177 @@
+"""
+Instrumentation of the calculations. Callbacks receive structured events of every solve:
+
+    - solve_start, solve_end: the top level solve, the end event holds the :class:`.SolveStats`.
+    - phase_start, phase_end: the phases of the calculation, e.g. assembly, factorization, buckling_eigensolver and
+      post_processing. See :class:`.SolveStats`.
+    - iteration: an iteration of the stiffness adaptation of non linear elements, with the convergence factors.
+
+An event is a dict with the 'event' name, the 'time' (unix time), the id of the 'system' and the event data. Register
+callbacks for one system in `SystemElements.hooks`, or for all systems in `HOOKS`::
+
+    ss.hooks.append(JsonLinesSink('events.jsonl'))
+
+Without code changes, the environment variables below are read on import:
+
+    - ANASTRUCT_EVENTS: path of a JSON lines file. All events are appended to it.
+    - ANASTRUCT_PROFILE: directory. Every solve is profiled with cProfile, the stats are written to
+      solve-<pid>-<n>.prof in the directory.
+"""
+import contextlib
+import itertools
+import json
+import os
+import time
+import numpy as np
+
+# callbacks that receive the events of all systems
+HOOKS = []
+# directory for the profiles of every solve, see ANASTRUCT_PROFILE
+PROFILE_DIRECTORY = None
+_profile_count = itertools.count()
+
+
+def emit(system, event, **data):
+    """
+    Send an event to the callbacks of the system and the global callbacks.
+
+    :param system: (:class:`.SystemElements`)
+    :param event: (str) Name of the event.
+    :param data: Event data.
+    """
+    record = dict(event=event, time=time.time(), system=id(system), **data)
+    for callback in system.hooks:
+        callback(record)
+    for callback in HOOKS:
+        callback(record)
+
+
+def active(system):
+    """
+    :return: (bool) Events or profiles of the solves of the system are requested.
+    """
+    return bool(system.hooks or HOOKS or PROFILE_DIRECTORY)
+
+
+def _json_default(obj):
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    return repr(obj)
+
+
+class JsonLinesSink:
+    """
+    Callback that appends every event as a line of JSON to a file.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: (str) File path. Is created if it doesn't exist.
+        """
+        self.path = os.path.expanduser(path)
+        self._file = None
+
+    def __call__(self, event):
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        self._file.write(json.dumps(event, default=_json_default) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __getstate__(self):
+        # the file is opened again on the next event
+        state = self.__dict__.copy()
+        state['_file'] = None
+        return state
+
+
+class Profile:
+    """
+    Result of :func:`profile`.
+
+    :ivar stats: (pstats.Stats) cProfile statistics.
+    :ivar peak_memory: (int) Peak of the traced memory in bytes, if the memory was traced.
+    :ivar top_allocations: (list) Largest allocations by line as tracemalloc.Statistic, if the memory was traced.
+    """
+
+    def __init__(self):
+        self.stats = None
+        self.peak_memory = None
+        self.top_allocations = None
+
+    def report(self, sort='cumulative', limit=30):
+        """
+        :return: (str) The most expensive functions.
+        """
+        import io
+        stream = io.StringIO()
+        self.stats.stream = stream
+        self.stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+@contextlib.contextmanager
+def profile(path=None, memory=False, limit=10):
+    """
+    Profile a block of code with cProfile and optionally tracemalloc.
+
+    ::
+
+        with profile('solve.prof', memory=True) as p:
+            ss.solve()
+        print(p.report())
+        print(p.peak_memory)
+
+    :param path: (str) Write the cProfile statistics to this file, e.g. to view them with snakeviz.
+    :param memory: (bool) Trace the memory allocations. Slows down the block.
+    :param limit: (int) Number of allocations kept in `top_allocations`.
+    :return: (:class:`Profile`)
+    """
+    # the profilers are only imported when used
+    import cProfile
+    import pstats
+    import tracemalloc
+    result = Profile()
+    tracing = memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        result.stats = pstats.Stats(profiler)
+        if path is not None:
+            result.stats.dump_stats(os.path.expanduser(path))
+        if memory:
+            result.peak_memory = tracemalloc.get_traced_memory()[1]
+            result.top_allocations = tracemalloc.take_snapshot().statistics('lineno')[:limit]
+            if tracing:
+                tracemalloc.stop()
+
+
+def profile_path():
+    """
+    :return: (str) File of the next solve profile in `PROFILE_DIRECTORY`.
+    """
+    os.makedirs(PROFILE_DIRECTORY, exist_ok=True)
+    return os.path.join(PROFILE_DIRECTORY, 'solve-{}-{}.prof'.format(os.getpid(), next(_profile_count)))
+
+
+def configure_from_environment(environ=os.environ):
+    """
+    Register the sinks requested by the ANASTRUCT_EVENTS and ANASTRUCT_PROFILE environment variables.
+    """
+    global PROFILE_DIRECTORY
+    if environ.get('ANASTRUCT_EVENTS'):
+        HOOKS.append(JsonLinesSink(environ['ANASTRUCT_EVENTS']))
+    if environ.get('ANASTRUCT_PROFILE'):
+        PROFILE_DIRECTORY = os.path.abspath(os.path.expanduser(environ['ANASTRUCT_PROFILE']))
+
+
+configure_from_environment()
@@ -1,5 +1,4 @@
 import pprint
-import copy
 from anastruct.basic import args_to_lists
 
 
@@ -97,17 +96,19 @@ class LoadCombination:
 
         results = {}
         for lc, factor in self.spec.values():
-            ss = copy.deepcopy(system)
+            ss = system.snapshot()
 
             ss.load_factor = factor
             ss.apply_load_case(lc)
             ss.solve(force_linear, verbosity, max_iter, geometrical_non_linear, **kwargs)
             results[lc.name] = ss
 
-        ss_combination = copy.deepcopy(system)
+        ss_combination = system.snapshot()
+        element_map = dict(ss_combination.element_map)
         for lc_ss in results.values():
-            for k in ss_combination.element_map:
-                ss_combination.element_map[k] = ss_combination.element_map[k] + lc_ss.element_map[k]
+            for k in element_map:
+                element_map[k] = element_map[k] + lc_ss.element_map[k]
+        ss_combination.element_map = element_map
 
         results['combination'] = ss_combination
         return results
@@ -0,0 +1,74 @@
+import sys
+import numpy as np
+
+
+def nbytes(*arrays):
+    """
+    Memory of arrays. Views are counted once, by the size of the array that owns the memory.
+
+    :param arrays: (array/ None)
+    :return: (int) Bytes.
+    """
+    owners = {}
+    for a in arrays:
+        if not isinstance(a, np.ndarray):
+            continue
+        while isinstance(a.base, np.ndarray):
+            a = a.base
+        owners[id(a)] = a.nbytes
+    return sum(owners.values())
+
+
+def object_size(obj):
+    """
+    Shallow size of an object and its attribute dict. The arrays it refers to are not included.
+    """
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def footprint(system):
+    """
+    Estimate the memory footprint of a model by component.
+
+    The sampled element results are estimated as if all of them were accessed, with the result storage policy of the
+    system. The Python objects are estimated from the shallow size of one element and one node.
+
+    :param system: (:class:`.SystemElements`)
+    :return: (dict) Bytes per component: 'system_matrix', 'element_matrices', 'element_vectors', 'element_results',
+                    'node_results', 'objects' and the 'total'.
+    """
+    elements = list(system.element_map.values())
+    nodes = list(system.node_map.values())
+    n = len(elements)
+    pp = system.post_processor
+
+    lu = system._lu[0] if system._lu is not None else None
+    vectors = system._element_vectors
+    report = {
+        'system_matrix': nbytes(system.system_matrix, system.reduced_system_matrix, lu, system._element_stiffness),
+        'element_matrices': nbytes(*[m for el in elements
+                                     for m in (el.kinematic_matrix, el.constitutive_matrix, el.stiffness_matrix)]),
+        'element_vectors': 0 if vectors is None else nbytes(vectors.displacement, vectors.primary_force,
+                                                            vectors.force, vectors.dofs),
+        'node_results': nbytes(pp.element_node_results, pp.node_results, pp.reactions)
+    }
+
+    # bending moment, shear force (one value more), deflection and extension
+    points = system.result_points or system.plot_values.mesh
+    itemsize = np.dtype(system.result_dtype).itemsize
+    sampled = n * (4 * points + 1) * itemsize
+    # end values, q-loads and axial forces (8 floats) and the maximum deflection
+    report['element_results'] = sampled + n * 9 * 8
+
+    objects = 0
+    if elements:
+        objects += n * object_size(elements[0])
+    if nodes:
+        # the nodes of the system and the nodes at both ends of the elements
+        objects += (len(nodes) + 2 * n) * object_size(nodes[0])
+    report['objects'] = objects
+    report['total'] = sum(report.values())
+    return report
@@ -0,0 +1,265 @@
+import math
+import os
+import numpy as np
+from anastruct.basic import FEMException
+from anastruct.fem.elements import Element
+from anastruct.fem.node import Node
+from anastruct.fem.system_components import assembly, util
+from anastruct.fem.util.stats import NonLinearHistory
+from anastruct.vertex import Vertex
+
+# Bump when the layout of the saved arrays changes.
+FORMAT_VERSION = 1
+
+
+def result_arrays(system):
+    """
+    The arrays from which the results of a solved system are restored. See :func:`restore_results`.
+
+    :param system: (:class:`.SystemElements`)
+    :return: (dict)
+    """
+    vectors = assembly.element_vectors(system)
+    arrays = dict(
+        system_displacement_vector=system.system_displacement_vector,
+        system_force_vector=system.system_force_vector,
+        element_displacement_vector=vectors.displacement,
+        element_primary_force_vector=vectors.primary_force,
+        element_force_vector=vectors.force)
+    if system.buckling_factor is not None:
+        arrays['buckling_factor'] = np.asarray(system.buckling_factor)
+    if system.non_linear:
+        # the stiffness of the non linear elements is adapted by the calculation
+        elements = list(system.element_map.values())
+        arrays['element_constitutive_matrix'] = np.array([el.constitutive_matrix for el in elements], dtype=float)
+        arrays['element_stiffness_matrix'] = np.array([el.stiffness_matrix for el in elements], dtype=float)
+        arrays['element_plastic'] = np.array([el.nodes_plastic for el in elements], dtype=bool).reshape(-1, 2)
+    history = system.non_linear_history
+    if history is not None:
+        arrays['non_linear_history'] = np.array([history.max_deviation, history.plastic_nodes, history.residual,
+                                                 history.damped_nodes], dtype=float).reshape(4, -1)
+        arrays['non_linear_history_reason'] = np.array(history.reason or '')
+    return arrays
+
+
+def restore_results(system, arrays):
+    """
+    Restore the results of a solved system and do the post processing.
+
+    :param system: (:class:`.SystemElements`)
+    :param arrays: (dict) See :func:`result_arrays`.
+    :return: (bool) False if the arrays don't match the elements of the system.
+    """
+    vectors = assembly.element_vectors(system)
+    if arrays['element_force_vector'].shape != vectors.force.shape:
+        return False
+
+    vectors.displacement[:] = arrays['element_displacement_vector']
+    vectors.primary_force[:] = arrays['element_primary_force_vector']
+    vectors.force[:] = arrays['element_force_vector']
+    system.system_displacement_vector = np.array(arrays['system_displacement_vector'])
+    system.system_force_vector = np.array(arrays['system_force_vector'])
+    if 'buckling_factor' in arrays:
+        system.buckling_factor = float(arrays['buckling_factor'])
+    if 'element_constitutive_matrix' in arrays:
+        for el, constitutive, stiffness, plastic in zip(system.element_map.values(),
+                                                         arrays['element_constitutive_matrix'],
+                                                         arrays['element_stiffness_matrix'],
+                                                         arrays['element_plastic'].tolist()):
+            el.constitutive_matrix = np.array(constitutive)
+            el.stiffness_matrix = np.array(stiffness)
+            el.nodes_plastic = plastic
+        system._invalidate('stiffness')
+    if 'non_linear_history' in arrays:
+        history = system.non_linear_history = NonLinearHistory()
+        max_deviation, plastic_nodes, residual, damped_nodes = arrays['non_linear_history'].tolist()
+        for values in zip(max_deviation, plastic_nodes, residual, damped_nodes):
+            history.append(values[0], int(values[1]), values[2], int(values[3]))
+        history.reason = str(arrays['non_linear_history_reason']) or None
+
+    system.post_processor.node_results_elements()
+    system.post_processor.node_results_system()
+    system.post_processor.reaction_forces()
+    system.post_processor.element_results()
+    return True
+
+
+def model_arrays(system, results=False):
+    """
+    The model as arrays: geometry, element properties and matrices, supports and loads.
+
+    :param system: (:class:`.SystemElements`)
+    :param results: (bool) Include the results of the last calculation.
+    :return: (dict)
+    """
+    elements = list(system.element_map.values())
+    nodes = list(system.node_map.values())
+    n = len(elements)
+
+    arrays = dict(
+        format_version=np.array(FORMAT_VERSION),
+        settings=np.array([system.EA, system.EI, system.load_factor, system.orientation_cs,
+                           system.plot_values.mesh, system.plot_values.max_q, system.plot_values.max_system_point_load,
+                           *system.figsize],
+                          dtype=float),
+        counters=np.array([system.count, system._last_node_id], dtype=int),
+        previous_point=system._previous_point.coordinates,
+
+        node_id=np.array([node.id for node in nodes], dtype=int),
+        node_coordinates=np.array([node.vertex.coordinates for node in nodes], dtype=np.float32).reshape(-1, 2),
+        node_hinge=np.array([node.hinge for node in nodes], dtype=bool),
+
+        element_id=np.array([el.id for el in elements], dtype=int),
+        element_nodes=np.array([(el.node_id1, el.node_id2) for el in elements], dtype=int).reshape(-1, 2),
+        element_properties=np.array([(el.EA, el.EI, el.l, el.angle, el.a1, el.a2, el.q_load, el.dead_load)
+                                     for el in elements], dtype=float).reshape(-1, 8),
+        element_type=np.array([el.type for el in elements], dtype='U7'),
+        element_q_direction=np.array([el.q_direction or '' for el in elements], dtype='U7'),
+        element_springs=np.array([[(el.springs or {}).get(node_no, np.nan) for node_no in (1, 2)]
+                                  for el in elements], dtype=float).reshape(-1, 2),
+        element_plastic=np.array([el.nodes_plastic for el in elements], dtype=bool).reshape(-1, 2),
+        kinematic_matrix=np.array([el.kinematic_matrix for el in elements]).reshape(n, 3, 6),
+        constitutive_matrix=np.array([el.constitutive_matrix for el in elements]).reshape(n, 3, 3),
+        stiffness_matrix=np.array([el.stiffness_matrix for el in elements]).reshape(n, 6, 6),
+        element_mp=np.array([(k, node_no, mp) for k, v in system.non_linear_elements.items()
+                             for node_no, mp in v.items()], dtype=float).reshape(-1, 3),
+
+        supports_fixed=np.array([node.id for node in system.supports_fixed], dtype=int),
+        supports_hinged=np.array([node.id for node in system.supports_hinged], dtype=int),
+        supports_roll=np.array([node.id for node in system.supports_roll], dtype=int),
+        supports_roll_direction=np.array(system.supports_roll_direction, dtype=int),
+        inclined_roll=np.array(list(system.inclined_roll.items()), dtype=float).reshape(-1, 2),
+        # node id, translation, k, roll
+        supports_spring=np.array([(node.id, translation, system.system_spring_map[(node.id - 1) * 3 + translation - 1],
+                                   roll)
+                                  for translation, springs in enumerate((system.supports_spring_x,
+                                                                         system.supports_spring_z,
+                                                                         system.supports_spring_y), 1)
+                                  for node, roll in springs], dtype=float).reshape(-1, 4),
+
+        loads_point=np.array([(k, Fx, Fz) for k, (Fx, Fz) in system.loads_point.items()], dtype=float).reshape(-1, 3),
+        loads_moment=np.array(list(system.loads_moment.items()), dtype=float).reshape(-1, 2),
+        loads_q=np.array(list(system.loads_q.items()), dtype=float).reshape(-1, 2),
+        loads_dead_load=np.array(sorted(system.loads_dead_load), dtype=int)
+    )
+    if results and system.system_displacement_vector is not None and system.post_processor.results is not None:
+        arrays.update({'result_' + k: v for k, v in result_arrays(system).items()})
+    return arrays
+
+
+def from_model_arrays(arrays, cls):
+    """
+    Create a model from the arrays of :func:`model_arrays`, without replaying the element creation.
+
+    :param arrays: (dict)
+    :param cls: (type) :class:`.SystemElements`
+    :return: (:class:`.SystemElements`)
+    """
+    if int(arrays['format_version']) != FORMAT_VERSION:
+        raise FEMException('Flawed inputs', 'Unsupported file format version {}.'.format(
+            int(arrays['format_version'])))
+
+    EA, EI, load_factor, orientation_cs, mesh, max_q, max_point_load, *figsize = arrays['settings'].tolist()
+    system = cls(figsize=tuple(figsize), EA=EA, EI=EI, load_factor=load_factor, mesh=int(mesh))
+    system.orientation_cs = int(orientation_cs)
+    system.plot_values.max_q = max_q
+    system.plot_values.max_system_point_load = max_point_load
+    system.count, system._last_node_id = arrays['counters'].tolist()
+    system._previous_point = Vertex(arrays['previous_point'])
+
+    # Creating many objects triggers the cyclic garbage collector over and over, while none of these objects can be
+    # garbage yet.
+    with util.gc_paused():
+        _restore_nodes_and_elements(system, arrays)
+
+    for id_, node_no, mp in arrays['element_mp'].tolist():
+        system.non_linear_elements.setdefault(int(id_), {})[int(node_no)] = mp
+    system.non_linear = bool(system.non_linear_elements)
+
+    system.supports_fixed = [system.node_map[id_] for id_ in arrays['supports_fixed'].tolist()]
+    system.supports_hinged = [system.node_map[id_] for id_ in arrays['supports_hinged'].tolist()]
+    system.supports_roll = [system.node_map[id_] for id_ in arrays['supports_roll'].tolist()]
+    system.supports_roll_direction = arrays['supports_roll_direction'].tolist()
+    for name in ('supports_fixed', 'supports_hinged', 'supports_roll'):
+        for node in getattr(system, name):
+            system._register_support(name, node.id)
+    system.inclined_roll = {int(id_): angle for id_, angle in arrays['inclined_roll'].tolist()}
+    for id_, translation, k, roll in arrays['supports_spring'].tolist():
+        system.add_support_spring(int(id_), int(translation), k, bool(roll))
+
+    system.loads_point = {int(id_): (Fx, Fz) for id_, Fx, Fz in arrays['loads_point'].tolist()}
+    system.loads_moment = {int(id_): Ty for id_, Ty in arrays['loads_moment'].tolist()}
+    system.loads_q = {int(id_): q for id_, q in arrays['loads_q'].tolist()}
+    system.loads_dead_load = set(arrays['loads_dead_load'].tolist())
+
+    system._topology_changed()
+    if 'result_system_displacement_vector' in arrays:
+        restore_results(system, {k[len('result_'):]: v for k, v in arrays.items() if k.startswith('result_')})
+    return system
+
+
+def _restore_nodes_and_elements(system, arrays):
+    coordinates = arrays['node_coordinates']
+    for id_, xy, key, hinge in zip(arrays['node_id'].tolist(), coordinates, coordinates.tolist(),
+                                   arrays['node_hinge'].tolist()):
+        node = Node(id_, vertex=Vertex(xy))
+        node.hinge = hinge
+        system.node_map[id_] = node
+        system._vertices[tuple(key)] = id_
+
+    springs = arrays['element_springs']
+    spring_dicts = [None] * len(springs)
+    for i in np.flatnonzero(~np.all(np.isnan(springs), axis=1)).tolist():
+        spring_dicts[i] = {node_no: k for node_no, k in zip((1, 2), springs[i].tolist()) if not math.isnan(k)}
+
+    matrices = zip(arrays['kinematic_matrix'], arrays['constitutive_matrix'], arrays['stiffness_matrix'])
+    for id_, (node_id1, node_id2), (EA, EI, l, angle, a1, a2, q_load, dead_load), type_, q_direction, spring, \
+            plastic, m in zip(arrays['element_id'].tolist(), arrays['element_nodes'].tolist(),
+                              arrays['element_properties'].tolist(), arrays['element_type'].tolist(),
+                              arrays['element_q_direction'].tolist(), spring_dicts, arrays['element_plastic'].tolist(),
+                              matrices):
+        node_1 = system.node_map[node_id1]
+        node_2 = system.node_map[node_id2]
+        element = Element(id_, EA, EI, l, angle, node_1.vertex, node_2.vertex, spring, matrices=m)
+        element.node_id1 = node_id1
+        element.node_id2 = node_id2
+        element.node_map = {node_id1: node_1, node_id2: node_2}
+        element.type = type_
+        element.a1 = a1
+        element.a2 = a2
+        element.q_load = q_load
+        element.q_direction = q_direction or None
+        element.dead_load = dead_load
+        element.nodes_plastic = plastic
+        system.element_map[id_] = element
+
+        for node in (node_1, node_2):
+            node.elements[id_] = element
+            system.node_element_map.setdefault(node.id, []).append(element)
+
+
+def save(system, path, results=False, compressed=False):
+    """
+    Save a model as a .npz file.
+
+    :param system: (:class:`.SystemElements`)
+    :param path: (str) File path.
+    :param results: (bool) Include the results of the last calculation.
+    :param compressed: (bool) Compress the arrays. Smaller files, but slower to save and load.
+    """
+    arrays = model_arrays(system, results)
+    with open(os.path.expanduser(path), 'wb') as f:
+        (np.savez_compressed if compressed else np.savez)(f, **arrays)
+
+
+def load(path, cls):
+    """
+    Load a model saved with :func:`save`.
+
+    :param path: (str) File path.
+    :param cls: (type) :class:`.SystemElements`
+    :return: (:class:`.SystemElements`)
+    """
+    with np.load(os.path.expanduser(path)) as f:
+        arrays = {k: f[k] for k in f.files}
+    return from_model_arrays(arrays, cls)
@@ -0,0 +1,153 @@
+import time
+
+
+class _NoPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _NoStats:
+    """
+    Used when the solve statistics are not collected and there are no hooks. Recording a phase costs a single method
+    call.
+    """
+    _phase = _NoPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def emit(self, event, **data):
+        pass
+
+
+NO_STATS = _NoStats()
+
+
+class _Phase:
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.stats.emit('phase_start', phase=self.name)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        t = time.perf_counter() - self.t0
+        self.stats.times[self.name] = self.stats.times.get(self.name, 0.0) + t
+        self.stats.calls[self.name] = self.stats.calls.get(self.name, 0) + 1
+        self.stats.emit('phase_end', phase=self.name, duration=t)
+        return False
+
+
+class SolveStats:
+    """
+    Wall time and call counts per phase of a calculation, see `SystemElements.collect_solve_stats`. The phases of the
+    nested calculations of non linear and buckling analyses are summed.
+
+    Phases: 'cache', 'supports', 'validation', 'force_vector', 'assembly', 'process_conditions', 'factorization',
+    'linear_solve', 'element_forces', 'post_processing' and 'buckling_eigensolver'.
+
+    :ivar times: (dict) Seconds per phase.
+    :ivar calls: (dict) Number of times a phase was run.
+    :ivar total: (flt) Seconds of the whole calculation.
+    :ivar matrix_size: (int) Degrees of freedom of the system matrix.
+    :ivar reduced_size: (int) Degrees of freedom after processing the support conditions.
+    :ivar nonzeros: (int) Number of non zero entries of the system matrix.
+    :ivar non_linear_iterations: (int) Iterations of the stiffness adaptation of non linear elements.
+    """
+
+    def __init__(self, emit=None):
+        """
+        :param emit: (function) Called with the name and the data of the events of the calculation, see
+                     :mod:`anastruct.fem.util.instrument`.
+        """
+        self._emit = emit
+        self.times = {}
+        self.calls = {}
+        self.total = 0.0
+        self.matrix_size = 0
+        self.reduced_size = 0
+        self.nonzeros = 0
+        self.non_linear_iterations = 0
+
+    def phase(self, name):
+        """
+        Context manager that adds the wall time of the block to a phase.
+
+        :param name: (str) Name of the phase.
+        """
+        return _Phase(self, name)
+
+    def emit(self, event, **data):
+        """
+        Send an event of the calculation to the hooks, if any.
+        """
+        if self._emit is not None:
+            self._emit(event, **data)
+
+    def as_dict(self):
+        """
+        :return: (dict) The statistics, e.g. to log them as JSON.
+        """
+        return dict(times=dict(self.times), calls=dict(self.calls), total=self.total, matrix_size=self.matrix_size,
+                    reduced_size=self.reduced_size, nonzeros=self.nonzeros,
+                    non_linear_iterations=self.non_linear_iterations)
+
+    def __repr__(self):
+        phases = ', '.join('{}={:.4f}s/{}'.format(k, v, self.calls[k]) for k, v in self.times.items())
+        return 'SolveStats(total={:.4f}s, {}, matrix_size={}, nonzeros={}, non_linear_iterations={})'.format(
+            self.total, phases, self.matrix_size, self.nonzeros, self.non_linear_iterations)
+
+
+class NonLinearHistory:
+    """
+    Convergence history of the stiffness adaptation of non linear elements, one value per iteration.
+
+    :ivar max_deviation: (list) Largest deviation of the convergence factors of the plastic hinges from 1.
+    :ivar plastic_nodes: (list) Number of plastic hinges.
+    :ivar residual: (list) Largest difference between the moment and the plastic moment of a plastic hinge.
+    :ivar damped_nodes: (list) Number of hinges of which the stiffness updates are damped, because they oscillated.
+    :ivar reason: (str) Why the iterations stopped: 'converged', 'collapsed', 'stalled' or 'max_iter'.
+    """
+
+    def __init__(self):
+        self.max_deviation = []
+        self.plastic_nodes = []
+        self.residual = []
+        self.damped_nodes = []
+        self.reason = None
+
+    def __len__(self):
+        return len(self.max_deviation)
+
+    @property
+    def converged(self):
+        return self.reason == 'converged'
+
+    def append(self, max_deviation, plastic_nodes, residual, damped_nodes):
+        self.max_deviation.append(float(max_deviation))
+        self.plastic_nodes.append(plastic_nodes)
+        self.residual.append(float(residual))
+        self.damped_nodes.append(damped_nodes)
+
+    def stalled(self, iterations, improvement=0.01):
+        """
+        :param iterations: (int) Number of iterations.
+        :param improvement: (flt) Minimal relative improvement.
+        :return: (bool) The largest deviation didn't improve by `improvement` in the last `iterations` iterations.
+        """
+        if len(self) <= iterations:
+            return False
+        return min(self.max_deviation[-iterations:]) > (1 - improvement) * min(self.max_deviation[:-iterations])
+
+    def as_dict(self):
+        """
+        :return: (dict) The history, e.g. to log it as JSON.
+        """
+        return dict(max_deviation=list(self.max_deviation), plastic_nodes=list(self.plastic_nodes),
+                    residual=list(self.residual), damped_nodes=list(self.damped_nodes), reason=self.reason)
@@ -0,0 +1,194 @@
+import json
+import os
+import numpy as np
+from anastruct.basic import FEMException
+
+STORE_VERSION = 1
+
+# columns of the stored results
+FIELDS = {
+    # as get_node_results_system
+    'node_displacements': ('ux', 'uy', 'phi_y'),
+    'reactions': ('Fx', 'Fy', 'Ty'),
+    # Fx, Fz, Ty at the first and the second node of the elements, as the node results of the elements
+    'element_forces': ('Fx_1', 'Fz_1', 'Ty_1', 'Fx_2', 'Fz_2', 'Ty_2'),
+    # exact extremes, see SystemElements.get_element_results
+    'element_envelopes': ('Mmin', 'Mmax', 'Vmin', 'Vmax', 'wmin', 'wmax')
+}
+
+
+def _write_index(directory, index):
+    # readers never see a partially written index
+    tmp = os.path.join(directory, 'index.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp, os.path.join(directory, 'index.json'))
+
+
+class ResultStore:
+    """
+    Append-only store of the results of many calculations of the same structure, e.g. the variants of a parametric
+    study. The results of every run are written in preallocated memory mapped .npy files, so the solved models don't
+    have to be kept in memory:
+
+        - node_displacements: (runs, n_nodes, 3) ux, uy, phi_y
+        - reactions: (runs, n_supports, 3) Fx, Fy, Ty
+        - element_forces: (runs, n_elements, 6) Fx, Fz, Ty at both ends of the elements
+        - element_envelopes: (runs, n_elements, 6) Mmin, Mmax, Vmin, Vmax, wmin, wmax
+
+    An index file holds the ids of the rows and the number of completed runs. The metadata of the runs is appended to
+    runs.jsonl. Readers in other processes open the store zero-copy with `ResultStore(directory)` and only see
+    completed runs.
+
+    ::
+
+        store = ResultStore.create('study', ss, capacity=10000)
+        for variant in variants:
+            ...
+            ss.solve()
+            store.append(ss, variant=variant)
+    """
+
+    def __init__(self, directory, mode='r'):
+        """
+        Open an existing store. Use :meth:`create` to create a new store.
+
+        :param directory: (str) Directory of the store.
+        :param mode: (str) 'r' to read, 'r+' to append.
+        """
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.mode = mode
+        self.index = self._read_index()
+        self._arrays = {name: np.load(self._path(name + '.npy'), mmap_mode=mode) for name in FIELDS}
+        self._node_ids = np.array(self.index['node_ids'], dtype=int)
+        self._element_ids = np.array(self.index['element_ids'], dtype=int)
+        self._reaction_node_ids = np.array(self.index['reaction_node_ids'], dtype=int)
+
+    @classmethod
+    def create(cls, directory, system, capacity, dtype=np.float64):
+        """
+        Create a store for the results of a structure. The layout of the rows is taken from the nodes, elements and
+        supports of the system.
+
+        :param directory: (str) Directory of the store. Is created if it doesn't exist.
+        :param system: (:class:`.SystemElements`) Solved structure.
+        :param capacity: (int) Maximum number of runs.
+        :param dtype: (np.dtype) Floating point type of the stored results.
+        :return: (:class:`ResultStore`) Opened for appending.
+        """
+        if system.post_processor.reaction_node_ids is None:
+            raise FEMException('Flawed inputs', 'The system should be solved before a result store is created.')
+        directory = os.path.abspath(os.path.expanduser(directory))
+        os.makedirs(directory, exist_ok=True)
+
+        index = {
+            'version': STORE_VERSION,
+            'capacity': int(capacity),
+            'count': 0,
+            'dtype': np.dtype(dtype).str,
+            'columns': {name: list(columns) for name, columns in FIELDS.items()},
+            'node_ids': list(system.node_map.keys()),
+            'element_ids': list(system.element_map.keys()),
+            'reaction_node_ids': system.post_processor.reaction_node_ids.tolist()
+        }
+        rows = {
+            'node_displacements': len(index['node_ids']),
+            'reactions': len(index['reaction_node_ids']),
+            'element_forces': len(index['element_ids']),
+            'element_envelopes': len(index['element_ids'])
+        }
+        for name, columns in FIELDS.items():
+            np.lib.format.open_memmap(os.path.join(directory, name + '.npy'), mode='w+', dtype=dtype,
+                                      shape=(int(capacity), rows[name], len(columns))).flush()
+        open(os.path.join(directory, 'runs.jsonl'), 'w').close()
+
+        _write_index(directory, index)
+        return cls(directory, mode='r+')
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_index(self):
+        with open(self._path('index.json')) as f:
+            index = json.load(f)
+        if index['version'] != STORE_VERSION:
+            raise FEMException('Flawed inputs', 'Unsupported result store version {}.'.format(index['version']))
+        return index
+
+    def __len__(self):
+        return self.index['count']
+
+    def refresh(self):
+        """
+        Read the number of completed runs again, e.g. while another process is appending.
+        """
+        self.index = self._read_index()
+
+    def __getitem__(self, name):
+        """
+        :param name: (str) 'node_displacements', 'reactions', 'element_forces' or 'element_envelopes'.
+        :return: (array) Memory mapped results of the completed runs. Shape (runs, rows, columns).
+        """
+        return self._arrays[name][:len(self)]
+
+    @property
+    def node_ids(self):
+        return self._node_ids
+
+    @property
+    def element_ids(self):
+        return self._element_ids
+
+    @property
+    def reaction_node_ids(self):
+        return self._reaction_node_ids
+
+    @property
+    def runs(self):
+        """
+        :return: (list) Metadata of the completed runs.
+        """
+        with open(self._path('runs.jsonl')) as f:
+            lines = f.readlines()[:len(self)]
+        return [json.loads(line) for line in lines]
+
+    def append(self, system, **metadata):
+        """
+        Write the results of a solved system as the next run.
+
+        :param system: (:class:`.SystemElements`) Solved structure with the layout of the store.
+        :param metadata: JSON serializable metadata of the run, e.g. the parameters of the variant.
+        :return: (int) Index of the run.
+        """
+        if self.mode == 'r':
+            raise FEMException('Wrong parameters', 'The result store is opened read only.')
+        run = len(self)
+        if run >= self.index['capacity']:
+            raise FEMException('Flawed inputs', 'The result store is full, the capacity is {} runs.'.format(
+                self.index['capacity']))
+        pp = system.post_processor
+        if not np.array_equal(list(system.node_map), self._node_ids) or \
+                not np.array_equal(list(system.element_map), self._element_ids) or \
+                not np.array_equal(pp.reaction_node_ids, self._reaction_node_ids):
+            raise FEMException('Flawed inputs', 'The nodes, elements or supports of the system differ from the '
+                                                'layout of the result store.')
+
+        nodes = system.get_node_result_arrays()
+        self._arrays['node_displacements'][run] = np.column_stack((nodes['ux'], nodes['uy'], nodes['phi_y']))
+        reactions = self._arrays['reactions'][run]
+        reactions[:] = pp.reactions
+        reactions[:, 1] *= -1  # Fy = -Fz
+        self._arrays['element_forces'][run] = pp.element_node_results[:, :, :3].reshape(-1, 6)
+        envelopes = self._arrays['element_envelopes'][run]
+        for column, name in enumerate(('bending_moment', 'shear_force', 'deflection')):
+            minimum, _, maximum, _ = pp.results.extrema(name)
+            envelopes[:, 2 * column] = minimum
+            envelopes[:, 2 * column + 1] = maximum
+        for array in self._arrays.values():
+            array.flush()
+
+        with open(self._path('runs.jsonl'), 'a') as f:
+            f.write(json.dumps(metadata) + '\n')
+        self.index['count'] = run + 1
+        _write_index(self.directory, self.index)
+        return run